@@ -5,6 +5,10 @@ from airflow.operators.bash import BashOperator
 from airflow.models import Variable
 from airflow.utils.log.logging_mixin import LoggingMixin
 from mlflow_plugin import MLflowModelOperator, MLflowExperimentOperator
+from silhouette_scoring import COMPARABLE_SILHOUETTE_METHODS, score_silhouette
+from plagiarism_features import max_similarity
+from optuna_search import default_workers, run_studies
+from incremental_extract import update_snapshot
 import pandas as pd
 import numpy as np
 import mlflow
@@ -14,14 +18,20 @@ import pickle
 import json
 import os
 import glob
+import shutil
+import time
+import functools
 import logging
+import requests
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
 from supabase import create_client, Client
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.decomposition import PCA
 from sklearn.cluster import KMeans, BisectingKMeans
 from sklearn.mixture import GaussianMixture
-from sklearn.metrics import silhouette_score, calinski_harabasz_score, davies_bouldin_score
-import optuna
+from sklearn.metrics import calinski_harabasz_score, davies_bouldin_score
 
 # Setup logging
 logger = logging.getLogger(__name__)
@@ -30,6 +40,7 @@ logger = logging.getLogger(__name__)
 MLFLOW_TRACKING_URI = "http://mlflow:5000"
 EXPERIMENT_NAME = "document-processing"
 MODEL_NAME = "document-clustering"
+FASTAPI_URL = os.getenv("FASTAPI_URL", "http://fastapi-app:8000")
 
 # Initialize MLflow experiment
 mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
@@ -48,6 +59,30 @@ if not os.path.exists(artifact_root):
 else:
     logger.info(f"✓ Artifact directory exists: {artifact_root}")
 
+# Incremental extraction: local snapshot of the training columns, merged with each delta
+SNAPSHOT_DIR = os.path.join(artifact_root, "snapshots", "documents")
+EXTRACT_COLUMNS = ['id', 'folder', 'sentences', 'page', 'deadline', 'uploadedDate', 'plagiarism']
+
+# Typed, columnar hand-off between tasks: Parquet for extracted rows, uncompressed
+# Arrow IPC for the numeric feature matrix so training can memory-map it
+RUN_ARTIFACTS_DIR = os.path.join(artifact_root, "runs")
+EXTRACTED_SCHEMA = pa.schema([
+    ('id', pa.string()),
+    ('folder', pa.string()),
+    ('sentences', pa.float64()),
+    ('page', pa.float64()),
+    ('deadline', pa.timestamp('us', tz='UTC')),
+    ('uploadedDate', pa.timestamp('us', tz='UTC')),
+    ('plagiarism', pa.string()),
+    ('max_similarity', pa.float64()),
+])
+FEATURE_SCHEMA = pa.schema([
+    ('sentences', pa.float64()),
+    ('page', pa.float64()),
+    ('timing', pa.float64()),
+    ('plagiarism', pa.float64()),
+])
+
 default_args = {
     'owner': 'ngumpulin',
     'depends_on_past': False,
@@ -60,6 +95,18 @@ default_args = {
         'n_trials': Variable.get('n_trials', 20),
         'silhouette_threshold': Variable.get('silhouette_threshold', 0.5),
         'model_dir': Variable.get('model_dir', '/mlflow/artifacts/models'),
+        'keep_model_versions': Variable.get('keep_model_versions', 3),
+        'extract_page_size': Variable.get('extract_page_size', 1000),
+        'extract_watermark_column': Variable.get('extract_watermark_column', 'uploadedDate'),
+        'extract_lookback_hours': Variable.get('extract_lookback_hours', 24),
+        'extract_full_refresh_days': Variable.get('extract_full_refresh_days', 7),
+        'keep_run_artifacts': Variable.get('keep_run_artifacts', 5),
+        'optuna_workers': Variable.get('optuna_workers', 0),  # 0: one per CPU of the training worker
+        'silhouette_trial_method': Variable.get('silhouette_trial_method', 'sampled'),
+        'silhouette_final_method': Variable.get('silhouette_final_method', 'exact'),
+        'silhouette_evaluate_method': Variable.get('silhouette_evaluate_method', 'exact'),
+        'silhouette_sample_size': Variable.get('silhouette_sample_size', 10000),
+        'silhouette_exact_max_rows': Variable.get('silhouette_exact_max_rows', 200000),
     }
 }
 
@@ -80,14 +127,66 @@ create_experiment = MLflowExperimentOperator(
     dag=dag
 )
 
+def _run_dir(context):
+    """Artifact directory private to this DAG run, so concurrent runs never share files."""
+    run_id = "".join(c if c.isalnum() or c in "-_." else "_" for c in context['run_id'])
+    path = os.path.join(RUN_ARTIFACTS_DIR, run_id)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def _prune_run_dirs(keep, current):
+    """Remove artifact directories of all but the newest `keep` runs."""
+    if not os.path.isdir(RUN_ARTIFACTS_DIR):
+        return
+    paths = sorted(
+        (os.path.join(RUN_ARTIFACTS_DIR, name) for name in os.listdir(RUN_ARTIFACTS_DIR)),
+        key=os.path.getmtime, reverse=True
+    )
+    for path in paths[keep:]:
+        if path != current:
+            shutil.rmtree(path, ignore_errors=True)
+
+def _write_frame(df, path, schema):
+    """Write a DataFrame with an explicit Arrow schema (.parquet or .arrow)."""
+    table = pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+    tmp_path = f"{path}.tmp"
+    if path.endswith(".parquet"):
+        pq.write_table(table, tmp_path, compression='zstd')
+    else:
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, path)
+    return path
+
+def _read_frame(path, columns=None):
+    """Read a task hand-off file; Arrow IPC files are memory-mapped."""
+    if path.endswith(".parquet"):
+        return pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+    return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+
 def extract_data(**context):
-    """Extract data from Supabase and save as CSV."""
+    """Incrementally extract training columns from Supabase into a local snapshot and save as Parquet."""
     try:
         with mlflow.start_run(run_name="data_extraction", experiment_id=experiment_id, nested=True):
+            params = context['params']
+            watermark_column = params.get('extract_watermark_column', 'uploadedDate')
+            page_size = int(params.get('extract_page_size', 1000))
+            lookback = timedelta(hours=float(params.get('extract_lookback_hours', 24)))
+            full_refresh_every = timedelta(days=float(params.get('extract_full_refresh_days', 7)))
+            columns = list(dict.fromkeys(EXTRACT_COLUMNS + [watermark_column]))
+
             supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
-            table_name = "documents"
-            response = supabase.table(table_name).select("*").execute()
-            df = pd.DataFrame(response.data)
+            # Rows deleted upstream stay in the snapshot until the next full refresh
+            df, transfer = update_snapshot(
+                supabase, SNAPSHOT_DIR, columns, watermark_column, page_size, lookback, full_refresh_every
+            )
+            full_refresh, since = transfer['full_refresh'], transfer['since']
+            
+            # Snapshot partitions written before the feature existed are filled in here
+            if 'max_similarity' not in df.columns:
+                df['max_similarity'] = np.nan
+            missing = df['max_similarity'].isna()
+            if missing.any():
+                df.loc[missing, 'max_similarity'] = max_similarity(df.loc[missing, 'plagiarism'])
             
             # Convert sentences to numeric if it's not already
             df['sentences'] = pd.to_numeric(df['sentences'], errors='coerce')
@@ -105,9 +204,25 @@ def extract_data(**context):
             mlflow.log_metric("avg_sentences", avg_sentences)
             mlflow.log_metric("avg_pages", avg_pages)
             
-            out_path = "/mlflow/artifacts/extracted_data.csv"
-            os.makedirs(os.path.dirname(out_path), exist_ok=True)
-            df.to_csv(out_path, index=False)
+            # Log transfer metrics
+            mlflow.log_param("extract_mode", "full" if full_refresh else "incremental")
+            mlflow.log_param("extract_since", since)
+            mlflow.log_metric("rows_transferred", transfer['rows_transferred'])
+            mlflow.log_metric("bytes_transferred", transfer['bytes_transferred'])
+            mlflow.log_metric("pages_fetched", transfer['pages_fetched'])
+            mlflow.log_metric("snapshot_partitions_written", transfer['partitions_written'])
+            logger.info(
+                f"Extracted {transfer['rows_transferred']} rows ({transfer['bytes_transferred']} bytes, "
+                f"{transfer['pages_fetched']} pages, {'full' if full_refresh else f'since {since}'}); "
+                f"snapshot has {total_docs} documents"
+            )
+            
+            for col in ('deadline', 'uploadedDate'):
+                df[col] = pd.to_datetime(df[col], utc=True, errors='coerce', format='ISO8601')
+            
+            run_dir = _run_dir(context)
+            _prune_run_dirs(int(params.get('keep_run_artifacts', 5)), run_dir)
+            out_path = _write_frame(df, os.path.join(run_dir, "extracted_data.parquet"), EXTRACTED_SCHEMA)
             mlflow.log_artifact(out_path, "raw_data")
             
             logger.info(f"Data extracted successfully to {out_path}")
@@ -121,7 +236,7 @@ def validate_data(**context):
     try:
         with mlflow.start_run(run_name="data_validation", experiment_id=experiment_id, nested=True):
             in_path = context['ti'].xcom_pull(task_ids='extract_data')
-            df = pd.read_csv(in_path)
+            df = _read_frame(in_path)
             
             required_columns = ['sentences', 'page', 'deadline', 'uploadedDate', 'plagiarism']
             missing_columns = [col for col in required_columns if col not in df.columns]
@@ -150,11 +265,11 @@ def validate_data(**context):
         raise
 
 def preprocess_data(**context):
-    """Preprocess the extracted data and save as CSV."""
+    """Preprocess the extracted data and save the feature matrix as Arrow IPC."""
     try:
         with mlflow.start_run(run_name="data_preprocessing", experiment_id=experiment_id, nested=True):
             in_path = context['ti'].xcom_pull(task_ids='extract_data')
-            df = pd.read_csv(in_path)
+            df = _read_frame(in_path)
             
             # Date conversion and feature engineering
             df['deadline'] = pd.to_datetime(df['deadline'])
@@ -178,68 +293,8 @@ def preprocess_data(**context):
             # Convert timing to integer after handling NaN
             df['timing'] = df['timing'].astype(int)
             
-            # Plagiarism value extraction with better error handling
-            def extract_plagiarism(row):
-                try:
-                    # Handle empty string or None
-                    if pd.isna(row) or row == '[]' or row == '':
-                        return 0.0
-                    
-                    # Handle string representation of list/dict
-                    if isinstance(row, str):
-                        # Clean the string if needed
-                        row = row.strip()
-                        if row.startswith('[') and row.endswith(']'):
-                            row = row[1:-1]  # Remove brackets
-                        if row.startswith('{') and row.endswith('}'):
-                            row = row[1:-1]  # Remove braces
-                        
-                        # Parse the string into a list of dictionaries
-                        try:
-                            # Handle multiple dictionaries
-                            if ',' in row:
-                                items = row.split('}, {')
-                                items = [item.strip('{}') for item in items]
-                                max_value = 0.0
-                                for item in items:
-                                    # Parse each dictionary
-                                    pairs = item.split(',')
-                                    for pair in pairs:
-                                        if ':' in pair:
-                                            key, value = pair.split(':')
-                                            value = float(value.strip())
-                                            max_value = max(max_value, value)
-                                return round(max_value * 100, 2)
-                            else:
-                                # Handle single dictionary
-                                pairs = row.split(',')
-                                max_value = 0.0
-                                for pair in pairs:
-                                    if ':' in pair:
-                                        key, value = pair.split(':')
-                                        value = float(value.strip())
-                                        max_value = max(max_value, value)
-                                return round(max_value * 100, 2)
-                        except Exception as e:
-                            logger.warning(f"Error parsing plagiarism value: {str(e)}")
-                            return 0.0
-                    
-                    # Handle list/dict directly
-                    if isinstance(row, (list, dict)):
-                        if isinstance(row, list):
-                            values = [v for item in row for v in item.values()]
-                        else:
-                            values = list(row.values())
-                        return round(max(values) * 100, 2) if values else 0.0
-                    
-                    return 0.0
-                except Exception as e:
-                    logger.warning(f"Error in extract_plagiarism: {str(e)}")
-                    return 0.0
-            
-            # Apply plagiarism extraction and handle any remaining NaN
-            df['plagiarism'] = df['plagiarism'].apply(extract_plagiarism)
-            df['plagiarism'] = df['plagiarism'].fillna(0.0)
+            # Plagiarism feature: percentage of the highest similarity, materialized at extraction
+            df['plagiarism'] = (df['max_similarity'].fillna(0.0) * 100).round(2)
             
             # Select features
             data = df[['sentences', 'page', 'timing', 'plagiarism']]
@@ -259,13 +314,14 @@ def preprocess_data(**context):
             X_weight = pd.DataFrame(X_weight, columns=data.columns)
             
             # Save scaler and weighted data to shared volume
-            scaler_path = "/mlflow/artifacts/scaler.pkl"
-            weighted_path = "/mlflow/artifacts/preprocessed_data.csv"
-            os.makedirs(os.path.dirname(scaler_path), exist_ok=True)
+            run_dir = _run_dir(context)
+            scaler_path = os.path.join(run_dir, "scaler.pkl")
+            weighted_path = os.path.join(run_dir, "preprocessed_data.arrow")
             
             with open(scaler_path, 'wb') as f:
                 pickle.dump(scaler, f)
-            X_weight.to_csv(weighted_path, index=False)
+            _write_frame(X_weight, weighted_path, FEATURE_SCHEMA)
+            context['ti'].xcom_push(key='scaler_path', value=scaler_path)
             
             # Log preprocessing artifacts
             mlflow.log_artifact(scaler_path, "preprocessing")
@@ -288,12 +344,43 @@ def preprocess_data(**context):
         logger.error(f"Error in preprocess_data: {str(e)}")
         raise
 
+def _silhouette_scorer(params, stage):
+    """
+    Silhouette estimator configured for one stage: trial, final or evaluate.
+
+    Final and evaluate scores are compared with earlier runs, so only methods
+    estimating the true silhouette are allowed there; centroid is trial-only.
+    """
+    method = params.get(f'silhouette_{stage}_method', 'exact')
+    if stage != 'trial' and method not in COMPARABLE_SILHOUETTE_METHODS:
+        raise ValueError(
+            f"silhouette_{stage}_method must be one of {COMPARABLE_SILHOUETTE_METHODS}, got {method}"
+        )
+    return functools.partial(
+        score_silhouette,
+        method=method,
+        sample_size=int(params.get('silhouette_sample_size', 10000)),
+        exact_max_rows=int(params.get('silhouette_exact_max_rows', 200000)),
+    )
+
+def _log_silhouette(estimate):
+    """Log how a silhouette score was estimated next to the score itself."""
+    mlflow.log_param("silhouette_method", estimate.method)
+    mlflow.log_metric("silhouette_ci_lower", estimate.lower)
+    mlflow.log_metric("silhouette_ci_upper", estimate.upper)
+    mlflow.log_metric("silhouette_rows_scored", estimate.n_scored)
+    mlflow.log_metric("silhouette_seconds", estimate.seconds)
+
+def _comparable_silhouette(run):
+    """Whether a run's silhouette_score estimates the true silhouette; runs that predate the param used exact."""
+    return run.data.params.get('silhouette_method', 'exact') in COMPARABLE_SILHOUETTE_METHODS
+
 def train_model(**context):
     """Run clustering, optimize with Optuna, and save model."""
     try:
         with mlflow.start_run(run_name="model_training", experiment_id=experiment_id, nested=True):
             weighted_path = context['ti'].xcom_pull(task_ids='preprocess_data')
-            X_weight = pd.read_csv(weighted_path)
+            X_weight = _read_frame(weighted_path)
             
             # Get all previous model runs
             client = MlflowClient()
@@ -314,6 +401,9 @@ def train_model(**context):
                 required_metrics = ['silhouette_score', 'calinski_harabasz_score', 'davies_bouldin_score', 'training_data_size']
                 if not all(metric in metrics for metric in required_metrics):
                     continue
+                if not _comparable_silhouette(run):
+                    logger.warning(f"Skipping run {run.info.run_id}: silhouette scored with {run.data.params['silhouette_method']}")
+                    continue
                     
                 # Get training data size
                 training_data_size = float(metrics.get('training_data_size', 0))
@@ -346,91 +436,20 @@ def train_model(**context):
                     best_score = final_score
                     best_run = run
             
-            # Define Optuna objectives
-            def objective_kmeans(trial):
-                n_clusters = trial.suggest_int('n_clusters', 2, 3)
-                init_method = trial.suggest_categorical('init', ['k-means++', 'random'])
-                n_init = trial.suggest_int('n_init', 1, 10)
-                max_iter = trial.suggest_int('max_iter', 100, 1000)
-                algorithm = trial.suggest_categorical('algorithm', ['lloyd', 'elkan'])
-                random_state = trial.suggest_int('random_state', 0, 1000)
-                
-                model = KMeans(
-                    n_clusters=n_clusters, 
-                    init=init_method, 
-                    n_init=n_init,
-                    max_iter=max_iter,
-                    algorithm=algorithm,
-                    random_state=random_state
-                )
-                
-                try:
-                    labels = model.fit_predict(X_weight)
-                    if len(set(labels)) <= 1:
-                        return -1.0
-                    score = silhouette_score(X_weight, labels)
-                    return float(score)
-                except Exception:
-                    return -1.0
-                    
-            def objective_bisecting_kmeans(trial):
-                n_clusters = trial.suggest_int('n_clusters', 2, 3)
-                init = trial.suggest_categorical('init', ['k-means++', 'random'])
-                n_init = trial.suggest_int('n_init', 1, 10)
-                max_iter = trial.suggest_int('max_iter', 100, 1000)
-                random_state = trial.suggest_int('random_state', 0, 1000)
-                
-                model = BisectingKMeans(
-                    n_clusters=n_clusters,
-                    init=init,
-                    n_init=n_init,
-                    max_iter=max_iter,
-                    random_state=random_state
-                )
-                
-                try:
-                    labels = model.fit_predict(X_weight)
-                    if len(set(labels)) <= 1:
-                        return -1.0
-                    score = silhouette_score(X_weight, labels)
-                    return float(score)
-                except Exception:
-                    return -1.0
-                    
-            def objective_gmm(trial):
-                n_components = trial.suggest_int('n_components', 2, 3)
-                covariance_type = trial.suggest_categorical('covariance_type', ['full', 'tied', 'diag', 'spherical'])
-                init_params = trial.suggest_categorical('init_params', ['kmeans', 'random'])
-                random_state = trial.suggest_int('random_state', 0, 1000)
-                
-                model = GaussianMixture(
-                    n_components=n_components,
-                    covariance_type=covariance_type,
-                    init_params=init_params,
-                    random_state=random_state
-                )
-                
-                try:
-                    labels = model.fit_predict(X_weight)
-                    if len(set(labels)) <= 1:
-                        return -1.0
-                    return float(silhouette_score(X_weight, labels))
-                except Exception:
-                    return -1.0
-                    
-            algorithms = {
-                'KMeans': objective_kmeans,
-                'BisectingKMeans': objective_bisecting_kmeans,
-                'GaussianMixture': objective_gmm,
-            }
-            
-            n_trials = context['params']['n_trials']
+            n_trials = int(context['params']['n_trials'])
+            # Resolved here, on the worker that trains, not where the DAG is parsed
+            n_workers = max(1, int(context['params'].get('optuna_workers') or 0) or default_workers())
+            trial_scorer = _silhouette_scorer(context['params'], 'trial')
+            studies, search_stats = run_studies(
+                weighted_path, X_weight, n_trials, n_workers, _run_dir(context), trial_scorer
+            )
+            for stat_name, value in search_stats.items():
+                mlflow.log_metric(stat_name, value)
+            logger.info(f"Optuna search: {search_stats}")
             results = {}
             best_params = {}
             
-            for algo_name, objective in algorithms.items():
-                study = optuna.create_study(direction='maximize')
-                study.optimize(objective, n_trials=n_trials)
+            for algo_name, study in studies.items():
                 results[algo_name] = float(study.best_value)
                 best_params[algo_name] = study.best_params
                 
@@ -457,8 +476,10 @@ def train_model(**context):
             
             # Calculate metrics for current model
             labels = model.predict(X_weight)
+            silhouette = _silhouette_scorer(context['params'], 'final')(X_weight, labels)
+            _log_silhouette(silhouette)
             current_metrics = {
-                'silhouette_score': float(silhouette_score(X_weight, labels)),
+                'silhouette_score': float(silhouette.score),
                 'calinski_harabasz_score': float(calinski_harabasz_score(X_weight, labels)),
                 'davies_bouldin_score': float(davies_bouldin_score(X_weight, labels)),
                 'training_data_size': float(len(X_weight))
@@ -535,7 +556,7 @@ def evaluate_model(**context):
             if not os.path.exists(weighted_path):
                 raise FileNotFoundError(f"Preprocessed data file not found at {weighted_path}")
                 
-            X_weight = pd.read_csv(weighted_path)
+            X_weight = _read_frame(weighted_path)
             
             # --- Log training data size --- #
             training_data_size = len(X_weight)
@@ -547,7 +568,9 @@ def evaluate_model(**context):
             labels = model.predict(X_weight)
             
             # Calculate metrics
-            silhouette = float(silhouette_score(X_weight, labels))
+            estimate = _silhouette_scorer(context['params'], 'evaluate')(X_weight, labels)
+            _log_silhouette(estimate)
+            silhouette = float(estimate.score)
             calinski = float(calinski_harabasz_score(X_weight, labels))
             davies = float(davies_bouldin_score(X_weight, labels))
             
@@ -641,7 +664,10 @@ def monitor_model_performance(**context):
             # Only compare with previous run if it exists and has required metrics
             if len(runs) > 1:
                 previous_run = runs[1]
-                if all(metric in previous_run.data.metrics for metric in required_metrics):
+                if not _comparable_silhouette(previous_run) or not _comparable_silhouette(latest_run):
+                    logger.warning("Silhouette scores of the two runs are not comparable. Skipping degradation comparison.")
+                    mlflow.log_metric("silhouette_method_mismatch", 1.0)
+                elif all(metric in previous_run.data.metrics for metric in required_metrics):
                     previous_metrics = {
                         'silhouette': float(previous_run.data.metrics['silhouette_score']),
                         'calinski': float(previous_run.data.metrics['calinski_harabasz_score']),
@@ -678,8 +704,28 @@ def monitor_model_performance(**context):
         logger.error(f"Error in performance monitoring: {str(e)}")
         raise
 
+def _prune_model_versions(versions_dir, keep, active_version):
+    """Remove old model versions, always keeping the active one and the newest `keep`."""
+    versions = sorted(
+        (name for name in os.listdir(versions_dir) if not name.startswith('.')),
+        reverse=True
+    )
+    for name in versions[keep:]:
+        if name != active_version:
+            shutil.rmtree(os.path.join(versions_dir, name), ignore_errors=True)
+            logger.info(f"Removed old model version {name}")
+
+def _notify_model_deployed(version):
+    """Ask the API to reload now; the API's file watch and polling cover a failed call."""
+    try:
+        response = requests.post(f"{FASTAPI_URL}/models/reload", timeout=30)
+        response.raise_for_status()
+        logger.info(f"API notified of model version {version}: {response.json()}")
+    except Exception as e:
+        logger.warning(f"Could not notify API of model version {version}: {str(e)}")
+
 def deploy_model(**context):
-    """Deploy the best model."""
+    """Deploy the best model into a new version directory and atomically switch to it."""
     try:
         # Get model URI from train_model task
         model_uri = context['ti'].xcom_pull(task_ids='train_model')
@@ -689,28 +735,38 @@ def deploy_model(**context):
         # Load model from MLflow
         model = mlflow.sklearn.load_model(model_uri)
         
-        # Save model to production location
+        # Each deployment gets its own immutable directory under /app/models/versions
         prod_path = "/app/models"
+        versions_dir = os.path.join(prod_path, "versions")
+        os.makedirs(versions_dir, exist_ok=True)
+        
+        run_id = model_uri.split('/')[1] if model_uri.startswith('runs:/') else 'model'
+        version = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S')}-{run_id[:8]}"
+        staging_path = os.path.join(versions_dir, f".{version}.staging")
+        version_path = os.path.join(versions_dir, version)
         
-        # Clean up existing model files if they exist
-        if os.path.exists(prod_path):
-            logger.info(f"Cleaning up existing model files in {prod_path}")
-            for item in os.listdir(prod_path):
-                item_path = os.path.join(prod_path, item)
-                if os.path.isfile(item_path):
-                    os.remove(item_path)
-                elif os.path.isdir(item_path):
-                    import shutil
-                    shutil.rmtree(item_path)
+        # Write model, matching scaler and deployment metadata, then publish the directory
+        mlflow.sklearn.save_model(model, staging_path)
+        scaler_path = context['ti'].xcom_pull(task_ids='preprocess_data', key='scaler_path')
+        shutil.copy2(scaler_path, os.path.join(staging_path, "scaler.pkl"))
+        with open(os.path.join(staging_path, "deployment.json"), 'w') as f:
+            json.dump({
+                'version': version,
+                'model_uri': model_uri,
+                'deployed_at': time.time()
+            }, f)
+        os.rename(staging_path, version_path)
         
-        # Create fresh directory
-        os.makedirs(prod_path, exist_ok=True)
+        # Atomically repoint /app/models/current at the new version
+        tmp_link = os.path.join(prod_path, f".current.{version}")
+        os.symlink(os.path.join("versions", version), tmp_link)
+        os.replace(tmp_link, os.path.join(prod_path, "current"))
         
-        # Save model to production location
-        mlflow.sklearn.save_model(model, prod_path)
+        _prune_model_versions(versions_dir, int(context['params'].get('keep_model_versions', 3)), version)
                         
-        logger.info(f"Model deployed successfully to {prod_path}")
-        return True
+        logger.info(f"Model version {version} deployed successfully to {version_path}")
+        _notify_model_deployed(version)
+        return version
     except Exception as e:
         logger.error(f"Error in model deployment: {str(e)}")
         raise
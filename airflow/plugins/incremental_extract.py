@@ -0,0 +1,188 @@
+"""
+Incremental extraction of the training columns into a local snapshot.
+Each run reads only the documents whose watermark column (uploadedDate by
+default) is at or after the last watermark minus a lookback window, pages
+through them with keyset pagination, and upserts them into a Parquet
+snapshot partitioned by a hash of the id. A full refresh rewrites the
+snapshot when there is no state yet, when the watermark column changes, and
+periodically.
+
+An incremental read never sees rows deleted upstream: they stay in the
+snapshot, and in the training data, until the next full refresh rewrites it.
+The refresh interval bounds how long that lasts.
+"""
+
+import fcntl
+import glob
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from plagiarism_features import max_similarity
+
+SNAPSHOT_PARTITIONS = 16
+
+
+def load_extract_state(snapshot_dir):
+    """Watermark and last full refresh of the local snapshot; empty when there is none."""
+    try:
+        with open(os.path.join(snapshot_dir, "_state.json")) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def save_extract_state(snapshot_dir, state):
+    tmp_path = os.path.join(snapshot_dir, "_state.json.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, os.path.join(snapshot_dir, "_state.json"))
+
+def fetch_documents(supabase, columns, watermark_column, since, page_size) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Yield pages of documents ordered by (watermark, id) using keyset pagination.
+
+    Each page starts strictly after the last (watermark, id) of the previous one,
+    so pages stay cheap at any depth and rows sharing a timestamp are not skipped.
+    Cursor values are double-quoted in the PostgREST filter because timestamps
+    contain reserved characters (``.`` and ``:``).
+    """
+    cursor = None
+    while True:
+        query = (
+            supabase.table("documents").select(",".join(columns))
+            .not_.is_(watermark_column, "null")
+            .order(watermark_column).order("id").limit(page_size)
+        )
+        if cursor is not None:
+            value, last_id = cursor
+            query = query.or_(
+                f'{watermark_column}.gt."{value}",and({watermark_column}.eq."{value}",id.gt."{last_id}")'
+            )
+        elif since is not None:
+            query = query.gte(watermark_column, since)
+        rows = query.execute().data
+        if not rows:
+            return
+        yield rows
+        if len(rows) < page_size:
+            return
+        cursor = (rows[-1][watermark_column], rows[-1]["id"])
+
+def snapshot_partition(ids, partitions=SNAPSHOT_PARTITIONS):
+    return pd.util.hash_pandas_object(ids.astype(str), index=False) % partitions
+
+def merge_snapshot(snapshot_dir, delta, full_refresh, partitions=SNAPSHOT_PARTITIONS):
+    """Upsert delta rows into the id-hash partitioned snapshot; returns partitions written."""
+    written = 0
+    assigned = snapshot_partition(delta['id'], partitions) if len(delta) else pd.Series(dtype='int64')
+    for partition in range(partitions):
+        path = os.path.join(snapshot_dir, f"part-{partition:03d}.parquet")
+        rows = delta[assigned.values == partition] if len(delta) else delta
+        if rows.empty and not full_refresh:
+            continue
+        if not full_refresh and os.path.exists(path):
+            rows = pd.concat([pd.read_parquet(path), rows], ignore_index=True)
+            rows = rows.drop_duplicates(subset='id', keep='last')
+        if rows.empty:
+            if os.path.exists(path):
+                os.remove(path)
+            continue
+        tmp_path = f"{path}.tmp"
+        rows.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        written += 1
+    return written
+
+def plan_extract(state, watermark_column, now, lookback, full_refresh_every) -> Tuple[bool, Optional[str]]:
+    """
+    Decide between a full refresh and an incremental read.
+
+    Returns:
+        Tuple of (full_refresh, since); ``since`` is the lower bound of an
+        incremental read, None for a full refresh or an empty snapshot
+    """
+    last_full = state.get('last_full_refresh')
+    full_refresh = (
+        state.get('watermark_column') != watermark_column
+        or last_full is None
+        or now - datetime.fromisoformat(last_full) > full_refresh_every
+    )
+    since = None
+    if not full_refresh and state.get('watermark'):
+        # Re-read a window before the watermark to catch rows updated after they were first seen
+        since = (pd.Timestamp(state['watermark']) - lookback).isoformat()
+    return full_refresh, since
+
+def read_snapshot(snapshot_dir, columns):
+    part_paths = sorted(glob.glob(os.path.join(snapshot_dir, "part-*.parquet")))
+    if not part_paths:
+        return pd.DataFrame(columns=columns)
+    return pd.concat([pd.read_parquet(path) for path in part_paths], ignore_index=True)
+
+def update_snapshot(supabase, snapshot_dir, columns, watermark_column='uploadedDate', page_size=1000,
+                    lookback=timedelta(hours=24), full_refresh_every=timedelta(days=7), now=None):
+    """
+    Bring the snapshot up to date and return its full contents.
+
+    Args:
+        supabase: Supabase client
+        snapshot_dir: Directory of the partitioned snapshot and its state
+        columns: Columns to extract, including ``id``, ``plagiarism`` and the watermark column
+        watermark_column: Timestamp column that orders and bounds incremental reads
+        page_size: Rows per request
+        lookback: Window re-read before the watermark on incremental runs
+        full_refresh_every: Maximum age of the last full refresh
+        now: Current UTC time (naive), defaults to ``datetime.utcnow()``
+
+    Returns:
+        Tuple of (snapshot DataFrame, transfer statistics)
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    # One extraction at a time may touch the shared snapshot
+    with open(os.path.join(snapshot_dir, ".lock"), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        state = load_extract_state(snapshot_dir)
+        now = now or datetime.utcnow()
+        full_refresh, since = plan_extract(state, watermark_column, now, lookback, full_refresh_every)
+
+        pages = []
+        rows_transferred = 0
+        bytes_transferred = 0
+        for rows in fetch_documents(supabase, columns, watermark_column, since, page_size):
+            pages.append(pd.DataFrame(rows, columns=columns))
+            rows_transferred += len(rows)
+            bytes_transferred += len(json.dumps(rows, default=str))
+        delta = pd.concat(pages, ignore_index=True) if pages else pd.DataFrame(columns=columns)
+
+        # jsonb values become JSON text so the snapshot has a fixed schema
+        delta['plagiarism'] = delta['plagiarism'].map(
+            lambda v: v if v is None or isinstance(v, str) else json.dumps(v)
+        )
+        # The training feature is materialized once per changed row, not on every preprocess
+        delta['max_similarity'] = max_similarity(delta['plagiarism'])
+        partitions_written = merge_snapshot(snapshot_dir, delta, full_refresh)
+
+        watermark = state.get('watermark')
+        if len(delta):
+            latest = pd.to_datetime(delta[watermark_column], utc=True).max()
+            if watermark is not None and not full_refresh:
+                latest = max(latest, pd.Timestamp(watermark))
+            watermark = latest.isoformat()
+        save_extract_state(snapshot_dir, {
+            'watermark': watermark,
+            'watermark_column': watermark_column,
+            'last_full_refresh': now.isoformat() if full_refresh else state.get('last_full_refresh'),
+        })
+        df = read_snapshot(snapshot_dir, columns)
+
+    return df, {
+        'full_refresh': full_refresh,
+        'since': since,
+        'rows_transferred': rows_transferred,
+        'bytes_transferred': bytes_transferred,
+        'pages_fetched': len(pages),
+        'partitions_written': partitions_written,
+    }
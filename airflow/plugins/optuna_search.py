@@ -0,0 +1,200 @@
+"""
+Optuna hyperparameter search for the clustering models.
+Every algorithm gets its own study in a run-scoped journal file, and the
+trials can be spread over a pool of worker processes that coordinate through
+that journal. Workers are started with ``spawn``: training runs inside an
+active MLflow run in a process that already has threads, and forking such a
+process can copy locks held by those threads. Spawned workers import only
+this module and re-read the features from the memory-mapped hand-off file.
+"""
+
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import optuna
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from sklearn.cluster import BisectingKMeans, KMeans
+from sklearn.mixture import GaussianMixture
+
+from silhouette_scoring import score_silhouette
+
+logger = logging.getLogger(__name__)
+
+
+def _trial_silhouette(trial, X_weight, labels, scorer):
+    estimate = scorer(X_weight, labels)
+    trial.set_user_attr('silhouette_ci', [estimate.lower, estimate.upper])
+    return float(estimate.score)
+
+def objective_kmeans(trial, X_weight, scorer=score_silhouette):
+    n_clusters = trial.suggest_int('n_clusters', 2, 3)
+    init_method = trial.suggest_categorical('init', ['k-means++', 'random'])
+    n_init = trial.suggest_int('n_init', 1, 10)
+    max_iter = trial.suggest_int('max_iter', 100, 1000)
+    algorithm = trial.suggest_categorical('algorithm', ['lloyd', 'elkan'])
+    random_state = trial.suggest_int('random_state', 0, 1000)
+
+    model = KMeans(
+        n_clusters=n_clusters,
+        init=init_method,
+        n_init=n_init,
+        max_iter=max_iter,
+        algorithm=algorithm,
+        random_state=random_state
+    )
+
+    try:
+        labels = model.fit_predict(X_weight)
+        if len(set(labels)) <= 1:
+            return -1.0
+        return _trial_silhouette(trial, X_weight, labels, scorer)
+    except Exception:
+        return -1.0
+
+def objective_bisecting_kmeans(trial, X_weight, scorer=score_silhouette):
+    n_clusters = trial.suggest_int('n_clusters', 2, 3)
+    init = trial.suggest_categorical('init', ['k-means++', 'random'])
+    n_init = trial.suggest_int('n_init', 1, 10)
+    max_iter = trial.suggest_int('max_iter', 100, 1000)
+    random_state = trial.suggest_int('random_state', 0, 1000)
+
+    model = BisectingKMeans(
+        n_clusters=n_clusters,
+        init=init,
+        n_init=n_init,
+        max_iter=max_iter,
+        random_state=random_state
+    )
+
+    try:
+        labels = model.fit_predict(X_weight)
+        if len(set(labels)) <= 1:
+            return -1.0
+        return _trial_silhouette(trial, X_weight, labels, scorer)
+    except Exception:
+        return -1.0
+
+def objective_gmm(trial, X_weight, scorer=score_silhouette):
+    n_components = trial.suggest_int('n_components', 2, 3)
+    covariance_type = trial.suggest_categorical('covariance_type', ['full', 'tied', 'diag', 'spherical'])
+    init_params = trial.suggest_categorical('init_params', ['kmeans', 'random'])
+    random_state = trial.suggest_int('random_state', 0, 1000)
+
+    model = GaussianMixture(
+        n_components=n_components,
+        covariance_type=covariance_type,
+        init_params=init_params,
+        random_state=random_state
+    )
+
+    try:
+        labels = model.fit_predict(X_weight)
+        if len(set(labels)) <= 1:
+            return -1.0
+        return _trial_silhouette(trial, X_weight, labels, scorer)
+    except Exception:
+        return -1.0
+
+OPTUNA_OBJECTIVES = {
+    'KMeans': objective_kmeans,
+    'BisectingKMeans': objective_bisecting_kmeans,
+    'GaussianMixture': objective_gmm,
+}
+
+
+def default_workers():
+    """Worker count when none is configured: the CPUs of the machine running the task."""
+    return os.cpu_count() or 1
+
+def optuna_storage(journal_path):
+    """Journal file storage shared by every process working on the same studies."""
+    try:
+        from optuna.storages.journal import JournalFileBackend
+    except ImportError:  # optuna < 4.0
+        from optuna.storages import JournalFileStorage as JournalFileBackend
+    return optuna.storages.JournalStorage(JournalFileBackend(journal_path))
+
+def split_trials(n_trials, parts):
+    """Split n_trials into `parts` near-equal positive shares."""
+    parts = max(1, min(parts, n_trials))
+    return [n_trials // parts + (1 if i < n_trials % parts else 0) for i in range(parts)]
+
+def _read_features(path):
+    """Read the feature hand-off file; Arrow IPC files are memory-mapped."""
+    if path.endswith(".parquet"):
+        return pq.read_table(path, memory_map=True).to_pandas()
+    return feather.read_table(path, memory_map=True).to_pandas()
+
+def _timed_objective(objective, X_weight, scorer):
+    """Wrap an objective to record each trial's CPU seconds, which contention does not inflate."""
+    def run(trial):
+        started = time.process_time()
+        try:
+            return objective(trial, X_weight, scorer)
+        finally:
+            trial.set_user_attr('cpu_seconds', time.process_time() - started)
+    return run
+
+def _optimize_study(algo_name, journal_path, features_path, n_trials, scorer):
+    """Run a share of one algorithm's trials; executed in a worker process."""
+    from threadpoolctl import threadpool_limits
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    X_weight = _read_features(features_path)
+    study = optuna.load_study(study_name=algo_name, storage=optuna_storage(journal_path))
+    # One BLAS/OpenMP thread per worker; the parallelism comes from the processes
+    with threadpool_limits(limits=1):
+        study.optimize(_timed_objective(OPTUNA_OBJECTIVES[algo_name], X_weight, scorer), n_trials=n_trials)
+
+def run_studies(features_path, X_weight, n_trials, n_workers, run_dir, scorer=score_silhouette):
+    """
+    Run every algorithm's Optuna study, in parallel when n_workers > 1.
+
+    All studies share one pool: each is split into up to n_workers shares of
+    trials, and the worker processes coordinate through a run-scoped journal
+    storage so TPE sees every finished trial. The scorer is sent to the
+    workers, so it must be picklable (a module-level function or a partial
+    of one).
+
+    Returns:
+        Tuple of (studies by algorithm name, search statistics). The serial
+        time and speedup are estimates from the trials' summed CPU time, not
+        a serial run; benchmarks/optuna_search.py measures both.
+    """
+    journal_path = os.path.join(run_dir, "optuna.journal")
+    if os.path.exists(journal_path):
+        os.remove(journal_path)  # a retried task starts a fresh search
+    storage = optuna_storage(journal_path)
+    for algo_name in OPTUNA_OBJECTIVES:
+        optuna.create_study(direction='maximize', study_name=algo_name, storage=storage)
+
+    started = time.perf_counter()
+    if n_workers == 1:
+        for algo_name, objective in OPTUNA_OBJECTIVES.items():
+            study = optuna.load_study(study_name=algo_name, storage=storage)
+            study.optimize(_timed_objective(objective, X_weight, scorer), n_trials=n_trials)
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+            jobs = [
+                pool.submit(_optimize_study, algo_name, journal_path, features_path, share, scorer)
+                for algo_name in OPTUNA_OBJECTIVES
+                for share in split_trials(n_trials, n_workers)
+            ]
+            for job in jobs:
+                job.result()
+    wall_seconds = time.perf_counter() - started
+
+    studies = {name: optuna.load_study(study_name=name, storage=storage) for name in OPTUNA_OBJECTIVES}
+    trial_seconds = sum(
+        trial.user_attrs.get('cpu_seconds', 0.0) for study in studies.values() for trial in study.trials
+    )
+    return studies, {
+        'optuna_workers': float(n_workers),
+        'optuna_trials': float(sum(len(study.trials) for study in studies.values())),
+        'optuna_wall_seconds': wall_seconds,
+        'optuna_serial_seconds_estimate': trial_seconds,
+        'optuna_speedup_estimate': trial_seconds / wall_seconds if wall_seconds > 0 else 1.0,
+    }
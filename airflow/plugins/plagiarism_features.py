@@ -0,0 +1,33 @@
+"""
+Numeric plagiarism feature for the training pipeline.
+Uploads store plagiarism as a {name: similarity} object per document (jsonb,
+or its text form in older rows). The model only needs the highest
+similarity, so this module reduces a whole column of payloads to that number
+with Arrow string kernels instead of parsing rows one by one.
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Payloads are split after every closing key quote; the score is the number
+# that starts each following piece, so names may contain commas or colons
+PLAGIARISM_KEY_END_PATTERN = r"""(?:^|[^\\])["']\s*:\s*"""
+PLAGIARISM_SCORE_PATTERN = r"^(?P<score>-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)"
+
+
+def max_similarity(payloads):
+    """
+    Highest similarity score in each plagiarism payload, vectorized with Arrow kernels.
+
+    Payloads are {name: score} objects (or lists of them) as JSON or Python-repr
+    text; empty, missing or unparseable payloads score 0.0, as do negative scores.
+    """
+    text = pa.array(payloads.astype(object).where(payloads.notna(), None), type=pa.string())
+    pieces = pc.list_slice(pc.split_pattern_regex(text, PLAGIARISM_KEY_END_PATTERN), 1)
+    scores = pc.extract_regex(pc.list_flatten(pieces), PLAGIARISM_SCORE_PATTERN)
+    scores = pc.cast(pc.struct_field(scores, [0]), pa.float64()).to_numpy(zero_copy_only=False)
+    best = pd.Series(scores).groupby(pc.list_parent_indices(pieces).to_numpy()).max()
+    best = best.reindex(np.arange(len(payloads))).fillna(0.0).clip(lower=0.0)
+    return pd.Series(best.to_numpy(dtype='float64'), index=payloads.index)
@@ -0,0 +1,147 @@
+"""
+Component registry for heavy application dependencies.
+Models and external clients are registered with a factory instead of being
+created at import time. Eager components load in parallel background threads
+during startup, lazy ones on first use, and endpoints declare which components
+they need so they answer 503 until those are ready.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Set
+
+from app.core.exceptions import ComponentNotReadyError
+from app.utils.metrics import COMPONENT_READY, STARTUP_PHASE_DURATION
+
+logger = logging.getLogger(__name__)
+
+
+class ComponentRegistry:
+    """Lazily or concurrently initialized named components."""
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._eager: Dict[str, bool] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._instances: Dict[str, Any] = {}
+        self._errors: Dict[str, str] = {}
+        self._loading: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def register(self, name: str, factory: Callable[[], Any], eager: bool = True) -> None:
+        """
+        Register a component factory.
+
+        Args:
+            name: Component name used by ``get`` and ``require``
+            factory: Blocking callable that builds the component
+            eager: Start loading in the background at startup instead of on first use
+        """
+        self._factories[name] = factory
+        self._eager[name] = eager
+        self._locks[name] = threading.Lock()
+        COMPONENT_READY.labels(component=name).set(0)
+
+    def _load(self, name: str) -> Any:
+        with self._locks[name]:
+            if name in self._instances:
+                return self._instances[name]
+            self._loading.add(name)
+            started = time.perf_counter()
+            try:
+                instance = self._factories[name]()
+            except Exception as e:
+                self._errors[name] = str(e)
+                self._loading.discard(name)
+                logger.error(f"Failed to initialize component {name}: {str(e)}")
+                raise
+            elapsed = time.perf_counter() - started
+            self._instances[name] = instance
+            self._loading.discard(name)
+            self._errors.pop(name, None)
+            STARTUP_PHASE_DURATION.labels(component=name).set(elapsed)
+            COMPONENT_READY.labels(component=name).set(1)
+            logger.info(f"Component {name} ready in {elapsed:.2f}s")
+            return instance
+
+    def get(self, name: str) -> Any:
+        """Return a component, building it in the calling thread if necessary."""
+        if name in self._instances:
+            return self._instances[name]
+        return self._load(name)
+
+    async def wait(self, name: str) -> Any:
+        """Await a component without blocking the event loop."""
+        if name in self._instances:
+            return self._instances[name]
+        return await asyncio.to_thread(self._load, name)
+
+    def is_ready(self, name: str) -> bool:
+        return name in self._instances
+
+    def _load_in_background(self, name: str) -> None:
+        if name in self._instances or name in self._loading:
+            return
+        # Marked before the load reaches a worker thread, so requests arriving
+        # meanwhile do not queue more threads on the component lock
+        self._loading.add(name)
+
+        async def load():
+            try:
+                await self.wait(name)
+            except Exception:
+                pass  # already logged; the next require() retries
+            finally:
+                self._loading.discard(name)
+
+        task = asyncio.create_task(load())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def start(self) -> None:
+        """Begin loading every eager component concurrently; returns immediately."""
+        for name, eager in self._eager.items():
+            if eager:
+                self._load_in_background(name)
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def require(self, *names: str) -> Callable:
+        """
+        Build a FastAPI dependency that rejects requests until components are ready.
+
+        Args:
+            names: Components the endpoint needs
+
+        Returns:
+            An async dependency raising ComponentNotReadyError (503)
+        """
+        async def dependency() -> None:
+            missing = [name for name in names if not self.is_ready(name)]
+            if not missing:
+                return
+            for name in missing:
+                self._load_in_background(name)
+            raise ComponentNotReadyError(missing)
+
+        return dependency
+
+    def status(self) -> Dict[str, str]:
+        """Readiness of every registered component."""
+        result = {}
+        for name in self._factories:
+            if name in self._instances:
+                result[name] = "ready"
+            elif name in self._loading:
+                result[name] = "loading"
+            elif name in self._errors:
+                result[name] = "error"
+            else:
+                result[name] = "pending"
+        return result
@@ -3,6 +3,7 @@ Configuration settings for the FastAPI application.
 This module handles all environment variables and application settings.
 """
 
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 from typing import Optional
 import os
@@ -19,9 +20,75 @@ class Settings(BaseSettings):
     SUPABASE_KEY: str
     
     # ML Settings
-    PINECONE_API_KEY: str
+    PINECONE_API_KEY: Optional[str] = None  # required only by EMBEDDING_BACKEND=pinecone
     MLFLOW_TRACKING_URI: str = "http://mlflow:5000"
     MODEL_PATH: str = "models/best_model.pkl"
+    PREDICT_BATCH_MAX_ROWS: int = 200000
+    MODEL_POLL_INTERVAL_SECONDS: float = 300.0
+    MODEL_POLL_JITTER: float = 0.2
+    
+    # Plagiarism Settings
+    PLAGIARISM_TOP_K: int = 2
+    VECTOR_INDEX_HNSW_THRESHOLD: int = 20000
+    VECTOR_INDEX_REFRESH_SECONDS: float = 300.0  # 0 disables the periodic reconcile
+    PLAGIARISM_MODE: str = "document"  # "document" or "chunk" (chunk-to-chunk max similarity)
+    
+    # Embedding Settings
+    EMBEDDING_BACKEND: str = "pinecone"  # "pinecone" (remote) or "onnx" (local CPU)
+    EMBEDDING_ONNX_MODEL_PATH: str = "/app/models/multilingual-e5-large-int8/model_quantized.onnx"
+    EMBEDDING_ONNX_TOKENIZER_PATH: str = "/app/models/multilingual-e5-large-int8/tokenizer.json"
+    EMBEDDING_ONNX_THREADS: int = 0
+    EMBEDDING_MAX_LENGTH: int = 512
+    EMBEDDING_MAX_BATCH_SIZE: int = 32
+    EMBEDDING_MAX_BATCH_TOKENS: int = 8192
+    EMBEDDING_MAX_WAIT_MS: float = 5.0
+    
+    # Execution Settings
+    CPU_POOL_WORKERS: int = 2
+    CPU_POOL_QUEUE_SIZE: int = 16
+    IO_POOL_WORKERS: int = 16
+    IO_POOL_QUEUE_SIZE: int = 64
+    PDF_EXTRACT_PROCESSES: int = min(4, max((os.cpu_count() or 1) - 1, 0))
+    PDF_PAGES_PER_TASK: int = 8
+    
+    # Batch Ingestion Settings
+    BATCH_MAX_ITEMS: int = 500
+    CHUNK_EMBED_BATCH_SIZE: int = 96
+    CHUNK_EMBED_CONCURRENCY: int = 4
+    CHUNK_EMBEDDING_DTYPE: str = "int8"  # "int8" or "float16"
+    STORE_CHUNK_EMBEDDINGS: bool = False  # needs app/migrations/001_chunk_embeddings_column.sql; implied by PLAGIARISM_MODE=chunk
+    EMBEDDING_STORAGE_DTYPE: str = "json"  # "json" until app/migrations/002_embedding_text_column.sql, then "float16", "float32" or "int8"
+    
+    # Content Cache Settings
+    CONTENT_CACHE_PATH: str = "/app/data/content_cache.sqlite"
+    CONTENT_CACHE_MEMORY_ITEMS: int = 256
+    CONTENT_CACHE_DISK_MAX_BYTES: int = 1 << 30
+    
+    # LLM Cache Settings
+    LLM_CACHE_MAX_ITEMS: int = 2048
+    LLM_CACHE_TTL_SECONDS: float = 86400.0
+    LLM_SEMANTIC_CACHE_ENABLED: bool = False
+    LLM_SEMANTIC_CACHE_THRESHOLD: float = 0.97
+    LLM_SEMANTIC_CACHE_MAX_ITEMS: int = 1024
+    
+    # LLM Gateway Settings
+    LLM_REQUESTS_PER_MINUTE: float = 30.0
+    LLM_TOKENS_PER_MINUTE: float = 15000.0
+    LLM_REQUEST_BURST: float = 5.0
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_MAX_ATTEMPTS: int = 4
+    LLM_RETRY_BASE_SECONDS: float = 1.0
+    LLM_RETRY_MAX_SECONDS: float = 30.0
+    
+    # Bulk Feedback Settings
+    FEEDBACK_JOB_DB_PATH: str = "/app/data/feedback_jobs.sqlite"
+    BULK_FEEDBACK_CONCURRENCY: int = 4
+    
+    # Summarization Settings
+    SUMMARY_MAP_REDUCE_MIN_CHARS: int = 12000
+    SUMMARY_MAP_WINDOW_CHARS: int = 6000
+    SUMMARY_REDUCE_MAX_CHARS: int = 8000
+    SUMMARY_MAP_CONCURRENCY: int = 4
     
     # Security Settings
     SECRET_KEY: str = os.urandom(32).hex()
@@ -31,6 +98,12 @@ class Settings(BaseSettings):
     ENABLE_METRICS: bool = True
     METRICS_PORT: int = 8000
     
+    @model_validator(mode="after")
+    def check_embedding_backend(self):
+        if self.EMBEDDING_BACKEND == "pinecone" and not self.PINECONE_API_KEY:
+            raise ValueError("PINECONE_API_KEY is required when EMBEDDING_BACKEND is 'pinecone'")
+        return self
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
@@ -4,7 +4,7 @@ This module defines all custom exceptions used throughout the application.
 """
 
 from fastapi import HTTPException, status
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
 class MLPipelineError(HTTPException):
     """Base exception for ML pipeline errors."""
@@ -51,4 +51,34 @@ class MLflowError(MLPipelineError):
         super().__init__(
             detail=detail,
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
-        ) 
\ No newline at end of file
+        )
+
+class ServiceOverloadedError(MLPipelineError):
+    """Raised when a worker pool is saturated and cannot accept more work."""
+    
+    def __init__(self, pool: str, retry_after: int = 5):
+        super().__init__(
+            detail=f"Service is busy ({pool} pool saturated), please retry later",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": str(retry_after)}
+        )
+
+class ComponentNotReadyError(MLPipelineError):
+    """Raised when an endpoint needs a component that is still initializing."""
+    
+    def __init__(self, components: List[str], retry_after: int = 10):
+        super().__init__(
+            detail=f"Service is starting up, waiting for: {', '.join(components)}",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": str(retry_after)}
+        )
+
+class LLMUnavailableError(MLPipelineError):
+    """Raised when the LLM provider keeps rejecting requests after all retries."""
+    
+    def __init__(self, detail: str, retry_after: int = 30):
+        super().__init__(
+            detail=f"LLM provider unavailable: {detail}",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": str(retry_after)}
+        )
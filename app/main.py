@@ -1,33 +1,75 @@
 import os
-import re
 import json
 import numpy as np
-import tempfile
-import shutil
-from fastapi import FastAPI, HTTPException, Form
+from fastapi import FastAPI, HTTPException, Form, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from supabase import create_client
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_pinecone import PineconeEmbeddings
-from gliner import GLiNER
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
-from sklearn.metrics.pairwise import cosine_similarity
-from datetime import datetime
 from prometheus_fastapi_instrumentator import Instrumentator
 import pickle
-from sklearn.preprocessing import StandardScaler
-import pandas as pd
 import warnings
 import logging
 import mlflow
 import mlflow.sklearn
-from app.routers.agent import generate_feedback, AssignmentRequest
-from app.utils.metrics import setup_metrics
+from app.routers.agent import (
+    AssignmentRequest,
+    AssignmentResponse,
+    analyze_relevance,
+    configure_summary_store,
+    generate_feedback,
+    generate_feedback_with_usage,
+    llm_gateway,
+    sse_response,
+    stream_feedback,
+)
+from app.utils.metrics import ML_MODEL_PREDICTIONS, MODEL_VERSION_INFO, setup_metrics
+from app.core.components import ComponentRegistry
+from app.core.config import settings
 from app.core.exceptions import ModelLoadError
+from app.services.batch_ingestion import BatchIngestionPipeline, duplicate_uuids
+from app.services.chunk_embeddings import (
+    CHUNK_EMBEDDINGS_COLUMN,
+    at_storage_precision,
+    decode_chunk_embeddings,
+    embed_texts,
+    encode_chunk_embeddings,
+    pool_embeddings,
+)
+from app.services.clustering import FEATURE_COLUMNS, upload_features
+from app.services.content_cache import CachedArtifacts, ContentCache
+from app.services.embedding_codec import storage_value
+from app.services.embeddings import create_embedding_backend, embedding_model_id
+from app.services.executor import ExecutionLayer
+from app.services.feedback_jobs import FeedbackJobStore, FolderFeedbackJob, TokenUsage
+from app.services.ingestion import (
+    ParsedDocument,
+    build_document,
+    cache_key,
+    download_pdf,
+    extract_entities,
+    fetch_document,
+    fetch_folder_documents,
+    hours_before_deadline,
+    parse_pdf,
+    update_document,
+)
+from app.services.llm_gateway import PRIORITY_BATCH
+from app.services.model_store import (
+    MODELS_ROOT,
+    ModelBundle,
+    build_bundle,
+    current_model_dir,
+    load_bundle,
+    read_version,
+    scaler_path,
+)
+from app.services.model_watcher import ModelReloader
+from app.services.vector_index import VectorIndexRegistry, parse_embedding
+from app.utils.tracking import EXPERIMENT_NAME, TrackingRun
+from collections import defaultdict
 from contextlib import asynccontextmanager
-from pydantic import BaseModel
-from typing import List, Dict, Any
+from pydantic import BaseModel, model_validator
+from typing import List, Dict, Any, Optional, Tuple
 from mlflow.tracking import MlflowClient
 import asyncio
 
@@ -44,9 +86,8 @@ load_dotenv()
 MODEL_NAME = "document-clustering"
 MLFLOW_TRACKING_URI = os.getenv("MLFLOW_TRACKING_URI", "http://mlflow:5000")
 
-# Initialize MLflow
+# Initialize MLflow (the experiment is resolved by the "mlflow" component at startup)
 mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
-mlflow.set_experiment("document-processing")
 
 class PredictionInput(BaseModel):
     sentences: int
@@ -54,21 +95,63 @@ class PredictionInput(BaseModel):
     timing: int
     plagiarism: float
 
+class BatchPredictionInput(BaseModel):
+    """Either row-wise ``inputs`` or the four feature columns as parallel arrays."""
+    inputs: Optional[List[PredictionInput]] = None
+    sentences: Optional[List[float]] = None
+    page: Optional[List[float]] = None
+    timing: Optional[List[float]] = None
+    plagiarism: Optional[List[float]] = None
+
+    @model_validator(mode="after")
+    def check_shape(self):
+        columns = [self.sentences, self.page, self.timing, self.plagiarism]
+        if self.inputs is not None:
+            if any(column is not None for column in columns):
+                raise ValueError("Provide either 'inputs' or feature columns, not both")
+        elif any(column is None for column in columns):
+            raise ValueError("Provide 'inputs' or all of 'sentences', 'page', 'timing' and 'plagiarism'")
+        elif len({len(column) for column in columns}) != 1:
+            raise ValueError("Feature columns must have the same length")
+        return self
+
+    def to_array(self) -> np.ndarray:
+        if self.inputs is not None:
+            return np.array(
+                [[row.sentences, row.page, row.timing, row.plagiarism] for row in self.inputs],
+                dtype=np.float64
+            ).reshape(-1, len(FEATURE_COLUMNS))
+        return np.column_stack([
+            np.asarray(getattr(self, column), dtype=np.float64) for column in FEATURE_COLUMNS
+        ])
+
+class BatchPredictionOutput(BaseModel):
+    clusters: List[int]
+    confidence: List[float]
+    metadata: Dict[str, Any]
+
+class UploadItem(BaseModel):
+    uuid: str
+    file_url: str
+
+class BatchUploadRequest(BaseModel):
+    items: List[UploadItem]
+
 class PredictionOutput(BaseModel):
     cluster: int
     confidence: float
     metadata: Dict[str, Any]
 
-def load_best_model():
+def load_best_model() -> ModelBundle:
     try:
-        model_path = "/app/models"
+        model_path = current_model_dir()
         if not os.path.exists(model_path):
-            logger.warning("Model directory not found at /app/models")
-            raise ModelLoadError("Model directory not found")
+            logger.warning(f"Model directory not found at {model_path}")
+            raise ModelLoadError(model_path)
             
-        model = mlflow.sklearn.load_model(model_path)
-        logger.info(f"Successfully loaded model from {model_path}")
-        return model
+        bundle = load_bundle(model_path)
+        logger.info(f"Successfully loaded model version {bundle.version} from {model_path}")
+        return bundle
         
     except Exception as e:
         logger.error(f"Error loading model from shared volume: {str(e)}")
@@ -76,12 +159,6 @@ def load_best_model():
 
 def load_local_model():
     try:
-        model_path = "/app/models"
-        if os.path.exists(model_path) and os.path.isdir(model_path):
-            logger.info(f"Loading model from MLflow structure at {model_path}")
-            model = mlflow.sklearn.load_model(model_path)
-            return model
-            
         local_model_path = "/app/models/local_model.pkl"
         if os.path.exists(local_model_path) and os.path.isfile(local_model_path):
             logger.info(f"Loading model from pickle file {local_model_path}")
@@ -89,7 +166,7 @@ def load_local_model():
                 model = pickle.load(f)
             return model
             
-        logger.warning("No model found in expected locations (/app/models or /app/models/local_model.pkl)")
+        logger.warning("No model found in expected location (/app/models/local_model.pkl)")
         raise ModelLoadError("No model available locally")
     except Exception as e:
         logger.error(f"Error loading local model: {str(e)}")
@@ -97,115 +174,108 @@ def load_local_model():
 
 def load_scaler():
     try:
-        scaler_path = "/mlflow/artifacts/scaler.pkl"
-        if not os.path.exists(scaler_path):
-            logger.error(f"Scaler file not found at {scaler_path}")
-            raise FileNotFoundError(f"Scaler file not found at {scaler_path}")
+        # The scaler deployed with the current model, not a shared path that training overwrites
+        path = scaler_path(current_model_dir())
+        if not os.path.exists(path):
+            logger.error(f"Scaler file not found at {path}")
+            raise FileNotFoundError(f"Scaler file not found at {path}")
             
-        with open(scaler_path, 'rb') as f:
+        with open(path, 'rb') as f:
             scaler = pickle.load(f)
-            logger.info(f"Successfully loaded scaler from {scaler_path}")
+            logger.info(f"Successfully loaded scaler from {path}")
             return scaler
     except Exception as e:
         logger.error(f"Error loading scaler: {str(e)}")
         raise
 
-def check_for_new_model():
+def check_for_new_model(current_version: Optional[str]) -> Optional[str]:
+    """Return the deployed model directory if it holds a different version than the one being served."""
     try:
-        client = MlflowClient()
-        experiment = client.get_experiment_by_name("document-processing")
-        if not experiment:
-            return None
-            
-        # Get all runs with model evaluation
-        runs = client.search_runs(
-            experiment_ids=[experiment.experiment_id],
-            filter_string="tags.mlflow.runName = 'model_evaluation'",
-            max_results=10
-        )
-        
-        if not runs:
+        model_dir = current_model_dir()
+        if not os.path.exists(os.path.join(model_dir, "MLmodel")):
             return None
-            
-        # Get the latest run
-        latest_run = runs[0]
-        latest_model_path = latest_run.info.artifact_uri + "/model"
-        
-        # Check if this is different from current model
-        current_model_path = "/app/models"
-        if not os.path.exists(current_model_path):
-            return latest_model_path
-            
-        # Compare model versions or timestamps
-        current_model_time = os.path.getmtime(current_model_path)
-        latest_model_time = latest_run.info.end_time / 1000  # Convert to seconds
-        
-        if latest_model_time > current_model_time:
-            return latest_model_path
-            
+        if read_version(model_dir) != current_version:
+            return model_dir
         return None
     except Exception as e:
         logger.error(f"Error checking for new model: {str(e)}")
         return None
 
-def reload_model_and_scaler(app: FastAPI):
-    try:
-        new_model_path = check_for_new_model()
-        if new_model_path:
-            logger.info(f"New model found at {new_model_path}")
-            
-            # Load new model
-            model = mlflow.sklearn.load_model(new_model_path)
-            app.state.model = model
-            logger.info("Model reloaded successfully")
-            
-            scaler = load_scaler()
-            app.state.scaler = scaler
-            logger.info("Scaler reloaded successfully")
-            
-            return True
-    except Exception as e:
-        logger.error(f"Error reloading model: {str(e)}")
-    return False
-
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    logger.info("Starting up the application...")
-    try:
-        model = load_best_model()
-        logger.info("MLflow model loaded successfully")
-        
-        scaler = load_scaler()
-        logger.info("Scaler loaded successfully")
-        
-        # Store in app state
-        app.state.model = model
-        app.state.scaler = scaler
-        
-        async def check_model_updates():
-            while True:
-                await asyncio.sleep(300)
-                reload_model_and_scaler(app)
-        
-        asyncio.create_task(check_model_updates())
+def activate_bundle(app: FastAPI, bundle: Optional[ModelBundle]):
+    # A single reference assignment: requests see either the old or the new bundle, never a mix
+    app.state.bundle = bundle
+    if bundle is not None:
+        MODEL_VERSION_INFO.info({"version": bundle.version, "model_type": type(bundle.model).__name__})
+        logger.info(f"Serving model version {bundle.version}")
+
+def reload_model_and_scaler(app: FastAPI) -> Optional[ModelBundle]:
+    """Load and activate the deployed model if it changed; returns the new bundle."""
+    current = getattr(app.state, "bundle", None)
+    new_model_dir = check_for_new_model(current.version if current else None)
+    if new_model_dir:
+        logger.info(f"New model found at {new_model_dir}")
         
+        # Load, compile and warm up before swapping
+        bundle = load_bundle(new_model_dir)
+        activate_bundle(app, bundle)
+        logger.info("Model and scaler reloaded successfully")
+        return bundle
+    return None
+
+def load_initial_model(app: FastAPI) -> Optional[ModelBundle]:
+    """Load the deployed model, falling back to the local pickle; raises if neither is available."""
+    try:
+        bundle = load_best_model()
+        logger.info("MLflow model and scaler loaded successfully")
     except Exception as e:
         logger.warning(f"Failed to load model from MLflow: {str(e)}")
         try:
             model = load_local_model()
             logger.info("Local model loaded successfully")
-            app.state.model = model
+            scaler = load_scaler()
+            logger.info("Scaler loaded successfully")
+            bundle = build_bundle(model, scaler, version="local", scaler_path=scaler_path(current_model_dir()))
         except Exception as local_e:
             logger.error(f"Failed to load local model: {str(local_e)}")
-            app.state.model = None
-            
+            raise
+    # The reloader may already have activated a newer deployment in the meantime
+    if getattr(app.state, "bundle", None) is None:
+        activate_bundle(app, bundle)
+    return app.state.bundle
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("Starting up the application...")
+    app.state.bundle = None
+
+    async def maintain_vector_index():
         try:
-            scaler = load_scaler()
-            logger.info("Scaler loaded successfully")
-            app.state.scaler = scaler
-        except Exception as scaler_e:
-            logger.error(f"Failed to load scaler: {str(scaler_e)}")
-            app.state.scaler = None
+            supabase = await components.wait("supabase")
+            await asyncio.to_thread(vector_index.rebuild, supabase)
+        except Exception as e:
+            logger.error(f"Failed to rebuild vector index: {str(e)}")
+            return
+        # Pick up deletions and rows written by other workers
+        while settings.VECTOR_INDEX_REFRESH_SECONDS > 0:
+            await asyncio.sleep(settings.VECTOR_INDEX_REFRESH_SECONDS)
+            try:
+                await asyncio.to_thread(vector_index.refresh, supabase)
+            except Exception as e:
+                logger.error(f"Failed to refresh vector index: {str(e)}")
+
+    # Heavy components load concurrently in the background so the port binds immediately
+    components.register("model", lambda: load_initial_model(app))
+    components.start()
+    vector_index_task = asyncio.create_task(maintain_vector_index())
+    
+    # React to deployments via the filesystem watch, with jittered polling as fallback
+    app.state.model_reloader = ModelReloader(
+        lambda: reload_model_and_scaler(app),
+        watch_root=MODELS_ROOT,
+        poll_interval=settings.MODEL_POLL_INTERVAL_SECONDS,
+        poll_jitter=settings.MODEL_POLL_JITTER,
+    )
+    app.state.model_reloader.start()
     
     yield
     
@@ -213,8 +283,20 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down the application...")
     
     # Cleanup
-    app.state.model = None
-    app.state.scaler = None
+    await app.state.model_reloader.stop()
+    vector_index_task.cancel()
+    await components.stop()
+    for job_task in feedback_job_tasks.values():
+        job_task.cancel()
+    await asyncio.gather(*feedback_job_tasks.values(), return_exceptions=True)
+    await llm_gateway.close()
+    embeddings = components.get("embeddings") if components.is_ready("embeddings") else None
+    if hasattr(embeddings, "close"):
+        embeddings.close()
+    execution.shutdown()
+    content_cache.close()
+    feedback_store.close()
+    app.state.bundle = None
 
 app = FastAPI(
     title="FastAPI ML Document Processing",
@@ -238,10 +320,52 @@ instrumentator.instrument(app).expose(app)
 setup_metrics(app)
 
 # Initialize services
-supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
-model = GLiNER.from_pretrained("urchade/gliner_medium-v2.1")
-labels = ["Name", "ID"]
-embeddings = PineconeEmbeddings(model="multilingual-e5-large")
+EMBEDDING_MODEL = embedding_model_id(settings)
+
+def create_supabase_client():
+    from supabase import create_client
+    return create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+
+def load_ner_model():
+    from gliner import GLiNER
+    return GLiNER.from_pretrained("urchade/gliner_medium-v2.1")
+
+def create_embeddings():
+    return create_embedding_backend(settings)
+
+def init_mlflow_experiment():
+    return mlflow.set_experiment(EXPERIMENT_NAME)
+
+components = ComponentRegistry()
+components.register("supabase", create_supabase_client)
+components.register("ner_model", load_ner_model)
+components.register("embeddings", create_embeddings)
+components.register("mlflow", init_mlflow_experiment)
+
+INGESTION_COMPONENTS = ("supabase", "ner_model", "embeddings")
+content_cache = ContentCache(
+    settings.CONTENT_CACHE_PATH,
+    memory_items=settings.CONTENT_CACHE_MEMORY_ITEMS,
+    disk_max_bytes=settings.CONTENT_CACHE_DISK_MAX_BYTES,
+)
+configure_summary_store(content_cache)
+feedback_store = FeedbackJobStore(settings.FEEDBACK_JOB_DB_PATH)
+feedback_jobs: Dict[str, FolderFeedbackJob] = {}
+feedback_job_tasks: Dict[str, asyncio.Task] = {}
+feedback_job_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+# The chunkEmbeddings column only exists once its migration has been applied
+store_chunk_embeddings = settings.STORE_CHUNK_EMBEDDINGS or settings.PLAGIARISM_MODE == "chunk"
+vector_index = VectorIndexRegistry(
+    hnsw_threshold=settings.VECTOR_INDEX_HNSW_THRESHOLD,
+    chunk_mode=settings.PLAGIARISM_MODE == "chunk",
+)
+execution = ExecutionLayer(
+    cpu_workers=settings.CPU_POOL_WORKERS,
+    cpu_queue=settings.CPU_POOL_QUEUE_SIZE,
+    io_workers=settings.IO_POOL_WORKERS,
+    io_queue=settings.IO_POOL_QUEUE_SIZE,
+    process_workers=settings.PDF_EXTRACT_PROCESSES,
+)
 # pc = Pinecone(api_key=os.environ["PINECONE_API_KEY"])
 
 # Main route
@@ -254,31 +378,27 @@ def read_root():
 def health_check():
     try:
         # Check MLflow connection
-        mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
         client = MlflowClient()
         try:
             # Try to get experiment instead of list_experiments
-            experiment = client.get_experiment_by_name("document-processing")
+            experiment = client.get_experiment_by_name(EXPERIMENT_NAME)
             mlflow_status = "connected" if experiment is not None else "connecting"
         except Exception as mlflow_error:
             logger.warning(f"MLflow connection issue: {str(mlflow_error)}")
             mlflow_status = "connecting"
         
-        # Try to load model, but don't fail if not available yet
-        try:
-            model = load_best_model()
-            model_status = "loaded"
-        except Exception as model_error:
-            logger.warning(f"Model not loaded yet: {str(model_error)}")
-            model_status = "loading"
+        # Report the served model, but don't fail if not available yet
+        bundle = getattr(app.state, "bundle", None)
+        model_status = "loaded" if bundle is not None else "loading"
         
-        # Check Supabase connection
-        try:
-            supabase.table("documents").select("count").limit(1).execute()
-            supabase_status = "connected"
-        except Exception as supabase_error:
-            logger.warning(f"Supabase connection issue: {str(supabase_error)}")
-            supabase_status = "connecting"
+        # Check Supabase connection once the client exists
+        supabase_status = "connecting"
+        if components.is_ready("supabase"):
+            try:
+                components.get("supabase").table("documents").select("count").limit(1).execute()
+                supabase_status = "connected"
+            except Exception as supabase_error:
+                logger.warning(f"Supabase connection issue: {str(supabase_error)}")
         
         return {
             "status": "healthy",
@@ -286,7 +406,9 @@ def health_check():
                 "mlflow": mlflow_status,
                 "model": model_status,
                 "supabase": supabase_status
-            }
+            },
+            "startup": components.status(),
+            "model_version": bundle.version if bundle is not None else None
         }
     except Exception as e:
         logger.error(f"Health check failed: {str(e)}")
@@ -300,235 +422,463 @@ def health_check():
             }
         }, 503
 
+def cluster_document(sentence_count: int, page_count: int, time_diff: float, plagiarism_score: float) -> Optional[float]:
+    """Assign a cluster with the deployed model; None while no model is loaded."""
+    bundle = getattr(app.state, "bundle", None)
+    if bundle is None:
+        logger.warning("Clustering model or scaler not loaded, storing document without a cluster")
+        return None
+    labels, _ = bundle.predict(upload_features(sentence_count, page_count, time_diff, plagiarism_score))
+    return float(labels[0])
+
+async def analyze_pdf(file_url: str) -> Tuple[ParsedDocument, List[float], Optional[np.ndarray], Dict[str, str], bool]:
+    """Download, parse, embed and run NER on a PDF, reusing cached results for identical bytes."""
+    source = await execution.run_io("pdf_fetch", download_pdf, file_url)
+    try:
+        key = cache_key(source, EMBEDDING_MODEL)
+        cached = await execution.run_io("cache_read", content_cache.get, key, source.size)
+        if cached is not None:
+            parsed = build_document(cached.page_texts, cached.chunks)
+            chunk_vectors = decode_chunk_embeddings(cached.chunk_embeddings)
+            return parsed, cached.embedding, chunk_vectors, cached.entities, True
+
+        parsed = await execution.run_cpu(
+            "pdf_parse", parse_pdf, source.path, execution.processes, settings.PDF_PAGES_PER_TASK
+        )
+    finally:
+        source.cleanup()
+
+    # Embed every chunk; the document vector is their pooled mean
+    chunk_vectors, extracted_data = await asyncio.gather(
+        embed_texts(
+            execution, components.get("embeddings"), parsed.chunks or [parsed.markdown_content],
+            batch_size=settings.CHUNK_EMBED_BATCH_SIZE, concurrency=settings.CHUNK_EMBED_CONCURRENCY
+        ),
+        execution.run_cpu("ner", extract_entities, components.get("ner_model"), parsed.chunks),
+    )
+    vector = pool_embeddings(chunk_vectors).tolist()
+    # Continue with the cached precision, so a later cache hit scores the same
+    chunk_vectors = at_storage_precision(chunk_vectors, settings.CHUNK_EMBEDDING_DTYPE)
+    artifacts = CachedArtifacts(
+        page_texts=parsed.page_texts, chunks=parsed.chunks, embedding=vector, entities=extracted_data,
+        chunk_embeddings=encode_chunk_embeddings(chunk_vectors, settings.CHUNK_EMBEDDING_DTYPE)
+    )
+    await execution.run_io("cache_write", content_cache.put, key, artifacts, bounded=False)
+    return parsed, vector, chunk_vectors, extracted_data, False
+
 # Upload route
-@app.post("/upload")
+@app.post("/upload", dependencies=[Depends(components.require(*INGESTION_COMPONENTS))])
 async def upload_file(uuid: str = Form(...), file_url: str = Form(...)):
-    with mlflow.start_run(run_name=f"document_processing_{uuid}"):
+    supabase = components.get("supabase")
+    run = TrackingRun(f"document_processing_{uuid}")
+    try:
+        # Log parameters
+        run.log_param("uuid", uuid)
+        run.log_param("file_url", file_url)
+
+        # Parse PDF, embed and extract entities (served from cache for known content)
+        record_task = asyncio.ensure_future(execution.run_io("supabase_read", fetch_document, supabase, uuid))
         try:
-            # Log parameters
-            mlflow.log_param("uuid", uuid)
-            mlflow.log_param("file_url", file_url)
-
-            # Parse PDF
-            loader = PyPDFLoader(file_url)
-            documents = loader.load()
-            page_count = len(documents)
-            full_text = " ".join(doc.page_content for doc in documents)
-            sentence_count = len([s for s in re.split(r'[.!?]+', full_text) if s.strip()])
-            
-            # Log basic metrics
-            mlflow.log_metric("page_count", page_count)
-            mlflow.log_metric("sentence_count", sentence_count)
-
-            # Chunking and embedding
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
-            chunks = text_splitter.split_documents(documents)
-            markdown_content = "\n\n".join(doc.page_content for doc in chunks)
-            vector = embeddings.embed_documents([markdown_content])[0]
-
-            # Entity extraction
-            first_chunk = chunks[0].page_content if chunks else ""
-            entities = model.predict_entities(first_chunk, labels)
-            extracted_data = {"Name": "", "ID": ""}
-            for entity in entities:
-                extracted_data[entity["label"]] = entity["text"]
-
-            # Get current record
-            current_record = supabase.table("documents").select("*").eq("id", uuid).execute()
-            if not current_record.data:
-                raise HTTPException(status_code=404, detail=f"No record found with uuid: {uuid}")
-            
-            folder = current_record.data[0]["folder"]
-            uploaded_date = current_record.data[0]["uploadedDate"]
-            deadline = current_record.data[0]["deadline"]
-            previous_records = supabase.table("documents").select("*").eq("folder", folder).lt("uploadedDate", uploaded_date).execute().data
-            plagiarism_results = {}
-
-            # Plagiarism detection
-            if previous_records:
-                previous_embeddings = []
-                for record in previous_records:
-                    try:
-                        embedding = (
-                            json.loads(record["embedding"]) if isinstance(record["embedding"], str)
-                            else record["embedding"]
-                        )
-                        previous_embeddings.append([float(x) for x in embedding])
-                    except Exception:
-                        continue
-
-                if previous_embeddings:
-                    current_embedding = vector if isinstance(vector, list) else [float(x) for x in json.loads(vector)]
-                    similarities = cosine_similarity(np.array([current_embedding]), np.array(previous_embeddings))[0]
-                    similarity_list = [
-                        (r["nameStudent"] or "Unknown", float(sim) if isinstance(sim, (int, float)) else 0.0)
-                        for r, sim in zip([r for r in previous_records if r.get("embedding")], similarities)
-                    ]
-                    top_2 = sorted(similarity_list, key=lambda x: x[1], reverse=True)[:2]
-                    plagiarism_results = dict(top_2)
-
-            plagiarism_score = max(plagiarism_results.values()) if plagiarism_results else 0.0
-            mlflow.log_metric("plagiarism_score", plagiarism_score)
-
-            # Time difference
-            deadline_dt = datetime.fromisoformat(deadline)
-            uploaded_date_dt = datetime.fromisoformat(uploaded_date)
-            time_diff = (deadline_dt - uploaded_date_dt).total_seconds() / 3600
-
-            # Clustering
-            df = pd.DataFrame({
-                'sentences': [sentence_count],
-                'page': [page_count],
-                'timing': [time_diff],
-                'plagiarism': [plagiarism_score]
-            })
-            scaled_data = StandardScaler().fit_transform(df)
-            cluster = model.fit_predict(scaled_data)[0]
-
-            # Update DB
-            response = supabase.table("documents").update({
-                "nameStudent": extracted_data["Name"] or "null",
-                "NRP": extracted_data["ID"],
-                "isiTugas": markdown_content,
-                "embedding": vector.tolist() if isinstance(vector, np.ndarray) else vector,
-                "page": page_count,
-                "sentences": sentence_count,
-                "plagiarism": plagiarism_results,
-                "clustering": float(cluster)
-            }).eq("id", uuid).execute()
-
-            if not response.data:
-                raise HTTPException(status_code=404, detail=f"No record found with uuid: {uuid}")
-
-            return {
-                "message": "File processed and record updated successfully.",
-                "extracted_entities": extracted_data,
-                "vector": vector,
-                "page_count": page_count,
-                "sentence_count": sentence_count,
-                "plagiarism_results": plagiarism_results
-            }
+            parsed, vector, chunk_vectors, extracted_data, cache_hit = await analyze_pdf(file_url)
+        except BaseException:
+            record_task.cancel()
+            raise
+        current_record = await record_task
+        page_count = parsed.page_count
+        sentence_count = parsed.sentence_count
+        markdown_content = parsed.markdown_content
+        
+        # Log basic metrics
+        run.log_metric("page_count", page_count)
+        run.log_metric("sentence_count", sentence_count)
+        run.log_metric("content_cache_hit", float(cache_hit))
+
+        if not current_record:
+            raise HTTPException(status_code=404, detail=f"No record found with uuid: {uuid}")
+        
+        folder = current_record["folder"]
+        uploaded_date = current_record["uploadedDate"]
+        deadline = current_record["deadline"]
+
+        # Plagiarism detection against earlier uploads in the same folder
+        await execution.run_io("index_load", vector_index.ensure_folder, supabase, folder)
+        matches = await execution.run_cpu(
+            "plagiarism", vector_index.query,
+            folder, vector, k=settings.PLAGIARISM_TOP_K, before=uploaded_date, exclude_id=uuid,
+            chunk_embeddings=chunk_vectors
+        )
+        plagiarism_results = dict((match.name, match.score) for match in matches)
+
+        plagiarism_score = max(plagiarism_results.values()) if plagiarism_results else 0.0
+        run.log_metric("plagiarism_score", plagiarism_score)
+
+        # Time difference
+        time_diff = hours_before_deadline(deadline, uploaded_date)
 
+        # Clustering
+        cluster = await execution.run_cpu(
+            "clustering", cluster_document, sentence_count, page_count, time_diff, plagiarism_score
+        )
+
+        # Update DB
+        fields = {
+            "nameStudent": extracted_data["Name"] or "null",
+            "NRP": extracted_data["ID"],
+            "isiTugas": markdown_content,
+            "embedding": storage_value(vector, settings.EMBEDDING_STORAGE_DTYPE),
+            "page": page_count,
+            "sentences": sentence_count,
+            "plagiarism": plagiarism_results,
+            "clustering": cluster
+        }
+        if store_chunk_embeddings and chunk_vectors is not None:
+            fields[CHUNK_EMBEDDINGS_COLUMN] = encode_chunk_embeddings(chunk_vectors, settings.CHUNK_EMBEDDING_DTYPE)
+        updated = await execution.run_io("supabase_write", update_document, supabase, uuid, fields)
+
+        if not updated:
+            raise HTTPException(status_code=404, detail=f"No record found with uuid: {uuid}")
+
+        # Keep the folder index in sync with the stored embedding
+        vector_index.upsert(folder, uuid, extracted_data["Name"] or "null", uploaded_date, vector, chunk_vectors)
+
+        return {
+            "message": "File processed and record updated successfully.",
+            "extracted_entities": extracted_data,
+            "vector": vector,
+            "page_count": page_count,
+            "sentence_count": sentence_count,
+            "plagiarism_results": plagiarism_results
+        }
+
+    except HTTPException as e:
+        run.fail(e.detail)
+        raise
+    except Exception as e:
+        run.fail(e)
+        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+    finally:
+        await execution.run_io("mlflow_log", run.flush, bounded=False)
+
+# Batch upload route
+@app.post("/upload/batch", dependencies=[Depends(components.require(*INGESTION_COMPONENTS))])
+async def upload_batch(request: BatchUploadRequest):
+    if not request.items:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    if len(request.items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch has {len(request.items)} items, maximum is {settings.BATCH_MAX_ITEMS}"
+        )
+    duplicates = duplicate_uuids([item.model_dump() for item in request.items])
+    if duplicates:
+        raise HTTPException(status_code=400, detail=f"Duplicate uuids in batch: {', '.join(duplicates)}")
+
+    pipeline = BatchIngestionPipeline(
+        execution=execution,
+        content_cache=content_cache,
+        embedding_model=EMBEDDING_MODEL,
+        embeddings=components.get("embeddings"),
+        ner_model=components.get("ner_model"),
+        supabase=components.get("supabase"),
+        vector_index=vector_index,
+        cluster_fn=cluster_document,
+        top_k=settings.PLAGIARISM_TOP_K,
+        parse_concurrency=settings.CPU_POOL_WORKERS,
+        embed_batch_size=settings.CHUNK_EMBED_BATCH_SIZE,
+        embed_concurrency=settings.CHUNK_EMBED_CONCURRENCY,
+        chunk_embedding_dtype=settings.CHUNK_EMBEDDING_DTYPE,
+        store_chunk_embeddings=store_chunk_embeddings,
+        embedding_dtype=settings.EMBEDDING_STORAGE_DTYPE,
+        pages_per_task=settings.PDF_PAGES_PER_TASK,
+    )
+
+    async def stream_events():
+        run = TrackingRun("document_batch_processing")
+        run.log_param("batch_size", len(request.items))
+        try:
+            async for event in pipeline.run([item.model_dump() for item in request.items]):
+                yield json.dumps(event) + "\n"
         except Exception as e:
-            mlflow.log_param("error", str(e))
-            raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
+            run.fail(e)
+            yield json.dumps({"status": "error", "error": str(e)}) + "\n"
+        finally:
+            for key, value in pipeline.stats.items():
+                run.log_metric(key, value)
+            await execution.run_io("mlflow_log", run.flush, bounded=False)
+
+    return StreamingResponse(stream_events(), media_type="application/x-ndjson")
 
 # Route baru untuk memproses feedback assignment
-@app.post("/agent-feedback")
+FEEDBACK_PERSONA = "Provide feedback in a formal and constructive tone suitable for academic purposes."
+
+async def fetch_folder(supabase, folder: str) -> Dict[str, Any]:
+    folder_record = await execution.run_io(
+        "supabase_read",
+        lambda: supabase.table("folders").select("nameAssignment", "description").eq("nameAssignment", folder).execute()
+    )
+    if not folder_record.data:
+        raise HTTPException(status_code=404, detail=f"No folder found with nameAssignment: {folder}")
+    return folder_record.data[0]
+
+async def load_feedback_request(supabase, uuid: str, run: TrackingRun) -> AssignmentRequest:
+    """Build the feedback workflow input for a stored document; raises 404 if it or its folder is missing."""
+    # Get document data
+    current_record = await execution.run_io(
+        "supabase_read", lambda: supabase.table("documents").select("*").eq("id", uuid).execute()
+    )
+    if not current_record.data:
+        raise HTTPException(status_code=404, detail=f"No record found with uuid: {uuid}")
+    
+    assignment_content = current_record.data[0]["isiTugas"]
+    folder = current_record.data[0]["folder"]
+
+    # Get folder information
+    folder_row = await fetch_folder(supabase, folder)
+    title = folder_row["nameAssignment"]
+    description = folder_row["description"]
+
+    # Log parameters
+    run.log_param("title", title)
+    run.log_param("content_length", len(assignment_content))
+
+    # The stored document embedding lets the semantic cache match near-duplicate submissions
+    content_embedding = parse_embedding(current_record.data[0].get("embedding"))
+
+    return AssignmentRequest(
+        title=title,
+        description=description or "",
+        content=assignment_content,
+        persona=FEEDBACK_PERSONA,
+        content_embedding=content_embedding.tolist() if content_embedding is not None else None
+    )
+
+@app.post("/agent-feedback", dependencies=[Depends(components.require("supabase"))])
 async def agent_feedback_endpoint(uuid: str = Form(...)):
-    with mlflow.start_run(run_name=f"agent_feedback_{uuid}"):
-        try:
-            mlflow.log_param("uuid", uuid)
-            
-            # Get document data
-            current_record = supabase.table("documents").select("*").eq("id", uuid).execute()
-            if not current_record.data:
-                raise HTTPException(status_code=404, detail=f"No record found with uuid: {uuid}")
-            
-            assignment_content = current_record.data[0]["isiTugas"]
-            folder = current_record.data[0]["folder"]
+    run = TrackingRun(f"agent_feedback_{uuid}")
+    try:
+        run.log_param("uuid", uuid)
+        payload = await load_feedback_request(components.get("supabase"), uuid, run)
 
-            # Get folder information
-            folder_record = supabase.table("folders").select("nameAssignment", "description").eq("nameAssignment", folder).execute()
-            if not folder_record.data:
-                raise HTTPException(status_code=404, detail=f"No folder found with nameAssignment: {folder}")
+        # Generate feedback; summary and relevance run concurrently on the event loop
+        feedback_result = await generate_feedback(payload)
+        
+        # Log metrics
+        run.log_metric("feedback_generated", 1)
+        
+        return feedback_result
 
-            title = folder_record.data[0]["nameAssignment"]
-            description = folder_record.data[0]["description"]
+    except HTTPException as e:
+        run.fail(e.detail)
+        raise
+    except Exception as e:
+        run.fail(e)
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        await execution.run_io("mlflow_log", run.flush, bounded=False)
+
+@app.post("/agent-feedback/stream", dependencies=[Depends(components.require("supabase"))])
+async def agent_feedback_stream_endpoint(uuid: str = Form(...)):
+    """Same as /agent-feedback, streamed as Server-Sent Events while each agent finishes."""
+    run = TrackingRun(f"agent_feedback_stream_{uuid}")
+    run.log_param("uuid", uuid)
+    try:
+        payload = await load_feedback_request(components.get("supabase"), uuid, run)
+    except HTTPException as e:
+        run.fail(e.detail)
+        await execution.run_io("mlflow_log", run.flush, bounded=False)
+        raise
 
-            # Log parameters
-            mlflow.log_param("title", title)
-            mlflow.log_param("content_length", len(assignment_content))
+    async def events():
+        try:
+            async for event in stream_feedback(payload):
+                if event.startswith("event: error"):
+                    run.fail(event)
+                yield event
+            if not run.failed:
+                run.log_metric("feedback_generated", 1)
+        finally:
+            await execution.run_io("mlflow_log", run.flush, bounded=False)
+
+    return sse_response(events())
+
+def folder_job_status(folder: str) -> Dict[str, Any]:
+    job = feedback_jobs.get(folder)
+    task = feedback_job_tasks.get(folder)
+    return {
+        "folder": folder,
+        "running": task is not None and not task.done(),
+        "job": job.stats if job is not None else None,
+        "stored": feedback_store.summary(folder),
+    }
+
+@app.post("/agent-feedback/folder", dependencies=[Depends(components.require("supabase"))])
+async def folder_feedback_endpoint(folder: str = Form(...)):
+    """Start (or resume) feedback generation for every document in a folder."""
+    # Held from the running-job check until the new task is registered, so
+    # concurrent requests for one folder cannot start duplicate jobs
+    async with feedback_job_locks[folder]:
+        task = feedback_job_tasks.get(folder)
+        if task is not None and not task.done():
+            return folder_job_status(folder)
+
+        supabase = components.get("supabase")
+        folder_row = await fetch_folder(supabase, folder)
+        documents = await execution.run_io(
+            "supabase_read", fetch_folder_documents, supabase, folder, "id, isiTugas, embedding"
+        )
+        documents = [document for document in documents if document.get("isiTugas")]
 
-            # Generate feedback
-            persona = "Provide feedback in a formal and constructive tone suitable for academic purposes."
+        async def run_document(document: Dict[str, Any], relevance: Optional[str]) -> Tuple[Dict[str, Any], TokenUsage]:
+            content_embedding = parse_embedding(document.get("embedding"))
             payload = AssignmentRequest(
-                assignment_meta={
-                    "title": title,
-                    "description": description
-                },
-                assignment_content=assignment_content
+                title=folder_row["nameAssignment"],
+                description=folder_row["description"] or "",
+                content=document["isiTugas"],
+                persona=FEEDBACK_PERSONA,
+                content_embedding=content_embedding.tolist() if content_embedding is not None else None,
+                relevance_analysis=relevance
             )
+            result, usage = await generate_feedback_with_usage(payload, priority=PRIORITY_BATCH)
+            return {key: result.get(key) for key in AssignmentResponse.model_fields}, usage
 
-            feedback_result = generate_feedback(payload)
-            
-            # Log metrics
-            mlflow.log_metric("feedback_generated", 1)
-            
-            return feedback_result
+        async def folder_relevance() -> Tuple[str, TokenUsage]:
+            return await analyze_relevance(
+                folder_row["nameAssignment"], folder_row["description"] or "", priority=PRIORITY_BATCH
+            )
 
-        except Exception as e:
-            mlflow.log_param("error", str(e))
-            raise HTTPException(status_code=500, detail=str(e))
+        job = FolderFeedbackJob(
+            folder,
+            run_document,
+            feedback_store,
+            analyze_relevance=folder_relevance,
+            concurrency=settings.BULK_FEEDBACK_CONCURRENCY,
+        )
+
+        async def run_job():
+            run = TrackingRun(f"folder_feedback_{folder}")
+            run.log_param("folder", folder)
+            run.log_param("documents", len(documents))
+            try:
+                await job.run(documents)
+            except Exception as e:
+                run.fail(e)
+                logger.error(f"Folder feedback job for {folder} failed: {str(e)}")
+            finally:
+                for key, value in job.stats.items():
+                    if isinstance(value, (int, float)):
+                        run.log_metric(key, value)
+                await execution.run_io("mlflow_log", run.flush, bounded=False)
+
+        feedback_jobs[folder] = job
+        feedback_job_tasks[folder] = asyncio.create_task(run_job())
+    return folder_job_status(folder)
+
+@app.get("/agent-feedback/folder/{folder}")
+def folder_feedback_status(folder: str, include_results: bool = False):
+    status = folder_job_status(folder)
+    if include_results:
+        status["results"] = feedback_store.results(folder)
+    return status
+
+def prediction_metadata(bundle: ModelBundle) -> Dict[str, Any]:
+    return {
+        "model_type": type(bundle.model).__name__,
+        "model_version": bundle.version,
+        "n_clusters": bundle.n_clusters,
+        "feature_weights": bundle.weights.tolist(),
+        "scaling": {
+            "type": "min-max",
+            "scaler_path": bundle.scaler_path
+        }
+    }
+
+def serving_bundle() -> ModelBundle:
+    bundle = getattr(app.state, "bundle", None)
+    if bundle is None:
+        raise HTTPException(status_code=503, detail="Model or scaler not loaded")
+    return bundle
 
 @app.post("/predict", response_model=PredictionOutput)
 def predict(input_data: PredictionInput):
     try:
-        # Get model and scaler from app state
-        model = app.state.model
-        scaler = app.state.scaler
-        
-        if model is None or scaler is None:
-            raise HTTPException(status_code=503, detail="Model or scaler not loaded")
+        # Take one consistent model/scaler bundle for the whole request
+        bundle = serving_bundle()
         
         # Create input array
         X = np.array([[input_data.sentences, input_data.page, input_data.timing, input_data.plagiarism]])
-        print("Input data:", X)
-        
-        # Scale data using the saved scaler
-        X_scaled = scaler.transform(X)
-        print("Scaled data:", X_scaled)
         
-        # Apply feature weights
-        weights = np.array([0.5, 0.5, 1.5, 4.5])
-        X_weighted = X_scaled * weights
-        print("Weighted data:", X_weighted)
-        
-        # Make prediction
-        cluster = int(model.predict(X_weighted)[0])
-        print("Predicted cluster:", cluster)
-        
-        # Calculate confidence (distance to cluster center)
-        if hasattr(model, 'cluster_centers_'):
-            centers = model.cluster_centers_
-            distances = np.linalg.norm(X_weighted - centers[cluster])
-            confidence = float(1 / (1 + distances))  # Convert distance to confidence score
-        else:
-            confidence = 1.0
-            
-        # Get model metadata
-        metadata = {
-            "model_type": type(model).__name__,
-            "n_clusters": getattr(model, 'n_clusters_', getattr(model, 'n_components_', None)),
-            "feature_weights": weights.tolist(),
-            "scaling": {
-                "type": "min-max",
-                "scaler_path": "/mlflow/artifacts/scaler.pkl"
-            }
-        }
+        # Scale, weight, predict and score confidence (distance to cluster center)
+        labels, confidence = bundle.predict(X)
+        cluster = int(labels[0])
+        confidence = float(confidence[0])
+        logger.debug(f"Predicted cluster {cluster} for input {X.tolist()} with model {bundle.version}")
         
         return PredictionOutput(
             cluster=cluster,
             confidence=confidence,
-            metadata=metadata
+            metadata=prediction_metadata(bundle)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
+
+@app.post("/predict/batch", response_model=BatchPredictionOutput)
+def predict_batch(input_data: BatchPredictionInput):
+    try:
+        X = input_data.to_array()
+        if len(X) == 0:
+            raise HTTPException(status_code=400, detail="Batch is empty")
+        if len(X) > settings.PREDICT_BATCH_MAX_ROWS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Batch has {len(X)} rows, maximum is {settings.PREDICT_BATCH_MAX_ROWS}"
+            )
+        bundle = serving_bundle()
+        
+        # One transform, one weight multiply, one predict for the whole batch
+        labels, confidence = bundle.predict(X)
+        ML_MODEL_PREDICTIONS.inc(len(labels))
+        
+        return BatchPredictionOutput(
+            clusters=labels.astype(int).tolist(),
+            confidence=confidence.tolist(),
+            metadata=prediction_metadata(bundle)
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction error: {str(e)}")
 
+@app.post("/models/reload")
+async def notify_model_deployed():
+    """Called by the deploy task so a new model is served without waiting for the watch or poll."""
+    bundle = await app.state.model_reloader.trigger("notify")
+    current = getattr(app.state, "bundle", None)
+    return {
+        "reloaded": bundle is not None,
+        "model_version": current.version if current is not None else None
+    }
+
 @app.get("/model-info")
 def get_model_info():
     try:
-        model = load_best_model()
+        bundle = serving_bundle()
+        scaler = bundle.scaler
         metadata = {
-            "model_type": type(model).__name__,
-            "n_clusters": getattr(model, 'n_clusters_', getattr(model, 'n_components_', None)),
-            "feature_weights": [0.5, 0.5, 1.5, 4.5],
+            "model_type": type(bundle.model).__name__,
+            "model_version": bundle.version,
+            "n_clusters": bundle.n_clusters,
+            "feature_weights": bundle.weights.tolist(),
+            "inference": "numpy-kernel" if bundle.kernel is not None else "sklearn",
             "scaling": {
                 "type": "min-max",
-                "min_values": [0, 0, 0, 0],
-                "max_values": [100, 100, 100, 100]
+                "min_values": getattr(scaler, "data_min_", np.zeros(len(FEATURE_COLUMNS))).tolist(),
+                "max_values": getattr(scaler, "data_max_", np.full(len(FEATURE_COLUMNS), 100.0)).tolist()
             }
         }
         return metadata
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error getting model info: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error getting model info: {str(e)}")
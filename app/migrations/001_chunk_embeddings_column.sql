@@ -0,0 +1,9 @@
+-- Chunk embedding matrices for chunk-level plagiarism search.
+-- /upload and /upload/batch only write this column when STORE_CHUNK_EMBEDDINGS
+-- is enabled or PLAGIARISM_MODE=chunk, so apply this migration first.
+-- Values are the base64 text produced by app/services/embedding_codec.py
+-- (int8 codes with one float32 scale per chunk, or float16).
+--
+--     psql "$DATABASE_URL" -f app/migrations/001_chunk_embeddings_column.sql
+
+ALTER TABLE public.documents ADD COLUMN IF NOT EXISTS "chunkEmbeddings" text;
@@ -0,0 +1,14 @@
+-- Store document embeddings as text so they can hold the binary codec.
+-- Codec values are base64 strings ("TkdF..."), which pgvector rejects and
+-- which would only be a string scalar in jsonb. Converting to text works from
+-- any of the earlier column types, and keeps existing rows readable:
+--   vector -> '[0.1,0.2,...]'   jsonb/json -> '[0.1, 0.2, ...]'
+-- Both are JSON lists that decode_embedding still parses. Drop any vector
+-- index on the column first; plagiarism search uses the in-memory index.
+--
+--     psql "$DATABASE_URL" -f app/migrations/002_embedding_text_column.sql
+--     python -m app.migrations.backfill_embedding_codec
+--
+-- then set EMBEDDING_STORAGE_DTYPE=float16 (or float32/int8) for new uploads.
+
+ALTER TABLE public.documents ALTER COLUMN embedding TYPE text USING embedding::text;
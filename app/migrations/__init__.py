@@ -0,0 +1,5 @@
+"""
+One-off data migrations for the document processing API.
+Schema changes are numbered SQL files applied in order with psql; data
+backfills are Python modules run with ``python -m app.migrations.<name>``.
+"""
@@ -0,0 +1,132 @@
+"""
+Backfill documents embeddings into the binary codec.
+Rewrites every ``documents.embedding`` still stored as a JSON list in the
+versioned binary format. Apply 002_embedding_text_column.sql first, then run
+this and switch EMBEDDING_STORAGE_DTYPE to a codec dtype. Rows are read in
+keyset pages and already converted rows are skipped, so the migration can be
+interrupted and re-run safely.
+
+Usage::
+
+    python -m app.migrations.backfill_embedding_codec [--dry-run]
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.services.embedding_codec import decode_embedding, encode_embedding, is_encoded
+
+logger = logging.getLogger(__name__)
+
+
+def stored_size(value: Any) -> int:
+    """Approximate payload size of a column value as sent over PostgREST."""
+    if value is None:
+        return 0
+    return len(value) if isinstance(value, str) else len(json.dumps(value))
+
+
+def iter_pages(supabase, columns: str, page_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Yield ``documents`` rows in id order, one keyset page at a time."""
+    last_id = None
+    while True:
+        query = supabase.table("documents").select(columns).order("id").limit(page_size)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.execute().data
+        if not rows:
+            return
+        yield rows
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]["id"]
+
+
+def convert_row(row: Dict[str, Any], dtype: str) -> Optional[Dict[str, Any]]:
+    """Return the column updates for one row, or None if it is already converted."""
+    embedding = row.get("embedding")
+    if embedding is None or is_encoded(embedding):
+        return None
+    vector = decode_embedding(embedding)
+    if vector is None:
+        return None
+    return {"embedding": encode_embedding(vector, dtype)}
+
+
+def backfill(supabase, dtype: str = "float16", page_size: int = 500, workers: int = 8,
+             dry_run: bool = False) -> Dict[str, Any]:
+    """
+    Convert every legacy embedding in the documents table.
+
+    Args:
+        supabase: Supabase client
+        dtype: Storage type for document embeddings
+        page_size: Rows read per page
+        workers: Concurrent row updates
+        dry_run: Count and size the conversion without writing
+
+    Returns:
+        Migration statistics
+    """
+    columns = "id, embedding"
+    stats = {"scanned": 0, "converted": 0, "skipped": 0, "failed": 0, "bytes_before": 0, "bytes_after": 0}
+    started = time.perf_counter()
+
+    def update(doc_id: str, values: Dict[str, Any]) -> bool:
+        try:
+            supabase.table("documents").update(values).eq("id", doc_id).execute()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to update embedding of {doc_id}: {str(e)}")
+            return False
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for rows in iter_pages(supabase, columns, page_size):
+            updates = []
+            for row in rows:
+                stats["scanned"] += 1
+                values = convert_row(row, dtype)
+                if values is None:
+                    stats["skipped"] += 1
+                    continue
+                stats["bytes_before"] += sum(stored_size(row.get(column)) for column in values)
+                stats["bytes_after"] += sum(stored_size(value) for value in values.values())
+                updates.append((row["id"], values))
+
+            if dry_run:
+                stats["converted"] += len(updates)
+            else:
+                for ok in pool.map(lambda item: update(*item), updates):
+                    stats["converted" if ok else "failed"] += 1
+            logger.info(f"Embedding backfill progress: {stats}")
+
+    stats["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    if stats["bytes_after"]:
+        stats["size_ratio"] = round(stats["bytes_before"] / stats["bytes_after"], 2)
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill documents embeddings into the binary codec")
+    parser.add_argument("--dtype", default="float16", choices=["float32", "float16", "int8"])
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    from supabase import create_client
+    supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+    stats = backfill(
+        supabase, dtype=args.dtype, page_size=args.page_size, workers=args.workers, dry_run=args.dry_run
+    )
+    logger.info(f"Embedding backfill finished: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,33 @@
 import os
 import getpass
+import time
+from functools import wraps
+import json
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from langgraph.graph import StateGraph, START, END
 from langchain_groq import ChatGroq
+from langchain_core.language_models.chat_models import BaseChatModel
 from typing_extensions import TypedDict
+from app.core.config import settings
+from app.services.content_cache import ContentCache
+from app.services.feedback_jobs import TokenUsage
+from app.services.llm_gateway import LLMGateway, PRIORITY_INTERACTIVE, estimate_tokens, request_priority
+from app.services.response_cache import ResponseCache, SemanticCache, prompt_key
+from app.services.summarization import map_reduce_summary, split_content
+from app.utils.metrics import (
+    AGENT_NODE_LATENCY,
+    AGENT_STREAM_FIRST_EVENT,
+    AGENT_WORKFLOW_LATENCY,
+    LLM_CACHE_HITS,
+    LLM_CACHE_MISSES,
+    LLM_CACHE_SAVED_CHARS,
+    LLM_TOKENS,
+)
 
 # --- Konfigurasi API Key Groq (bisa lewat environment variable) ---
 load_dotenv()
@@ -17,7 +39,8 @@ def _set_env(var: str):
 # _set_env("GROQ_API_KEY")  # uncomment jika perlu input manual
 
 # Inisialisasi LLM dari Groq (contoh: gemma2-9b-it)
-llm = ChatGroq(model="gemma2-9b-it", api_key=os.getenv("GROQ_API_KEY"))
+# Retries are handled by the LLM gateway, which also owns the rate budget
+llm = ChatGroq(model="gemma2-9b-it", api_key=os.getenv("GROQ_API_KEY"), max_retries=0)
 
 # --- Tipe Data State ---
 class AssignmentMeta(TypedDict):
@@ -27,6 +50,7 @@ class AssignmentMeta(TypedDict):
 class State(TypedDict):
     assignment_meta: AssignmentMeta
     assignment_content: str
+    content_embedding: Optional[List[float]]
     persona: str
     summary: str
     relevance_analysis: str
@@ -34,77 +58,277 @@ class State(TypedDict):
     personalized_feedback: str
     combined_output: str
 
-# --- Node Agent Functions ---
-def input_meta(state: State) -> dict:
-    return {"assignment_meta": state["assignment_meta"]}
+# Usage of the feedback run in the current task; set by callers that report token usage
+current_usage: ContextVar[Optional[TokenUsage]] = ContextVar("current_usage", default=None)
+
+def record_usage(node: str, msg) -> None:
+    usage = getattr(msg, "usage_metadata", None) or {}
+    input_tokens = int(usage.get("input_tokens", 0))
+    output_tokens = int(usage.get("output_tokens", 0))
+    LLM_TOKENS.labels(node=node, kind="input").inc(input_tokens)
+    LLM_TOKENS.labels(node=node, kind="output").inc(output_tokens)
+    tracked = current_usage.get()
+    if tracked is not None:
+        tracked.add(TokenUsage(calls=1, input_tokens=input_tokens, output_tokens=output_tokens))
 
-def input_content(state: State) -> dict:
-    return {"assignment_content": state["assignment_content"]}
+# --- Node Agent Functions ---
+def timed_node(name: str, fn: Callable[[State], Awaitable[dict]]) -> Callable[[State], Awaitable[dict]]:
+    """Wrap an async node so its latency is recorded per node."""
+    @wraps(fn)
+    async def node(state: State) -> dict:
+        start_time = time.perf_counter()
+        try:
+            return await fn(state)
+        finally:
+            AGENT_NODE_LATENCY.labels(node=name).observe(time.perf_counter() - start_time)
+    return node
 
-def summarizer_agent(state: State) -> dict:
-    content = state["assignment_content"]
-    msg = llm.invoke(f"Summarize the following assignment content:\n\n{content}")
-    return {"summary": msg.content}
+def summary_prompt(content: str) -> str:
+    return f"Summarize the following assignment content:\n\n{content}"
 
-def relevance_agent(state: State) -> dict:
-    title = state["assignment_meta"]["title"]
-    desc = state["assignment_meta"]["description"]
-    prompt = f"""Analyze the relevance between the following title and description of an assignment:
+def relevance_prompt(title: str, desc: str) -> str:
+    return f"""Analyze the relevance between the following title and description of an assignment:
 
 Title: {title}
 Description: {desc}
 
 Does the title appropriately reflect the content described? Provide analysis."""
-    msg = llm.invoke(prompt)
-    return {"relevance_analysis": msg.content}
 
-def aggregator(state: State) -> dict:
-    summary = state["summary"]
-    relevance = state["relevance_analysis"]
-    persona = state["persona"]
-
-    feedback_prompt = f"""You are an academic evaluator. Provide constructive feedback based on the following:
+def feedback_prompt(summary: str, relevance: str) -> str:
+    return f"""You are an academic evaluator. Provide constructive feedback based on the following:
 
 SUMMARY:
 {summary}
 
 RELEVANCE ANALYSIS:
 {relevance}"""
-    feedback = llm.invoke(feedback_prompt).content
 
-    personalization_prompt = f"""Personalize the following academic feedback based on the following style or instruction:
+def personalization_prompt(persona: str, feedback: str) -> str:
+    return f"""Personalize the following academic feedback based on the following style or instruction:
 
 INSTRUCTION:
 {persona}
 
 FEEDBACK:
 {feedback}"""
-    personalized = llm.invoke(personalization_prompt).content
 
-    combined = f"🎓 Final Personalized Feedback:\n\n{personalized}"
-    return {
-        "feedback_analysis": feedback,
-        "personalized_feedback": personalized,
-        "combined_output": combined
-    }
+Complete = Callable[..., Awaitable[str]]
+
+def build_completer(chat_model: BaseChatModel, response_cache: Optional[ResponseCache] = None,
+                    semantic_cache: Optional[SemanticCache] = None,
+                    gateway: Optional[LLMGateway] = None) -> Complete:
+    """
+    LLM call behind the exact and semantic caches and the gateway.
+
+    Returns:
+        Coroutine ``complete(node, prompt, embedding=None, compute=None)``; ``compute``
+        replaces the model call on a cache miss
+    """
+    model_name = str(getattr(chat_model, "model_name", None) or type(chat_model).__name__)
+
+    async def call_model(node: str, prompt: str) -> str:
+        async def invoke():
+            msg = await chat_model.ainvoke(prompt)
+            record_usage(node, msg)
+            return msg
+
+        if gateway is None:
+            return (await invoke()).content
+        msg = await gateway.call(
+            invoke, key=prompt_key(model_name, node, prompt), estimated_tokens=estimate_tokens(prompt)
+        )
+        return msg.content
+
+    async def complete(node: str, prompt: str, embedding: Optional[List[float]] = None,
+                       compute: Optional[Callable[[], Awaitable[str]]] = None) -> str:
+        key = prompt_key(model_name, node, prompt)
+        if response_cache is not None:
+            cached = response_cache.get(key)
+            if cached is not None:
+                LLM_CACHE_HITS.labels(node=node, level="exact").inc()
+                LLM_CACHE_SAVED_CHARS.labels(node=node).inc(len(prompt))
+                return cached
+        if semantic_cache is not None and embedding:
+            cached = semantic_cache.lookup(node, embedding)
+            if cached is not None:
+                LLM_CACHE_HITS.labels(node=node, level="semantic").inc()
+                LLM_CACHE_SAVED_CHARS.labels(node=node).inc(len(prompt))
+                if response_cache is not None:
+                    response_cache.put(key, cached)
+                return cached
+
+        LLM_CACHE_MISSES.labels(node=node).inc()
+        content = await compute() if compute is not None else await call_model(node, prompt)
+        if response_cache is not None:
+            response_cache.put(key, content)
+        if semantic_cache is not None and embedding:
+            semantic_cache.add(node, embedding, content)
+        return content
+
+    return complete
+
+def build_workflow(chat_model: BaseChatModel, response_cache: Optional[ResponseCache] = None,
+                   semantic_cache: Optional[SemanticCache] = None, summary_store: Optional[ContentCache] = None,
+                   gateway: Optional[LLMGateway] = None):
+    """
+    Compile the feedback graph around a chat model.
+
+    Every LLM node awaits ``ainvoke``, so the summarizer and relevance branches
+    run concurrently and the critical path is max(summary, relevance) + feedback
+    + personalization instead of the sum of all four calls.
+
+    Args:
+        chat_model: Any LangChain chat model (a stub in benchmarks)
+        response_cache: Exact prompt cache shared by all nodes
+        semantic_cache: Optional similarity cache for the summary of near-duplicate submissions
+        summary_store: Content cache persisting partial summaries of long submissions
+        gateway: Rate limiting, prioritization, coalescing and retries shared by every run
+
+    Returns:
+        The compiled graph; run it with ``ainvoke``
+    """
+    model_name = str(getattr(chat_model, "model_name", None) or type(chat_model).__name__)
+    complete = build_completer(chat_model, response_cache, semantic_cache, gateway)
+
+    async def input_meta(state: State) -> dict:
+        return {"assignment_meta": state["assignment_meta"]}
+
+    async def input_content(state: State) -> dict:
+        return {"assignment_content": state["assignment_content"]}
+
+    async def summarizer_agent(state: State) -> dict:
+        content = state["assignment_content"]
+        compute = None
+        if len(content) >= settings.SUMMARY_MAP_REDUCE_MIN_CHARS:
+            # Long submissions: summarize windows of upload chunks in parallel, then reduce
+            async def compute() -> str:
+                return await map_reduce_summary(
+                    complete,
+                    split_content(content),
+                    model_name,
+                    window_chars=settings.SUMMARY_MAP_WINDOW_CHARS,
+                    reduce_chars=settings.SUMMARY_REDUCE_MAX_CHARS,
+                    concurrency=settings.SUMMARY_MAP_CONCURRENCY,
+                    store=summary_store,
+                )
+        summary = await complete(
+            "summarizer_agent", summary_prompt(content), state.get("content_embedding"), compute
+        )
+        return {"summary": summary}
+
+    async def relevance_agent(state: State) -> dict:
+        if state.get("relevance_analysis"):
+            # Precomputed for the folder by a batch job
+            return {"relevance_analysis": state["relevance_analysis"]}
+        meta = state["assignment_meta"]
+        # Depends only on the folder, so every submission after the first is a cache hit
+        relevance = await complete("relevance_agent", relevance_prompt(meta["title"], meta["description"]))
+        return {"relevance_analysis": relevance}
+
+    async def feedback_agent(state: State) -> dict:
+        feedback = await complete("feedback_agent", feedback_prompt(state["summary"], state["relevance_analysis"]))
+        return {"feedback_analysis": feedback}
+
+    async def aggregator(state: State) -> dict:
+        personalized = await complete(
+            "aggregator", personalization_prompt(state["persona"], state["feedback_analysis"])
+        )
+        combined = f"🎓 Final Personalized Feedback:\n\n{personalized}"
+        return {
+            "personalized_feedback": personalized,
+            "combined_output": combined
+        }
+
+    builder = StateGraph(State)
+    for name, fn in [
+        ("input_meta", input_meta),
+        ("input_content", input_content),
+        ("relevance_agent", relevance_agent),
+        ("summarizer_agent", summarizer_agent),
+        ("feedback_agent", feedback_agent),
+        ("aggregator", aggregator),
+    ]:
+        builder.add_node(name, timed_node(name, fn))
+
+    builder.add_edge(START, "input_meta")
+    builder.add_edge(START, "input_content")
+    builder.add_edge("input_meta", "relevance_agent")
+    builder.add_edge("input_content", "summarizer_agent")
+    builder.add_edge(["relevance_agent", "summarizer_agent"], "feedback_agent")
+    builder.add_edge("feedback_agent", "aggregator")
+    builder.add_edge("aggregator", END)
+
+    return builder.compile()
 
 # --- Bangun Workflow ---
-builder = StateGraph(State)
-builder.add_node("input_meta", input_meta)
-builder.add_node("input_content", input_content)
-builder.add_node("relevance_agent", relevance_agent)
-builder.add_node("summarizer_agent", summarizer_agent)
-builder.add_node("aggregator", aggregator)
-
-builder.add_edge(START, "input_meta")
-builder.add_edge(START, "input_content")
-builder.add_edge("input_meta", "relevance_agent")
-builder.add_edge("input_content", "summarizer_agent")
-builder.add_edge("relevance_agent", "aggregator")
-builder.add_edge("summarizer_agent", "aggregator")
-builder.add_edge("aggregator", END)
-
-workflow = builder.compile()
+response_cache = ResponseCache(
+    max_items=settings.LLM_CACHE_MAX_ITEMS,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+)
+semantic_cache = SemanticCache(
+    threshold=settings.LLM_SEMANTIC_CACHE_THRESHOLD,
+    max_items=settings.LLM_SEMANTIC_CACHE_MAX_ITEMS,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+) if settings.LLM_SEMANTIC_CACHE_ENABLED else None
+llm_gateway = LLMGateway(
+    requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+    request_burst=settings.LLM_REQUEST_BURST,
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    max_attempts=settings.LLM_MAX_ATTEMPTS,
+    retry_base_seconds=settings.LLM_RETRY_BASE_SECONDS,
+    retry_max_seconds=settings.LLM_RETRY_MAX_SECONDS,
+)
+workflow = build_workflow(llm, response_cache, semantic_cache, gateway=llm_gateway)
+complete = build_completer(llm, response_cache, semantic_cache, llm_gateway)
+
+def configure_summary_store(store: ContentCache) -> None:
+    """Persist partial summaries in the API's content cache; rebuilds the module workflow."""
+    global workflow
+    workflow = build_workflow(llm, response_cache, semantic_cache, summary_store=store, gateway=llm_gateway)
+
+# --- Streaming ---
+# Node outputs that are sent to streaming clients as soon as the node finishes
+STREAMED_NODE_FIELDS = {
+    "summarizer_agent": ("summary",),
+    "relevance_agent": ("relevance_analysis",),
+    "feedback_agent": ("feedback_analysis",),
+    "aggregator": ("personalized_feedback", "combined_output"),
+}
+# Only the final personalization step streams individual tokens
+TOKEN_STREAM_NODE = "aggregator"
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def stream_workflow(compiled, state: State) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run the feedback graph and yield events as they happen.
+
+    Yields ``{"event": "node", "node": ..., "data": {...}}`` when a node finishes,
+    ``{"event": "token", "content": ...}`` for tokens of the personalization step
+    and a final ``{"event": "done", "data": {...}}`` with the complete result.
+
+    Args:
+        compiled: A graph from ``build_workflow``
+        state: Initial workflow state
+    """
+    result: Dict[str, Any] = dict(state)
+    async for mode, chunk in compiled.astream(state, stream_mode=["updates", "messages"]):
+        if mode == "messages":
+            message, metadata = chunk
+            if metadata.get("langgraph_node") == TOKEN_STREAM_NODE and message.content:
+                yield {"event": "token", "content": message.content}
+            continue
+        for node, update in chunk.items():
+            if not update:
+                continue
+            result.update(update)
+            fields = STREAMED_NODE_FIELDS.get(node)
+            if fields:
+                yield {"event": "node", "node": node, "data": {field: update.get(field, "") for field in fields}}
+    yield {"event": "done", "data": {field: result.get(field, "") for field in AssignmentResponse.model_fields}}
 
 # --- FastAPI Setup ---
 app = FastAPI(title="AI Assignment Feedback Agent")
@@ -114,6 +338,8 @@ class AssignmentRequest(BaseModel):
     description: str
     content: str
     persona: str
+    content_embedding: Optional[List[float]] = None
+    relevance_analysis: Optional[str] = None
 
 class AssignmentResponse(BaseModel):
     summary: str
@@ -122,20 +348,86 @@ class AssignmentResponse(BaseModel):
     personalized_feedback: str
     combined_output: str
 
-@app.post("/feedback", response_model=AssignmentResponse)
-def generate_feedback(payload: AssignmentRequest):
-    initial_state: State = {
+def initial_state(payload: AssignmentRequest) -> State:
+    return {
         "assignment_meta": {
             "title": payload.title,
             "description": payload.description,
         },
         "assignment_content": payload.content,
+        "content_embedding": payload.content_embedding,
         "persona": payload.persona,
         "summary": "",
-        "relevance_analysis": "",
+        "relevance_analysis": payload.relevance_analysis or "",
         "feedback_analysis": "",
         "personalized_feedback": "",
         "combined_output": ""
     }
-    result = workflow.invoke(initial_state)
-    return result
\ No newline at end of file
+
+@app.post("/feedback", response_model=AssignmentResponse)
+async def generate_feedback(payload: AssignmentRequest):
+    start_time = time.perf_counter()
+    try:
+        result = await workflow.ainvoke(initial_state(payload))
+        result.pop("content_embedding", None)
+        return result
+    finally:
+        AGENT_WORKFLOW_LATENCY.observe(time.perf_counter() - start_time)
+
+async def generate_feedback_with_usage(payload: AssignmentRequest,
+                                       priority: int = PRIORITY_INTERACTIVE) -> Tuple[Dict[str, Any], TokenUsage]:
+    """Run the feedback workflow and return its result together with the LLM usage it caused."""
+    usage = TokenUsage()
+    usage_token = current_usage.set(usage)
+    priority_token = request_priority.set(priority)
+    try:
+        result = await generate_feedback(payload)
+    finally:
+        request_priority.reset(priority_token)
+        current_usage.reset(usage_token)
+    return result, usage
+
+async def analyze_relevance(title: str, description: str,
+                            priority: int = PRIORITY_INTERACTIVE) -> Tuple[str, TokenUsage]:
+    """
+    Relevance analysis of an assignment's title and description.
+
+    Uses the same cache key as the workflow's relevance node, so feedback runs
+    for the same folder reuse it.
+    """
+    usage = TokenUsage()
+    usage_token = current_usage.set(usage)
+    priority_token = request_priority.set(priority)
+    try:
+        relevance = await complete("relevance_agent", relevance_prompt(title, description))
+    finally:
+        request_priority.reset(priority_token)
+        current_usage.reset(usage_token)
+    return relevance, usage
+
+async def stream_feedback(payload: AssignmentRequest) -> AsyncIterator[str]:
+    """Server-Sent Events for one feedback run; errors are reported as an ``error`` event."""
+    start_time = time.perf_counter()
+    first_event = True
+    try:
+        async for item in stream_workflow(workflow, initial_state(payload)):
+            if first_event:
+                AGENT_STREAM_FIRST_EVENT.observe(time.perf_counter() - start_time)
+                first_event = False
+            event = item.pop("event")
+            yield sse_event(event, item)
+    except Exception as e:
+        yield sse_event("error", {"detail": str(e)})
+    finally:
+        AGENT_WORKFLOW_LATENCY.observe(time.perf_counter() - start_time)
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/feedback/stream")
+async def generate_feedback_stream(payload: AssignmentRequest):
+    return sse_response(stream_feedback(payload))
@@ -0,0 +1,3 @@
+"""
+Service layer for the document processing API.
+"""
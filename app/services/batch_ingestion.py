@@ -0,0 +1,314 @@
+"""
+Pipelined batch ingestion for bulk document imports.
+Instead of running the single-item /upload flow N times, a batch is pushed
+through shared stages: parallel PDF parsing, batched embedding and NER calls,
+folder-ordered plagiarism search and one bulk Supabase upsert. Per-item status
+events are yielded as soon as each item advances so callers can stream them.
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.services.chunk_embeddings import (
+    CHUNK_EMBEDDINGS_COLUMN,
+    at_storage_precision,
+    decode_chunk_embeddings,
+    embed_texts,
+    encode_chunk_embeddings,
+    pool_embeddings,
+)
+from app.services.content_cache import CachedArtifacts, ContentCache
+from app.services.embedding_codec import storage_value
+from app.services.executor import ExecutionLayer
+from app.services.ingestion import (
+    ParsedDocument,
+    build_document,
+    cache_key,
+    download_pdf,
+    extract_entities_batch,
+    fetch_documents,
+    hours_before_deadline,
+    parse_pdf,
+    upsert_documents,
+)
+from app.services.vector_index import VectorIndexRegistry
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchItem:
+    """State of one document as it moves through the pipeline."""
+
+    uuid: str
+    file_url: str
+    record: Dict[str, Any] = field(default_factory=dict)
+    parsed: Optional[ParsedDocument] = None
+    vector: Optional[List[float]] = None
+    chunk_vectors: Optional[np.ndarray] = None
+    entities: Dict[str, str] = field(default_factory=dict)
+    plagiarism_results: Dict[str, float] = field(default_factory=dict)
+    cluster: Optional[float] = None
+    cache_key: Optional[str] = None
+    cache_hit: bool = False
+    error: Optional[str] = None
+
+    def event(self, status: str, **extra: Any) -> Dict[str, Any]:
+        return {"uuid": self.uuid, "status": status, **extra}
+
+
+def duplicate_uuids(pairs: List[Dict[str, str]]) -> List[str]:
+    """Uuids that appear more than once in a batch, in first-seen order."""
+    counts = Counter(pair["uuid"] for pair in pairs)
+    return [uuid for uuid, count in counts.items() if count > 1]
+
+
+class BatchIngestionPipeline:
+    """Runs many (uuid, file_url) pairs through the staged ingestion pipeline."""
+
+    def __init__(
+        self,
+        execution: ExecutionLayer,
+        content_cache: ContentCache,
+        embedding_model: str,
+        embeddings,
+        ner_model,
+        supabase,
+        vector_index: VectorIndexRegistry,
+        cluster_fn: Callable[[int, int, float, float], Optional[float]],
+        top_k: int = 2,
+        parse_concurrency: int = 4,
+        embed_batch_size: int = 96,
+        embed_concurrency: int = 4,
+        chunk_embedding_dtype: str = "int8",
+        store_chunk_embeddings: bool = False,
+        embedding_dtype: str = "json",
+        pages_per_task: int = 8,
+    ):
+        self.execution = execution
+        self.content_cache = content_cache
+        self.embedding_model = embedding_model
+        self.embeddings = embeddings
+        self.ner_model = ner_model
+        self.supabase = supabase
+        self.vector_index = vector_index
+        self.cluster_fn = cluster_fn
+        self.top_k = top_k
+        self.parse_concurrency = parse_concurrency
+        self.embed_batch_size = embed_batch_size
+        self.embed_concurrency = embed_concurrency
+        self.chunk_embedding_dtype = chunk_embedding_dtype
+        self.store_chunk_embeddings = store_chunk_embeddings
+        self.embedding_dtype = embedding_dtype
+        self.pages_per_task = pages_per_task
+        self.stats: Dict[str, float] = {}
+
+    async def _parse(self, item: BatchItem, semaphore: asyncio.Semaphore) -> BatchItem:
+        async with semaphore:
+            try:
+                source = await self.execution.run_io("pdf_fetch", download_pdf, item.file_url)
+                try:
+                    item.cache_key = cache_key(source, self.embedding_model)
+                    cached = await self.execution.run_io("cache_read", self.content_cache.get, item.cache_key, source.size)
+                    if cached is not None:
+                        item.parsed = build_document(cached.page_texts, cached.chunks)
+                        item.vector = cached.embedding
+                        item.chunk_vectors = decode_chunk_embeddings(cached.chunk_embeddings)
+                        item.entities = cached.entities
+                        item.cache_hit = True
+                    else:
+                        item.parsed = await self.execution.run_cpu(
+                            "pdf_parse", parse_pdf, source.path, self.execution.processes, self.pages_per_task
+                        )
+                finally:
+                    source.cleanup()
+            except Exception as e:
+                item.error = f"parse failed: {str(e)}"
+        return item
+
+    def _cache(self, items: List[BatchItem]) -> None:
+        for item in items:
+            self.content_cache.put(item.cache_key, CachedArtifacts(
+                page_texts=item.parsed.page_texts,
+                chunks=item.parsed.chunks,
+                embedding=item.vector,
+                entities=item.entities,
+                chunk_embeddings=self._encoded_chunks(item),
+            ))
+
+    def _encoded_chunks(self, item: BatchItem) -> Optional[str]:
+        if item.chunk_vectors is None:
+            return None
+        return encode_chunk_embeddings(item.chunk_vectors, self.chunk_embedding_dtype)
+
+    async def _embed(self, items: List[BatchItem]) -> None:
+        # Chunks of all items share the batched calls, then are split back per item
+        texts = [item.parsed.chunks or [item.parsed.markdown_content] for item in items]
+        try:
+            matrix = await embed_texts(
+                self.execution, self.embeddings, [chunk for chunks in texts for chunk in chunks],
+                batch_size=self.embed_batch_size, concurrency=self.embed_concurrency
+            )
+        except Exception as e:
+            for item in items:
+                item.error = f"embedding failed: {str(e)}"
+            return
+
+        offsets = np.cumsum([0] + [len(chunks) for chunks in texts])
+        for item, start, stop in zip(items, offsets[:-1], offsets[1:]):
+            item.vector = pool_embeddings(matrix[start:stop]).tolist()
+            item.chunk_vectors = at_storage_precision(matrix[start:stop], self.chunk_embedding_dtype)
+
+    async def _extract_entities(self, items: List[BatchItem]) -> None:
+        try:
+            results = await self.execution.run_cpu(
+                "ner", extract_entities_batch, self.ner_model, [item.parsed.chunks for item in items]
+            )
+            for item, entities in zip(items, results):
+                item.entities = entities
+        except Exception as e:
+            for item in items:
+                item.error = f"entity extraction failed: {str(e)}"
+
+    def _score(self, items: List[BatchItem]) -> None:
+        # Batch items are staged in a private index so later uploads see earlier ones
+        # without the shared index holding vectors that may never be written
+        staged = VectorIndexRegistry(hnsw_threshold=self.vector_index.hnsw_threshold,
+                                     chunk_mode=self.vector_index.chunk_mode)
+        for item in sorted(items, key=lambda i: i.record["uploadedDate"]):
+            folder = item.record["folder"]
+            uploaded_date = item.record["uploadedDate"]
+            search = dict(k=self.top_k, before=uploaded_date, exclude_id=item.uuid, chunk_embeddings=item.chunk_vectors)
+            batch_matches = staged.query(folder, item.vector, **search)
+            batch_ids = {match.doc_id for match in batch_matches}
+            matches = batch_matches + [
+                match for match in self.vector_index.query(folder, item.vector, **search) if match.doc_id not in batch_ids
+            ]
+            matches = sorted(matches, key=lambda match: match.score, reverse=True)[:self.top_k]
+            item.plagiarism_results = dict((match.name, match.score) for match in matches)
+            plagiarism_score = max(item.plagiarism_results.values()) if item.plagiarism_results else 0.0
+            time_diff = hours_before_deadline(item.record["deadline"], uploaded_date)
+            item.cluster = self.cluster_fn(
+                item.parsed.sentence_count, item.parsed.page_count, time_diff, plagiarism_score
+            )
+            staged.upsert(
+                folder, item.uuid, item.entities["Name"] or "null", uploaded_date, item.vector, item.chunk_vectors
+            )
+
+    def _index(self, items: List[BatchItem]) -> None:
+        for item in items:
+            self.vector_index.upsert(
+                item.record["folder"], item.uuid, item.entities["Name"] or "null", item.record["uploadedDate"],
+                item.vector, item.chunk_vectors
+            )
+
+    def _row(self, item: BatchItem) -> Dict[str, Any]:
+        # Bulk upserts need the same keys on every row; only computed columns are
+        # written so concurrent edits to the rest of the row are not overwritten
+        row = {
+            "id": item.uuid,
+            "nameStudent": item.entities["Name"] or "null",
+            "NRP": item.entities["ID"],
+            "isiTugas": item.parsed.markdown_content,
+            "embedding": storage_value(item.vector, self.embedding_dtype),
+            "page": item.parsed.page_count,
+            "sentences": item.parsed.sentence_count,
+            "plagiarism": item.plagiarism_results,
+            "clustering": item.cluster,
+        }
+        if self.store_chunk_embeddings:
+            row[CHUNK_EMBEDDINGS_COLUMN] = self._encoded_chunks(item)
+        return row
+
+    async def run(self, pairs: List[Dict[str, str]]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a batch and yield status events.
+
+        Args:
+            pairs: Dicts with ``uuid`` and ``file_url`` keys
+
+        Yields:
+            One event per item per stage, followed by a summary event
+        """
+        duplicates = duplicate_uuids(pairs)
+        if duplicates:
+            # One upsert statement cannot touch the same row twice; it would fail the whole batch
+            raise ValueError(f"Duplicate uuids in batch: {', '.join(duplicates)}")
+        started = time.perf_counter()
+        items = [BatchItem(uuid=pair["uuid"], file_url=pair["file_url"]) for pair in pairs]
+
+        records = await self.execution.run_io("supabase_read", fetch_documents, self.supabase, [i.uuid for i in items])
+        for item in items:
+            item.record = records.get(item.uuid, {})
+            if not item.record:
+                item.error = f"No record found with uuid: {item.uuid}"
+                yield item.event("failed", error=item.error)
+
+        # Stage 1: parse in parallel, reporting each document as soon as it is ready
+        semaphore = asyncio.Semaphore(self.parse_concurrency)
+        pending = [self._parse(item, semaphore) for item in items if not item.error]
+        for finished in asyncio.as_completed(pending):
+            item = await finished
+            if item.error:
+                yield item.event("failed", error=item.error)
+            else:
+                yield item.event("parsed", page_count=item.parsed.page_count, cache_hit=item.cache_hit)
+
+        # Stage 2: batched embedding and NER run concurrently over parsed documents not in the cache
+        misses = [item for item in items if not item.error and not item.cache_hit]
+        if misses:
+            await asyncio.gather(self._embed(misses), self._extract_entities(misses))
+        for item in misses:
+            if item.error:
+                yield item.event("failed", error=item.error)
+        fresh = [item for item in misses if not item.error]
+        if fresh:
+            await self.execution.run_io("cache_write", self._cache, fresh, bounded=False)
+        active = [item for item in items if not item.error]
+
+        # Stage 3: plagiarism and clustering, then one bulk write
+        written = 0
+        if active:
+            try:
+                for folder in {item.record["folder"] for item in active}:
+                    await self.execution.run_io("index_load", self.vector_index.ensure_folder, self.supabase, folder)
+                await self.execution.run_cpu("plagiarism", self._score, active)
+                written = await self.execution.run_io(
+                    "supabase_write", upsert_documents, self.supabase, [self._row(item) for item in active]
+                )
+                # Only stored documents may become plagiarism candidates for later uploads
+                await self.execution.run_cpu("index_update", self._index, active, bounded=False)
+            except Exception as e:
+                for item in active:
+                    item.error = f"write failed: {str(e)}"
+        for item in active:
+            if item.error:
+                yield item.event("failed", error=item.error)
+            else:
+                yield item.event(
+                    "completed",
+                    extracted_entities=item.entities,
+                    page_count=item.parsed.page_count,
+                    sentence_count=item.parsed.sentence_count,
+                    plagiarism_results=item.plagiarism_results,
+                )
+
+        elapsed = time.perf_counter() - started
+        completed = sum(1 for item in items if not item.error)
+        self.stats = {
+            "batch_size": len(items),
+            "completed": completed,
+            "cache_hits": sum(1 for item in items if item.cache_hit and not item.error),
+            "failed": len(items) - completed,
+            "rows_written": written,
+            "elapsed_seconds": elapsed,
+            "docs_per_second": completed / elapsed if elapsed > 0 else 0.0,
+        }
+        logger.info(f"Batch ingestion finished: {self.stats}")
+        yield {"status": "summary", **self.stats}
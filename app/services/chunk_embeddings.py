@@ -0,0 +1,79 @@
+"""
+Chunk-level document embeddings.
+Documents used to be embedded as one concatenated string, which the embedding
+model silently truncates to its token limit. This module embeds every upload
+chunk in batched calls, pools the chunk vectors into the document vector and
+stores the chunk matrix through the binary embedding codec, int8-quantized
+(one float32 scale per chunk) by default.
+"""
+
+import asyncio
+from typing import Any, List, Optional
+
+import numpy as np
+
+from app.services.embedding_codec import decode_matrix, encode_embedding
+from app.services.executor import ExecutionLayer
+
+CHUNK_EMBEDDINGS_COLUMN = "chunkEmbeddings"
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1.0)
+
+
+def pool_embeddings(matrix: np.ndarray) -> np.ndarray:
+    """Document vector: normalized mean of the normalized chunk vectors."""
+    pooled = normalize_rows(matrix).mean(axis=0)
+    norm = np.linalg.norm(pooled)
+    return pooled / norm if norm > 0 else pooled
+
+
+def encode_chunk_embeddings(matrix: np.ndarray, dtype: str = "int8") -> str:
+    """Encode a chunk embedding matrix of shape (n_chunks, dim) for storage."""
+    return encode_embedding(np.asarray(matrix, dtype=np.float32).reshape(len(matrix), -1), dtype)
+
+
+def decode_chunk_embeddings(raw: Any) -> Optional[np.ndarray]:
+    """Decode a stored chunk embedding matrix into float32; None if missing or malformed."""
+    return decode_matrix(raw)
+
+
+def at_storage_precision(matrix: np.ndarray, dtype: str = "int8") -> np.ndarray:
+    """
+    The chunk matrix as it reads back from storage or the content cache.
+
+    Fresh and cached uploads both score plagiarism with these values, so the
+    result does not depend on whether the content was seen before.
+    """
+    return decode_chunk_embeddings(encode_chunk_embeddings(matrix, dtype))
+
+
+async def embed_texts(execution: ExecutionLayer, embeddings, texts: List[str],
+                      batch_size: int = 96, concurrency: int = 4) -> np.ndarray:
+    """
+    Embed many texts with batched ``embed_documents`` calls.
+
+    Args:
+        execution: Execution layer whose I/O pool runs the calls
+        embeddings: LangChain embeddings client
+        texts: Texts to embed (chunks of one or many documents)
+        batch_size: Texts per ``embed_documents`` call
+        concurrency: Calls in flight at once
+
+    Returns:
+        float32 matrix with one row per text
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def embed_batch(batch: List[str]):
+        async with semaphore:
+            return await execution.run_io("embed", embeddings.embed_documents, batch)
+
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+    rows = [np.asarray(vector, dtype=np.float32) for result in results for vector in result]
+    if not rows:
+        return np.empty((0, 0), dtype=np.float32)
+    return np.vstack(rows)
@@ -0,0 +1,87 @@
+"""
+Inference helpers for the document clustering model.
+Both /upload and /predict go through these functions so that features are
+always transformed with the persisted training scaler and feature weights;
+nothing is fitted in the request path.
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+FEATURE_COLUMNS = ["sentences", "page", "timing", "plagiarism"]
+FEATURE_WEIGHTS = np.array([0.5, 0.5, 1.5, 4.5])
+
+
+def weighted_features(scaler, X: np.ndarray) -> np.ndarray:
+    """Scale raw features with the training scaler and apply the feature weights."""
+    return scaler.transform(np.asarray(X, dtype=np.float64)) * FEATURE_WEIGHTS
+
+
+def predict_clusters(model, scaler, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Assign clusters to raw feature rows.
+
+    Args:
+        model: Fitted clustering model
+        scaler: Fitted scaler from the training pipeline
+        X: Array of shape (n, 4) ordered as FEATURE_COLUMNS
+
+    Returns:
+        Tuple of (cluster labels, weighted features)
+    """
+    X_weighted = weighted_features(scaler, X)
+    return model.predict(X_weighted), X_weighted
+
+
+def center_distances(model, X_weighted: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Euclidean distance from every row to every cluster center.
+
+    Returns:
+        Array of shape (n, k), or None if the model has no cluster centers
+    """
+    centers = getattr(model, "cluster_centers_", None)
+    if centers is None:
+        return None
+    squared = (
+        np.einsum("ij,ij->i", X_weighted, X_weighted)[:, np.newaxis]
+        - 2.0 * X_weighted @ centers.T
+        + np.einsum("ij,ij->i", centers, centers)[np.newaxis, :]
+    )
+    return np.sqrt(np.maximum(squared, 0.0))
+
+
+def confidence_scores(model, X_weighted: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    """Confidence as 1 / (1 + distance to the assigned center); 1.0 for models without centers."""
+    distances = center_distances(model, X_weighted)
+    if distances is None:
+        return np.ones(len(labels))
+    return 1.0 / (1.0 + distances[np.arange(len(labels)), labels])
+
+
+def infer_clusters(model, scaler, X: np.ndarray, kernel=None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Predict clusters and confidence, using the compiled kernel when available.
+
+    Args:
+        model: Fitted clustering model
+        scaler: Fitted scaler from the training pipeline
+        X: Raw feature rows ordered as FEATURE_COLUMNS
+        kernel: Optional InferenceKernel compiled from the same model and scaler
+
+    Returns:
+        Tuple of (cluster labels, confidence)
+    """
+    if kernel is not None:
+        return kernel.predict(X)
+    labels, X_weighted = predict_clusters(model, scaler, X)
+    return labels, confidence_scores(model, X_weighted, labels)
+
+
+def upload_features(sentence_count: int, page_count: int, time_diff: float, plagiarism_score: float) -> np.ndarray:
+    """
+    Build a feature row the same way preprocess_data does for training:
+    timing is truncated to whole hours and plagiarism is a percentage.
+    """
+    return np.array([[sentence_count, page_count, int(time_diff), round(plagiarism_score * 100, 2)]])
@@ -0,0 +1,177 @@
+"""
+Content-addressed cache for document processing results.
+Parsed page texts, chunks, the document and chunk embeddings and extracted
+entities are cached under a hash of the PDF bytes, so resubmitting the same
+file (even under a different URL) skips parsing, embedding and NER. Entries
+live in an in-memory LRU backed by a SQLite file that survives restarts.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+from app.utils.metrics import CONTENT_CACHE_BYTES_SAVED, CONTENT_CACHE_HITS, CONTENT_CACHE_MISSES
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedArtifacts:
+    """Everything derived from one PDF that does not depend on its database row."""
+
+    page_texts: List[str]
+    chunks: List[str]
+    embedding: List[float]
+    entities: Dict[str, str]
+    chunk_embeddings: Optional[Any] = None
+
+
+class ContentCache:
+    """
+    Two-tier LRU cache keyed by content hash.
+
+    The lock guards only the in-memory tier. Each thread gets its own SQLite
+    connection to a WAL-mode database, so disk lookups run in parallel with
+    each other and with a write. The disk size is kept as a running total;
+    the table is summed again only when eviction runs.
+    """
+
+    def __init__(self, path: str, memory_items: int = 256, disk_max_bytes: int = 1 << 30):
+        self.path = path
+        self.memory_items = memory_items
+        self.disk_max_bytes = disk_max_bytes
+        self._memory: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._evict_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        db = self._connection()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "namespace TEXT NOT NULL, key TEXT NOT NULL, payload BLOB NOT NULL, "
+            "size INTEGER NOT NULL, accessed REAL NOT NULL, PRIMARY KEY (namespace, key))"
+        )
+        db.commit()
+        self._disk_bytes = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            # check_same_thread=False only so close() can close every thread's connection
+            db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+            with self._connections_lock:
+                self._connections.append(db)
+        return db
+
+    def _remember(self, memory_key: str, value: Any) -> None:
+        with self._lock:
+            self._memory[memory_key] = value
+            self._memory.move_to_end(memory_key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def get_raw(self, namespace: str, key: str) -> Optional[Any]:
+        """
+        Look up a JSON-serializable value.
+
+        Args:
+            namespace: Logical cache section, e.g. ``documents``
+            key: Entry key within the namespace
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        memory_key = f"{namespace}:{key}"
+        with self._lock:
+            if memory_key in self._memory:
+                self._memory.move_to_end(memory_key)
+                CONTENT_CACHE_HITS.labels(namespace=namespace, tier="memory").inc()
+                return self._memory[memory_key]
+
+        db = self._connection()
+        row = db.execute(
+            "SELECT payload FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        if row is None:
+            CONTENT_CACHE_MISSES.labels(namespace=namespace).inc()
+            return None
+
+        db.execute(
+            "UPDATE entries SET accessed = ? WHERE namespace = ? AND key = ?", (time.time(), namespace, key)
+        )
+        db.commit()
+        value = json.loads(zlib.decompress(row[0]))
+        self._remember(memory_key, value)
+        CONTENT_CACHE_HITS.labels(namespace=namespace, tier="disk").inc()
+        return value
+
+    def put_raw(self, namespace: str, key: str, value: Any) -> None:
+        """Store a JSON-serializable value in both tiers."""
+        payload = zlib.compress(json.dumps(value).encode("utf-8"))
+        self._remember(f"{namespace}:{key}", value)
+        db = self._connection()
+        previous = db.execute(
+            "SELECT size FROM entries WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        db.execute(
+            "INSERT OR REPLACE INTO entries (namespace, key, payload, size, accessed) VALUES (?, ?, ?, ?, ?)",
+            (namespace, key, payload, len(payload), time.time()),
+        )
+        db.commit()
+        with self._lock:
+            self._disk_bytes += len(payload) - (previous[0] if previous else 0)
+            over = self._disk_bytes > self.disk_max_bytes
+        if over:
+            self._evict_disk(db)
+
+    def _evict_disk(self, db: sqlite3.Connection) -> None:
+        # One evictor at a time; a writer that finds eviction running skips it
+        if not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            freed = 0
+            if total > self.disk_max_bytes:
+                for namespace, key, size in db.execute(
+                    "SELECT namespace, key, size FROM entries ORDER BY accessed ASC"
+                ).fetchall():
+                    if total - freed <= self.disk_max_bytes:
+                        break
+                    db.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+                    freed += size
+                db.commit()
+                logger.info(f"Evicted {freed} bytes from content cache")
+            with self._lock:
+                self._disk_bytes = total - freed
+        finally:
+            self._evict_lock.release()
+
+    def get(self, key: str, source_size: int = 0) -> Optional[CachedArtifacts]:
+        """Look up document artifacts; ``source_size`` is counted as bytes saved on a hit."""
+        value = self.get_raw("documents", key)
+        if value is None:
+            return None
+        CONTENT_CACHE_BYTES_SAVED.inc(source_size)
+        return CachedArtifacts(**value)
+
+    def put(self, key: str, artifacts: CachedArtifacts) -> None:
+        """Store document artifacts."""
+        self.put_raw("documents", key, asdict(artifacts))
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for db in self._connections:
+                db.close()
+            self._connections.clear()
@@ -0,0 +1,150 @@
+"""
+Binary embedding codec.
+Embeddings used to be stored as JSON lists of floats, which is several times
+larger than the raw vector and has to be parsed number by number on every
+plagiarism check. This module packs a vector or matrix into little-endian
+float32, float16 or per-row scaled int8 behind a small versioned header and
+base64-encodes it for a text column (see
+app/migrations/002_embedding_text_column.sql). Until that migration is applied
+documents are stored in the ``json`` format, a plain list of floats. Decoding
+accepts both, so rows can be migrated gradually.
+
+Layout (little-endian)::
+
+    magic "NGEM" | version u8 | dtype u8 | rows u32 | dim u32 | [scales f32 * rows] | data
+"""
+
+import base64
+import binascii
+import json
+import struct
+from typing import Any, Optional
+
+import numpy as np
+
+MAGIC = b"NGEM"
+VERSION = 1
+HEADER = struct.Struct("<4sBBII")
+# Base64 of the first three magic bytes, recognises encoded values without decoding them
+ENCODED_PREFIX = base64.b64encode(MAGIC[:3]).decode("ascii")
+
+DTYPE_CODES = {"float32": 1, "float16": 2, "int8": 3}
+# Storage formats for document embeddings: the codec dtypes, or the legacy JSON list
+STORAGE_FORMATS = ("json", *DTYPE_CODES)
+DTYPE_NAMES = {code: name for name, code in DTYPE_CODES.items()}
+NUMPY_DTYPES = {"float32": np.dtype("<f4"), "float16": np.dtype("<f2"), "int8": np.dtype("i1")}
+
+
+class EmbeddingDecodeError(ValueError):
+    """Raised when an encoded embedding is truncated or has an unknown header."""
+
+
+def encode_embedding(values: Any, dtype: str = "float16") -> str:
+    """
+    Encode a vector or matrix as a base64 string with a versioned header.
+
+    Args:
+        values: 1-D vector or 2-D matrix of floats
+        dtype: Storage type, ``float32``, ``float16`` or ``int8`` (per-row scale)
+
+    Returns:
+        ASCII string suitable for a text or jsonb column
+    """
+    if dtype not in DTYPE_CODES:
+        raise ValueError(f"Unsupported embedding dtype: {dtype}")
+    matrix = np.asarray(values, dtype=np.float32)
+    matrix = matrix.reshape(1, -1) if matrix.ndim == 1 else matrix
+    rows, dim = matrix.shape
+    parts = [HEADER.pack(MAGIC, VERSION, DTYPE_CODES[dtype], rows, dim)]
+    if dtype == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0 if dim else np.ones(rows, dtype=np.float32)
+        scales[scales == 0] = 1.0
+        parts.append(scales.astype("<f4").tobytes())
+        matrix = np.clip(np.rint(matrix / scales[:, np.newaxis]), -127, 127)
+    parts.append(matrix.astype(NUMPY_DTYPES[dtype]).tobytes())
+    return base64.b64encode(b"".join(parts)).decode("ascii")
+
+
+def storage_value(vector: Any, storage_format: str = "json") -> Any:
+    """
+    Column value for a document embedding.
+
+    Args:
+        vector: 1-D embedding
+        storage_format: ``json`` for a list of floats (accepted by vector, jsonb
+            and text columns) or a codec dtype once the column is text
+
+    Returns:
+        A list of floats or a codec string
+    """
+    if storage_format == "json":
+        return np.asarray(vector, dtype=np.float32).tolist()
+    return encode_embedding(vector, storage_format)
+
+
+def decode_binary(data: bytes) -> np.ndarray:
+    """Decode raw codec bytes into a float32 matrix of shape (rows, dim)."""
+    if len(data) < HEADER.size:
+        raise EmbeddingDecodeError("Encoded embedding is shorter than its header")
+    magic, version, dtype_code, rows, dim = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise EmbeddingDecodeError("Encoded embedding has an unknown magic")
+    if version != VERSION:
+        raise EmbeddingDecodeError(f"Unsupported embedding codec version: {version}")
+    dtype = DTYPE_NAMES.get(dtype_code)
+    if dtype is None:
+        raise EmbeddingDecodeError(f"Unsupported embedding dtype code: {dtype_code}")
+
+    offset = HEADER.size
+    scales = None
+    if dtype == "int8":
+        scales = np.frombuffer(data, dtype="<f4", count=rows, offset=offset)
+        offset += 4 * rows
+    expected = offset + rows * dim * NUMPY_DTYPES[dtype].itemsize
+    if len(data) != expected:
+        raise EmbeddingDecodeError(f"Encoded embedding has {len(data)} bytes, expected {expected}")
+    matrix = np.frombuffer(data, dtype=NUMPY_DTYPES[dtype], count=rows * dim, offset=offset).reshape(rows, dim)
+    matrix = matrix.astype(np.float32)
+    if scales is not None:
+        matrix *= scales[:, np.newaxis]
+    return matrix
+
+
+def is_encoded(raw: Any) -> bool:
+    """True if ``raw`` is already in the binary codec format."""
+    return isinstance(raw, str) and raw.startswith(ENCODED_PREFIX)
+
+
+def decode_matrix(raw: Any) -> Optional[np.ndarray]:
+    """
+    Decode a stored embedding matrix in any supported format.
+
+    Args:
+        raw: Codec string, raw codec bytes, JSON string, nested list or numpy array
+
+    Returns:
+        float32 matrix of shape (rows, dim), or None if missing or malformed
+    """
+    if raw is None:
+        return None
+    try:
+        if isinstance(raw, (bytes, bytearray, memoryview)):
+            matrix = decode_binary(bytes(raw))
+        elif is_encoded(raw):
+            matrix = decode_binary(base64.b64decode(raw, validate=True))
+        else:
+            if isinstance(raw, str):
+                raw = json.loads(raw)
+            matrix = np.asarray(raw, dtype=np.float32)
+            matrix = matrix.reshape(1, -1) if matrix.ndim == 1 else matrix
+    except (TypeError, ValueError, binascii.Error):
+        return None
+    return matrix if matrix.ndim == 2 and matrix.size else None
+
+
+def decode_embedding(raw: Any) -> Optional[np.ndarray]:
+    """Decode a stored single-vector embedding into a 1-D float32 array; None if unusable."""
+    matrix = decode_matrix(raw)
+    if matrix is None or matrix.shape[0] != 1:
+        return None
+    return matrix[0]
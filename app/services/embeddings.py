@@ -0,0 +1,318 @@
+"""
+Pluggable embedding backends.
+Every consumer talks to the LangChain ``Embeddings`` interface
+(``embed_documents``/``embed_query``). The remote backend is Pinecone's hosted
+multilingual-e5-large; the local backend runs an int8-quantized ONNX export of
+the same model on CPU with ONNX Runtime. Concurrent requests to the local
+backend are merged by a dynamic batcher so the CPU runs few, well-filled
+batches instead of many single-chunk ones.
+
+The ONNX model and its ``tokenizer.json`` are prepared offline, e.g.::
+
+    optimum-cli export onnx --model intfloat/multilingual-e5-large e5/
+    optimum-cli onnxruntime quantize --onnx_model e5/ --avx512_vnni -o e5-int8/
+
+Throughput, latency and agreement with the remote vectors are measured with
+``python -m benchmarks.embeddings``; with ``--model`` and ``--tokenizer`` it
+runs the real export, otherwise a stand-in encoder.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.utils.metrics import EMBEDDING_BATCH_SIZE, EMBEDDING_INFERENCE_DURATION
+
+logger = logging.getLogger(__name__)
+
+REMOTE_MODEL = "multilingual-e5-large"
+# e5 models are trained with these input prefixes; Pinecone adds them server-side
+PASSAGE_PREFIX = "passage: "
+QUERY_PREFIX = "query: "
+
+
+class DynamicBatcher:
+    """
+    Merges concurrent embedding requests into batches on one worker thread.
+
+    A batch is dispatched once it holds ``max_batch_size`` texts or the oldest
+    request has waited ``max_wait_ms``, whichever comes first.
+    """
+
+    def __init__(self, fn: Callable[[List[str]], np.ndarray], max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.fn = fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[Optional[Tuple[List[str], Future]]]" = queue.Queue()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, texts: List[str]) -> Future:
+        if self._closed:
+            raise RuntimeError("Embedding batcher is closed")
+        future: Future = Future()
+        self._queue.put((texts, future))
+        return future
+
+    def _collect(self, first: Tuple[List[str], Future]) -> Tuple[List[Tuple[List[str], Future]], bool]:
+        requests = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if request is None:
+                return requests, True
+            requests.append(request)
+            size += len(request[0])
+        return requests, False
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            requests, stop = self._collect(first)
+            texts = [text for request_texts, _ in requests for text in request_texts]
+            try:
+                vectors = self.fn(texts)
+                offset = 0
+                for request_texts, future in requests:
+                    future.set_result(vectors[offset:offset + len(request_texts)])
+                    offset += len(request_texts)
+            except Exception as e:
+                for _, future in requests:
+                    future.set_exception(e)
+            if stop:
+                return
+
+    def close(self) -> None:
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join(timeout=5)
+
+
+class OnnxE5Embeddings(Embeddings):
+    """
+    multilingual-e5 on CPU through ONNX Runtime, with dynamic batching.
+
+    ``session`` and ``tokenizer`` replace the files at ``model_path`` and
+    ``tokenizer_path`` when given; they need the ``run``/``get_inputs`` and
+    ``encode_batch`` methods of the ONNX Runtime session and the tokenizers
+    ``Tokenizer``.
+    """
+
+    def __init__(
+        self,
+        model_path: Optional[str] = None,
+        tokenizer_path: Optional[str] = None,
+        max_length: int = 512,
+        max_batch_size: int = 32,
+        max_batch_tokens: int = 8192,
+        max_padding_ratio: float = 1.25,
+        max_wait_ms: float = 5.0,
+        intra_op_threads: int = 0,
+        session: Any = None,
+        tokenizer: Any = None,
+    ):
+        if session is None:
+            import onnxruntime as ort
+
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if intra_op_threads:
+                options.intra_op_num_threads = intra_op_threads
+            session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.session = session
+        self.input_names = {node.name for node in self.session.get_inputs()}
+
+        if tokenizer is None:
+            from tokenizers import Tokenizer
+
+            tokenizer = Tokenizer.from_file(tokenizer_path)
+            tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer = tokenizer
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_padding_ratio = max_padding_ratio
+        self.batcher = DynamicBatcher(self._encode, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+        logger.info(f"Loaded ONNX embedding model from {model_path or type(session).__name__}")
+
+    def _run_batch(self, encodings: List[Any]) -> np.ndarray:
+        length = max(len(encoding.ids) for encoding in encodings)
+        input_ids = np.zeros((len(encodings), length), dtype=np.int64)
+        attention_mask = np.zeros((len(encodings), length), dtype=np.int64)
+        for row, encoding in enumerate(encodings):
+            input_ids[row, :len(encoding.ids)] = encoding.ids
+            attention_mask[row, :len(encoding.ids)] = 1
+        feeds: Dict[str, Any] = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        hidden = self.session.run(None, feeds)[0]
+        if hidden.ndim == 3:
+            # Mean pooling over real tokens, as in the e5 reference implementation
+            mask = attention_mask[:, :, np.newaxis].astype(np.float32)
+            hidden = (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        norms = np.linalg.norm(hidden, axis=1, keepdims=True)
+        return (hidden / np.where(norms > 0, norms, 1.0)).astype(np.float32)
+
+    def _sub_batches(self, lengths: List[int]) -> List[List[int]]:
+        # Texts sorted by token count; a sub-batch closes when it is full, over the
+        # token budget or would pad its shortest text by more than max_padding_ratio
+        order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+        batches: List[List[int]] = []
+        for i in order:
+            batch = batches[-1] if batches else None
+            if (batch is None or len(batch) >= self.max_batch_size
+                    or lengths[i] * (len(batch) + 1) > self.max_batch_tokens
+                    or lengths[i] > self.max_padding_ratio * max(lengths[batch[0]], 1)):
+                batches.append([i])
+            else:
+                batch.append(i)
+        return batches
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        vectors: Optional[np.ndarray] = None
+        for batch in self._sub_batches([len(encoding.ids) for encoding in encodings]):
+            started = time.perf_counter()
+            result = self._run_batch([encodings[i] for i in batch])
+            EMBEDDING_INFERENCE_DURATION.labels(backend="onnx").observe(time.perf_counter() - started)
+            EMBEDDING_BATCH_SIZE.labels(backend="onnx").observe(len(batch))
+            if vectors is None:
+                vectors = np.empty((len(texts), result.shape[1]), dtype=np.float32)
+            vectors[batch] = result
+        return vectors if vectors is not None else np.empty((0, 0), dtype=np.float32)
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self.batcher.submit(texts).result().tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed([PASSAGE_PREFIX + text for text in texts])
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([QUERY_PREFIX + text])[0]
+
+    def close(self) -> None:
+        self.batcher.close()
+
+
+def embedding_model_id(settings) -> str:
+    """Identity of the configured embedding model, used in content cache keys."""
+    if settings.EMBEDDING_BACKEND == "onnx":
+        return f"{REMOTE_MODEL}-onnx-int8"
+    return REMOTE_MODEL
+
+
+def create_embedding_backend(settings) -> Embeddings:
+    """
+    Build the embedding backend selected by ``EMBEDDING_BACKEND``.
+
+    Args:
+        settings: Application settings
+
+    Returns:
+        An ``Embeddings`` implementation
+    """
+    if settings.EMBEDDING_BACKEND == "onnx":
+        return OnnxE5Embeddings(
+            settings.EMBEDDING_ONNX_MODEL_PATH,
+            settings.EMBEDDING_ONNX_TOKENIZER_PATH,
+            max_length=settings.EMBEDDING_MAX_LENGTH,
+            max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+            max_batch_tokens=settings.EMBEDDING_MAX_BATCH_TOKENS,
+            max_wait_ms=settings.EMBEDDING_MAX_WAIT_MS,
+            intra_op_threads=settings.EMBEDDING_ONNX_THREADS,
+        )
+    if settings.EMBEDDING_BACKEND == "pinecone":
+        from langchain_pinecone import PineconeEmbeddings
+        return PineconeEmbeddings(model=REMOTE_MODEL, pinecone_api_key=settings.PINECONE_API_KEY)
+    raise ValueError(f"Unknown embedding backend: {settings.EMBEDDING_BACKEND}")
+
+
+def compare_backends(reference: Embeddings, candidate: Embeddings, texts: List[str]) -> Dict[str, float]:
+    """
+    Measure numerical agreement and latency of two backends on the same texts.
+
+    Args:
+        reference: Backend whose vectors are taken as ground truth (the remote one)
+        candidate: Backend under test
+        texts: Sample passages
+
+    Returns:
+        Cosine agreement statistics, nearest-neighbour agreement and timings
+    """
+    timings = {}
+    vectors = []
+    for name, backend in (("reference", reference), ("candidate", candidate)):
+        started = time.perf_counter()
+        matrix = np.asarray(backend.embed_documents(texts), dtype=np.float32)
+        timings[f"{name}_seconds"] = time.perf_counter() - started
+        vectors.append(matrix / np.linalg.norm(matrix, axis=1, keepdims=True))
+    reference_vectors, candidate_vectors = vectors
+
+    cosine = (reference_vectors * candidate_vectors).sum(axis=1)
+    # Agreement of each text's nearest other text, which is what plagiarism search depends on
+    neighbours = []
+    for matrix in (reference_vectors, candidate_vectors):
+        similarity = matrix @ matrix.T
+        np.fill_diagonal(similarity, -np.inf)
+        neighbours.append(similarity.argmax(axis=1))
+    return {
+        "texts": len(texts),
+        "cosine_mean": float(cosine.mean()),
+        "cosine_min": float(cosine.min()),
+        "nearest_neighbour_agreement": float((neighbours[0] == neighbours[1]).mean()) if len(texts) > 1 else 1.0,
+        **timings,
+        "candidate_texts_per_second": len(texts) / timings["candidate_seconds"] if timings["candidate_seconds"] else 0.0,
+    }
+
+
+def benchmark_backend(backend: Embeddings, texts: List[str], concurrency: int = 8,
+                      texts_per_request: int = 4) -> Dict[str, float]:
+    """
+    Throughput and per-request latency under concurrent load.
+
+    Args:
+        backend: Backend under test
+        texts: Passages to embed
+        concurrency: Threads issuing requests at once
+        texts_per_request: Texts per ``embed_documents`` call
+
+    Returns:
+        Throughput and latency percentiles in milliseconds
+    """
+    requests = [texts[i:i + texts_per_request] for i in range(0, len(texts), texts_per_request)]
+    latencies: List[float] = []
+
+    def timed(batch: List[str]) -> None:
+        started = time.perf_counter()
+        backend.embed_documents(batch)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, requests))
+    elapsed = time.perf_counter() - started
+    return {
+        "texts": len(texts),
+        "concurrency": concurrency,
+        "texts_per_second": len(texts) / elapsed if elapsed > 0 else 0.0,
+        "latency_p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "latency_p95_ms": float(np.percentile(latencies, 95) * 1000),
+    }
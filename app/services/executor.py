@@ -0,0 +1,128 @@
+"""
+Bounded execution layer for blocking work in async request handlers.
+This module provides separate worker pools for CPU-bound stages (PDF parsing,
+GLiNER) and I/O-bound stages (embedding HTTP calls, Supabase) so that slow
+documents never block the event loop, and rejects work once a pool is saturated.
+A process pool is available to CPU stages that can split their work further,
+such as page-parallel PDF extraction.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from app.core.exceptions import ServiceOverloadedError
+from app.utils.metrics import (
+    STAGE_QUEUE_WAIT,
+    STAGE_RUN_DURATION,
+    WORKER_POOL_QUEUE_DEPTH,
+    WORKER_POOL_REJECTIONS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPool:
+    """A thread pool with a hard limit on queued plus running tasks."""
+
+    def __init__(self, name: str, max_workers: int, max_queue: int):
+        self.name = name
+        self.capacity = max_workers + max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-pool")
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _acquire(self, stage: str, bounded: bool) -> None:
+        with self._lock:
+            if bounded and self._pending >= self.capacity:
+                WORKER_POOL_REJECTIONS.labels(pool=self.name, stage=stage).inc()
+                raise ServiceOverloadedError(self.name)
+            self._pending += 1
+            WORKER_POOL_QUEUE_DEPTH.labels(pool=self.name).set(self._pending)
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending -= 1
+            WORKER_POOL_QUEUE_DEPTH.labels(pool=self.name).set(self._pending)
+
+    async def run(self, stage: str, fn: Callable[..., Any], *args: Any, bounded: bool = True, **kwargs: Any) -> Any:
+        """
+        Run a blocking callable on the pool and await its result.
+
+        Args:
+            stage: Stage name used for metrics labels
+            fn: Blocking callable to execute
+            bounded: Reject with ServiceOverloadedError when the pool is full
+
+        Returns:
+            The callable's return value
+        """
+        self._acquire(stage, bounded)
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            STAGE_QUEUE_WAIT.labels(pool=self.name, stage=stage).observe(started - submitted)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                STAGE_RUN_DURATION.labels(pool=self.name, stage=stage).observe(time.perf_counter() - started)
+
+        try:
+            future = self._executor.submit(task)
+        except BaseException:
+            self._release()
+            raise
+        # The slot frees when the thread is done, not when a cancelled caller stops waiting
+        future.add_done_callback(lambda _: self._release())
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ExecutionLayer:
+    """CPU and I/O worker pools shared by all request handlers."""
+
+    def __init__(self, cpu_workers: int, cpu_queue: int, io_workers: int, io_queue: int, process_workers: int = 0):
+        self.cpu = WorkerPool("cpu", cpu_workers, cpu_queue)
+        self.io = WorkerPool("io", io_workers, io_queue)
+        self.process_workers = process_workers
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._processes_lock = threading.Lock()
+
+    @property
+    def processes(self) -> Optional[ProcessPoolExecutor]:
+        """Process pool for CPU stages that fan out further; None when disabled."""
+        if self.process_workers <= 0:
+            return None
+        with self._processes_lock:
+            if self._processes is None:
+                # spawn: forking a process that holds torch and pool threads is not safe
+                self._processes = ProcessPoolExecutor(
+                    max_workers=self.process_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._processes
+
+    async def run_cpu(self, stage: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run a CPU-bound stage such as parsing or NER."""
+        return await self.cpu.run(stage, fn, *args, **kwargs)
+
+    async def run_io(self, stage: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run an I/O-bound stage such as an HTTP or database call."""
+        return await self.io.run(stage, fn, *args, **kwargs)
+
+    def shutdown(self) -> None:
+        logger.info("Shutting down worker pools")
+        self.cpu.shutdown()
+        self.io.shutdown()
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
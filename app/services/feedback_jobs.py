@@ -0,0 +1,205 @@
+"""
+Folder-level feedback jobs.
+Generates agent feedback for every submission in a folder. The relevance
+analysis, which only depends on the folder, is computed once up front and
+passed to every document; the documents fan out with bounded concurrency.
+Transient LLM errors are retried by the LLM gateway, so a document whose run
+still fails is recorded as failed instead of being retried here. Per-document
+progress is stored in SQLite, and running the job again resumes where it
+stopped: only documents without stored feedback, failed ones included, run.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TokenUsage:
+    """LLM usage accumulated while generating one or more feedbacks."""
+
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+    def add(self, other: "TokenUsage") -> None:
+        self.calls += other.calls
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256((content or "").encode("utf-8")).hexdigest()
+
+
+class FeedbackJobStore:
+    """SQLite record of per-document feedback status and results."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS feedback_items ("
+            "folder TEXT NOT NULL, document_id TEXT NOT NULL, content_hash TEXT NOT NULL, "
+            "status TEXT NOT NULL, attempts INTEGER NOT NULL, result TEXT, error TEXT, "
+            "input_tokens INTEGER NOT NULL DEFAULT 0, output_tokens INTEGER NOT NULL DEFAULT 0, "
+            "updated_at REAL NOT NULL, PRIMARY KEY (folder, document_id))"
+        )
+        self._db.commit()
+
+    def completed(self, folder: str) -> Dict[str, str]:
+        """Content hash of every document in ``folder`` that already has feedback."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT document_id, content_hash FROM feedback_items WHERE folder = ? AND status = 'done'",
+                (folder,)
+            ).fetchall()
+        return dict(rows)
+
+    def record(self, folder: str, document_id: str, digest: str, status: str, attempts: int,
+               result: Optional[Dict[str, Any]] = None, error: Optional[str] = None,
+               usage: Optional[TokenUsage] = None) -> None:
+        usage = usage or TokenUsage()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO feedback_items VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    folder, document_id, digest, status, attempts,
+                    json.dumps(result, ensure_ascii=False) if result is not None else None,
+                    error, usage.input_tokens, usage.output_tokens, time.time()
+                )
+            )
+            self._db.commit()
+
+    def results(self, folder: str) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT document_id, status, result, error FROM feedback_items WHERE folder = ?", (folder,)
+            ).fetchall()
+        return {
+            document_id: {"status": status, "result": json.loads(result) if result else None, "error": error}
+            for document_id, status, result, error in rows
+        }
+
+    def summary(self, folder: str) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT status, COUNT(*), SUM(input_tokens), SUM(output_tokens) "
+                "FROM feedback_items WHERE folder = ? GROUP BY status", (folder,)
+            ).fetchall()
+        counts = {status: count for status, count, _, _ in rows}
+        return {
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "input_tokens": int(sum(row[2] or 0 for row in rows)),
+            "output_tokens": int(sum(row[3] or 0 for row in rows)),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+RunDocument = Callable[[Dict[str, Any], Optional[str]], Awaitable[Tuple[Dict[str, Any], TokenUsage]]]
+AnalyzeRelevance = Callable[[], Awaitable[Tuple[str, TokenUsage]]]
+
+
+class FolderFeedbackJob:
+    """Generates feedback for a folder's documents, skipping ones already done."""
+
+    def __init__(self, folder: str, run_document: RunDocument, store: FeedbackJobStore,
+                 analyze_relevance: Optional[AnalyzeRelevance] = None, concurrency: int = 4):
+        self.folder = folder
+        self.run_document = run_document
+        self.store = store
+        self.analyze_relevance = analyze_relevance
+        self.concurrency = concurrency
+        self.usage = TokenUsage()
+        self.stats: Dict[str, Any] = {
+            "total": 0, "pending": 0, "skipped": 0, "completed": 0, "failed": 0,
+            "status": "pending", "elapsed_seconds": 0.0, "docs_per_second": 0.0,
+        }
+
+    async def _process(self, document: Dict[str, Any], relevance: Optional[str]) -> Optional[Dict[str, Any]]:
+        document_id = document["id"]
+        digest = content_hash(document.get("isiTugas"))
+        try:
+            result, usage = await self.run_document(document, relevance)
+        except Exception as e:
+            # The gateway already retried transient LLM errors; a rerun of the job picks this up again
+            logger.error(f"Feedback for {document_id} failed: {str(e)}")
+            await asyncio.to_thread(self.store.record, self.folder, document_id, digest, "failed", 1, None, str(e))
+            self.stats["failed"] += 1
+            return None
+
+        self.usage.add(usage)
+        await asyncio.to_thread(self.store.record, self.folder, document_id, digest, "done", 1, result, None, usage)
+        self.stats["completed"] += 1
+        return result
+
+    async def _relevance(self) -> Optional[str]:
+        if self.analyze_relevance is None:
+            return None
+        try:
+            relevance, usage = await self.analyze_relevance()
+        except Exception as e:
+            # Each document's workflow computes it instead
+            logger.warning(f"Relevance analysis for {self.folder} failed: {str(e)}")
+            return None
+        self.usage.add(usage)
+        return relevance
+
+    async def run(self, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Generate feedback for every document whose content has no stored feedback yet.
+
+        Args:
+            documents: ``documents`` rows of the folder (``id`` and ``isiTugas`` at least)
+
+        Returns:
+            Job statistics including throughput and token usage
+        """
+        started = time.perf_counter()
+        self.stats["status"] = "running"
+        done = await asyncio.to_thread(self.store.completed, self.folder)
+        pending = [doc for doc in documents if done.get(doc["id"]) != content_hash(doc.get("isiTugas"))]
+        self.stats.update(total=len(documents), pending=len(pending), skipped=len(documents) - len(pending))
+
+        try:
+            if pending:
+                relevance = await self._relevance()
+                semaphore = asyncio.Semaphore(self.concurrency)
+
+                async def bounded(document: Dict[str, Any]):
+                    async with semaphore:
+                        return await self._process(document, relevance)
+
+                await asyncio.gather(*(bounded(document) for document in pending))
+            self.stats["status"] = "finished"
+        except asyncio.CancelledError:
+            self.stats["status"] = "cancelled"
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            processed = self.stats["completed"] + self.stats["failed"]
+            self.stats.update(
+                elapsed_seconds=round(elapsed, 3),
+                docs_per_second=round(processed / elapsed, 3) if elapsed > 0 else 0.0,
+                llm_calls=self.usage.calls,
+                input_tokens=self.usage.input_tokens,
+                output_tokens=self.usage.output_tokens,
+                tokens_per_second=round((self.usage.input_tokens + self.usage.output_tokens) / elapsed, 1)
+                if elapsed > 0 else 0.0,
+            )
+            logger.info(f"Folder feedback job for {self.folder}: {self.stats}")
+        return self.stats
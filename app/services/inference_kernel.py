@@ -0,0 +1,133 @@
+"""
+Numpy-only inference kernel for the clustering model.
+For our small KMeans/GMM models sklearn's input validation costs far more
+than the math itself. This module folds the MinMaxScaler, the feature weights
+and the model parameters into a few arrays so that prediction is an affine
+transform followed by one distance or log-likelihood evaluation.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.mixture import GaussianMixture
+from sklearn.preprocessing import MinMaxScaler
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class InferenceKernel:
+    """Compiled scaler + weights + model parameters."""
+
+    kind: str
+    scale: np.ndarray
+    offset: np.ndarray
+    centers: np.ndarray
+    precisions_chol: Optional[np.ndarray] = None
+    log_prior: Optional[np.ndarray] = None
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """Scaled and weighted features, equivalent to ``scaler.transform(X) * weights``."""
+        return np.asarray(X, dtype=np.float64) * self.scale + self.offset
+
+    def predict(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Predict clusters and confidence for raw feature rows.
+
+        Args:
+            X: Array of shape (n, d) in training feature order
+
+        Returns:
+            Tuple of (labels, confidence)
+        """
+        X_weighted = self.transform(X)
+        if self.kind == "centroid":
+            squared = (
+                np.einsum("ij,ij->i", X_weighted, X_weighted)[:, np.newaxis]
+                - 2.0 * X_weighted @ self.centers.T
+                + np.einsum("ij,ij->i", self.centers, self.centers)[np.newaxis, :]
+            )
+            labels = np.argmin(squared, axis=1)
+            distance = np.sqrt(np.maximum(squared[np.arange(len(labels)), labels], 0.0))
+            return labels, 1.0 / (1.0 + distance)
+
+        # Gaussian mixture: argmax of log N(x | mu_k, Sigma_k) + log pi_k
+        n_components, n_features, _ = self.precisions_chol.shape
+        stacked = self.precisions_chol.transpose(1, 0, 2).reshape(n_features, n_components * n_features)
+        projected = (X_weighted @ stacked).reshape(len(X_weighted), n_components, n_features)
+        projected -= np.einsum("kd,kde->ke", self.centers, self.precisions_chol)[np.newaxis, :, :]
+        log_prob = -0.5 * np.einsum("nke,nke->nk", projected, projected) + self.log_prior
+        return np.argmax(log_prob, axis=1), np.ones(len(X_weighted))
+
+
+def _full_precisions_cholesky(model: GaussianMixture) -> np.ndarray:
+    n_components, n_features = model.means_.shape
+    chol = model.precisions_cholesky_
+    if model.covariance_type == "full":
+        return chol
+    if model.covariance_type == "tied":
+        return np.broadcast_to(chol, (n_components, n_features, n_features)).copy()
+    if model.covariance_type == "diag":
+        return np.einsum("kd,de->kde", chol, np.eye(n_features))
+    return chol[:, np.newaxis, np.newaxis] * np.eye(n_features)[np.newaxis, :, :]
+
+
+def compile_kernel(model, scaler, weights: np.ndarray) -> Optional[InferenceKernel]:
+    """
+    Compile a fitted model and scaler into an InferenceKernel.
+
+    Args:
+        model: Fitted KMeans or GaussianMixture
+        scaler: Fitted MinMaxScaler
+        weights: Feature weights applied after scaling
+
+    Returns:
+        The kernel, or None if the model/scaler type is not supported
+    """
+    if not isinstance(scaler, MinMaxScaler):
+        return None
+    weights = np.asarray(weights, dtype=np.float64)
+    scale = scaler.scale_ * weights
+    offset = scaler.min_ * weights
+
+    if isinstance(model, (KMeans, MiniBatchKMeans)):
+        return InferenceKernel("centroid", scale, offset, np.asarray(model.cluster_centers_, dtype=np.float64))
+
+    if isinstance(model, GaussianMixture):
+        precisions_chol = _full_precisions_cholesky(model)
+        n_features = model.means_.shape[1]
+        log_det = np.log(np.diagonal(precisions_chol, axis1=1, axis2=2)).sum(axis=1)
+        log_prior = np.log(model.weights_) + log_det - 0.5 * n_features * np.log(2 * np.pi)
+        return InferenceKernel("gmm", scale, offset, model.means_, precisions_chol, log_prior)
+
+    # BisectingKMeans predicts by walking its bisection tree, not by nearest center
+    return None
+
+
+def verify_kernel(kernel: InferenceKernel, model, scaler, weights: np.ndarray,
+                  n_samples: int = 512, seed: int = 0) -> bool:
+    """Check that the kernel reproduces sklearn's labels on points spanning the training range."""
+    rng = np.random.default_rng(seed)
+    low, high = scaler.data_min_, scaler.data_max_
+    X = rng.uniform(low, high, size=(n_samples, len(low)))
+    expected = model.predict(scaler.transform(X) * weights)
+    labels, _ = kernel.predict(X)
+    mismatches = int(np.sum(labels != expected))
+    if mismatches:
+        logger.warning(f"Inference kernel disagrees with sklearn on {mismatches}/{n_samples} samples")
+    return mismatches == 0
+
+
+def build_kernel(model, scaler, weights: np.ndarray) -> Optional[InferenceKernel]:
+    """Compile and verify a kernel; returns None to fall back to sklearn."""
+    try:
+        kernel = compile_kernel(model, scaler, weights)
+        if kernel is not None and verify_kernel(kernel, model, scaler, weights):
+            logger.info(f"Compiled {kernel.kind} inference kernel for {type(model).__name__}")
+            return kernel
+    except Exception as e:
+        logger.warning(f"Could not compile inference kernel: {str(e)}")
+    return None
@@ -0,0 +1,229 @@
+"""
+Document ingestion stages used by the upload endpoints.
+Each function here is a plain blocking step so that the request handlers can
+schedule it on the appropriate worker pool.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import requests
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from app.services.pdf_pages import iter_pdf_pages
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 0
+ENTITY_LABELS = ["Name", "ID"]
+SENTENCE_DELIMITERS = re.compile(r'[.!?]+')
+
+text_splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+
+@dataclass
+class PdfSource:
+    """A PDF available on local disk together with its content hash."""
+
+    path: str
+    digest: str
+    size: int
+    temporary: bool = False
+
+    def cleanup(self) -> None:
+        if self.temporary and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+@dataclass
+class ParsedDocument:
+    """Text and statistics extracted from a PDF."""
+
+    page_texts: List[str]
+    page_count: int
+    sentence_count: int
+    chunks: List[str]
+    markdown_content: str
+
+
+def download_pdf(file_url: str, block_size: int = 1 << 16) -> PdfSource:
+    """
+    Make a PDF available locally and hash its bytes.
+
+    Args:
+        file_url: Local path or http(s) URL of the PDF
+        block_size: Read/stream block size in bytes
+
+    Returns:
+        The local source; temporary downloads must be released with ``cleanup``
+    """
+    digest = hashlib.sha256()
+    size = 0
+    if os.path.exists(file_url):
+        with open(file_url, "rb") as f:
+            for block in iter(lambda: f.read(block_size), b""):
+                digest.update(block)
+                size += len(block)
+        return PdfSource(path=file_url, digest=digest.hexdigest(), size=size)
+
+    with requests.get(file_url, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+            for block in response.iter_content(chunk_size=block_size):
+                digest.update(block)
+                size += len(block)
+                f.write(block)
+    return PdfSource(path=f.name, digest=digest.hexdigest(), size=size, temporary=True)
+
+
+class DocumentBuilder:
+    """
+    Incrementally counts sentences and chunks pages as they are extracted.
+
+    The sentence count equals splitting ``" ".join(page_texts)`` on sentence
+    delimiters, without ever building the joined text.
+    """
+
+    def __init__(self, chunk: bool = True):
+        self.chunk = chunk
+        self.page_texts: List[str] = []
+        self.chunks: List[str] = []
+        self.sentence_count = 0
+        self._open_sentence = False
+
+    def add_page(self, text: str) -> None:
+        if self.page_texts:
+            # Pages are joined with a space, which never ends a sentence
+            text_parts = SENTENCE_DELIMITERS.split(" " + text)
+        else:
+            text_parts = SENTENCE_DELIMITERS.split(text)
+        self.page_texts.append(text)
+        if len(text_parts) == 1:
+            self._open_sentence = self._open_sentence or bool(text_parts[0].strip())
+        else:
+            if self._open_sentence or text_parts[0].strip():
+                self.sentence_count += 1
+            self.sentence_count += sum(1 for part in text_parts[1:-1] if part.strip())
+            self._open_sentence = bool(text_parts[-1].strip())
+        if self.chunk:
+            self.chunks.extend(text_splitter.split_text(text))
+
+    def build(self, chunks: Optional[List[str]] = None) -> ParsedDocument:
+        chunks = self.chunks if chunks is None else chunks
+        return ParsedDocument(
+            page_texts=self.page_texts,
+            page_count=len(self.page_texts),
+            sentence_count=self.sentence_count + int(self._open_sentence),
+            chunks=chunks,
+            markdown_content="\n\n".join(chunks),
+        )
+
+
+def build_document(page_texts: Iterable[str], chunks: Optional[List[str]] = None) -> ParsedDocument:
+    """
+    Count sentences and split page texts into chunks.
+
+    Args:
+        page_texts: Page texts in order; may be a generator still producing pages
+        chunks: Previously computed chunks, which skips splitting
+
+    Returns:
+        The parsed document
+    """
+    builder = DocumentBuilder(chunk=chunks is None)
+    for text in page_texts:
+        builder.add_page(text)
+    return builder.build(chunks)
+
+
+def parse_pdf(path: str, process_pool: Optional[Executor] = None, pages_per_task: int = 8) -> ParsedDocument:
+    """
+    Extract pages from a local PDF, count sentences and split it into chunks.
+
+    Pages are extracted in parallel by ``process_pool`` and consumed in order,
+    so counting and chunking overlap with extraction of later pages.
+
+    Args:
+        path: Local path of the PDF
+        process_pool: Executor for page-range extraction; extracts serially when None
+        pages_per_task: Pages per extraction task
+
+    Returns:
+        The parsed document
+    """
+    return build_document(iter_pdf_pages(path, process_pool, pages_per_task))
+
+
+def cache_key(source: PdfSource, embedding_model: str) -> str:
+    """Content cache key; includes the embedding model so a model change is a miss."""
+    return f"{embedding_model}:{source.digest}"
+
+
+def extract_entities(ner_model, chunks: List[str]) -> Dict[str, str]:
+    """Extract the student name and ID from the first chunk."""
+    first_chunk = chunks[0] if chunks else ""
+    extracted_data = {"Name": "", "ID": ""}
+    for entity in ner_model.predict_entities(first_chunk, ENTITY_LABELS):
+        extracted_data[entity["label"]] = entity["text"]
+    return extracted_data
+
+
+def extract_entities_batch(ner_model, chunk_lists: List[List[str]]) -> List[Dict[str, str]]:
+    """Batched variant of ``extract_entities`` over many documents."""
+    first_chunks = [chunks[0] if chunks else "" for chunks in chunk_lists]
+    results = []
+    for entities in ner_model.batch_predict_entities(first_chunks, ENTITY_LABELS):
+        extracted_data = {"Name": "", "ID": ""}
+        for entity in entities:
+            extracted_data[entity["label"]] = entity["text"]
+        results.append(extracted_data)
+    return results
+
+
+def fetch_document(supabase, uuid: str) -> Dict[str, Any]:
+    """Return the documents row for ``uuid`` or an empty dict."""
+    data = supabase.table("documents").select("*").eq("id", uuid).execute().data
+    return data[0] if data else {}
+
+
+def fetch_documents(supabase, uuids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Return the documents rows for ``uuids`` keyed by id, in one query."""
+    data = supabase.table("documents").select("*").in_("id", uuids).execute().data
+    return {row["id"]: row for row in data}
+
+
+def update_document(supabase, uuid: str, values: Dict[str, Any]) -> bool:
+    """Update a documents row; returns False if no row matched."""
+    response = supabase.table("documents").update(values).eq("id", uuid).execute()
+    return bool(response.data)
+
+
+def upsert_documents(supabase, rows: List[Dict[str, Any]]) -> int:
+    """Write columns of many existing documents rows in a single upsert; returns rows written."""
+    response = supabase.table("documents").upsert(rows).execute()
+    return len(response.data or [])
+
+
+def hours_before_deadline(deadline: str, uploaded_date: str) -> float:
+    """Hours between upload and deadline (negative when late)."""
+    return (datetime.fromisoformat(deadline) - datetime.fromisoformat(uploaded_date)).total_seconds() / 3600
+
+
+def fetch_folder_documents(supabase, folder: str, columns: str = "*", page_size: int = 1000) -> List[Dict[str, Any]]:
+    """Return every documents row in a folder; one query unless the folder exceeds ``page_size``."""
+    rows: List[Dict[str, Any]] = []
+    start = 0
+    while True:
+        page = (
+            supabase.table("documents").select(columns).eq("folder", folder).order("id")
+            .range(start, start + page_size - 1).execute().data
+        )
+        rows.extend(page or [])
+        if not page or len(page) < page_size:
+            return rows
+        start += page_size
@@ -0,0 +1,247 @@
+"""
+Shared gateway in front of the LLM provider.
+Every completion asks the gateway for admission. A single scheduler hands out
+request and token budget (token buckets sized to the provider's per-minute
+quota) in priority order, so interactive feedback overtakes batch jobs.
+Identical prompts in flight are coalesced into one call, which moves up to the
+priority of its most urgent caller, and 429/5xx answers
+are retried with jittered exponential backoff before the error surfaces as a
+503 instead of a 500. A coalesced call runs in its own task, created in the
+first caller's context so LangGraph callbacks (token streaming) keep working;
+a caller that disconnects only stops waiting, and the call is cancelled once
+nobody waits for it.
+"""
+
+import asyncio
+import itertools
+import logging
+import random
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+import groq
+import httpx
+
+from app.core.exceptions import LLMUnavailableError
+from app.services.rate_limit import RateLimiter
+from app.utils.metrics import (
+    LLM_GATEWAY_COALESCED,
+    LLM_GATEWAY_QUEUE_DEPTH,
+    LLM_GATEWAY_RETRIES,
+    LLM_GATEWAY_TOKENS_PER_SECOND,
+    LLM_GATEWAY_WAIT,
+)
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BATCH: "batch"}
+
+# Priority of LLM calls made from the current task; batch jobs lower it
+request_priority: ContextVar[int] = ContextVar("request_priority", default=PRIORITY_INTERACTIVE)
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+# Failures where no response arrived: the Groq SDK's connection and timeout
+# errors, raw httpx transport errors and the builtin equivalents
+CONNECTION_ERRORS = (groq.APIConnectionError, httpx.TransportError, asyncio.TimeoutError, ConnectionError)
+
+
+def estimate_tokens(prompt: str, max_output_tokens: int = 512) -> int:
+    """Rough prompt + completion token estimate used to reserve token budget."""
+    return len(prompt) // 4 + max_output_tokens
+
+
+def retry_reason(error: Exception) -> Tuple[Optional[str], Optional[float]]:
+    """Classify an error as retryable; returns (reason, provider Retry-After seconds)."""
+    response = getattr(error, "response", None)
+    status_code = getattr(error, "status_code", None) or getattr(response, "status_code", None)
+    retry_after = None
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        try:
+            retry_after = float(headers.get("retry-after"))
+        except (TypeError, ValueError):
+            retry_after = None
+    if status_code in RETRYABLE_STATUS:
+        return ("rate_limit" if status_code == 429 else "server_error"), retry_after
+    if isinstance(error, CONNECTION_ERRORS):
+        return "connection", None
+    return None, None
+
+
+class _GatewayCall:
+    """Priority and current admission ticket of one (possibly shared) LLM call."""
+
+    def __init__(self, priority: int, estimated: int):
+        self.priority = priority
+        self.estimated = estimated
+        self.ticket: Optional[asyncio.Future] = None
+
+
+class LLMGateway:
+    """Rate-limited, prioritized, coalescing admission control for LLM calls."""
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        request_burst: float = 5.0,
+        max_concurrency: int = 8,
+        max_attempts: int = 4,
+        retry_base_seconds: float = 1.0,
+        retry_max_seconds: float = 30.0,
+    ):
+        self.requests = RateLimiter(requests_per_minute, burst=request_burst)
+        self.tokens = RateLimiter(tokens_per_minute, burst=tokens_per_minute / 4)
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._concurrency = asyncio.Semaphore(max_concurrency)
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._scheduler: Optional[asyncio.Task] = None
+        self._sequence = itertools.count()
+        self._inflight: Dict[str, Tuple[asyncio.Task, _GatewayCall]] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self._token_window: Deque[Tuple[float, int]] = deque()
+
+    def _ensure_scheduler(self) -> asyncio.PriorityQueue:
+        if self._scheduler is None or self._scheduler.done():
+            self._queue = asyncio.PriorityQueue()
+            self._scheduler = asyncio.create_task(self._schedule())
+        return self._queue
+
+    async def _schedule(self) -> None:
+        while True:
+            priority, _, call = await self._queue.get()
+            if priority != call.priority:  # superseded by the entry of a more urgent caller
+                continue
+            LLM_GATEWAY_QUEUE_DEPTH.labels(priority=PRIORITY_NAMES.get(priority, str(priority))).dec()
+            ticket = call.ticket
+            if ticket.done():  # caller gave up while queued
+                continue
+            await self.requests.acquire()
+            await self.tokens.acquire(min(call.estimated, self.tokens.capacity))
+            if not ticket.done():
+                ticket.set_result(None)
+
+    def _enqueue(self, call: _GatewayCall) -> None:
+        LLM_GATEWAY_QUEUE_DEPTH.labels(priority=PRIORITY_NAMES.get(call.priority, str(call.priority))).inc()
+        self._queue.put_nowait((call.priority, next(self._sequence), call))
+
+    def _raise_priority(self, call: _GatewayCall, priority: int) -> None:
+        """Move a shared call up to a more urgent caller's priority, requeueing it if it is waiting."""
+        if priority >= call.priority:
+            return
+        queued = call.ticket is not None and not call.ticket.done()
+        if queued:
+            LLM_GATEWAY_QUEUE_DEPTH.labels(priority=PRIORITY_NAMES.get(call.priority, str(call.priority))).dec()
+        call.priority = priority
+        if queued:
+            self._enqueue(call)
+
+    async def _admit(self, call: _GatewayCall) -> None:
+        self._ensure_scheduler()
+        ticket = asyncio.get_running_loop().create_future()
+        call.ticket = ticket
+        started = time.perf_counter()
+        self._enqueue(call)
+        try:
+            await ticket
+        finally:
+            if not ticket.done():
+                ticket.cancel()
+        label = PRIORITY_NAMES.get(call.priority, str(call.priority))
+        LLM_GATEWAY_WAIT.labels(priority=label).observe(time.perf_counter() - started)
+
+    def _record_tokens(self, message: Any, estimated: int) -> None:
+        usage = getattr(message, "usage_metadata", None) or {}
+        used = int(usage.get("total_tokens") or usage.get("input_tokens", 0) + usage.get("output_tokens", 0))
+        if used > estimated:
+            self.tokens.consume(used - estimated)
+        now = time.monotonic()
+        self._token_window.append((now, used))
+        while self._token_window and self._token_window[0][0] < now - 60:
+            self._token_window.popleft()
+        LLM_GATEWAY_TOKENS_PER_SECOND.set(sum(tokens for _, tokens in self._token_window) / 60.0)
+
+    async def _call_with_retries(self, fn: Callable[[], Awaitable[Any]], call: _GatewayCall) -> Any:
+        for attempt in range(1, self.max_attempts + 1):
+            await self._admit(call)
+            try:
+                async with self._concurrency:
+                    result = await fn()
+                self._record_tokens(result, call.estimated)
+                return result
+            except Exception as e:
+                reason, retry_after = retry_reason(e)
+                if reason is None:
+                    raise
+                if attempt == self.max_attempts:
+                    raise LLMUnavailableError(str(e)) from e
+                # Full jitter, but never earlier than the provider asked for
+                delay = random.uniform(0, min(self.retry_max_seconds, self.retry_base_seconds * 2 ** attempt))
+                delay = max(delay, retry_after or 0.0)
+                LLM_GATEWAY_RETRIES.labels(reason=reason).inc()
+                logger.warning(f"LLM call failed ({reason}, attempt {attempt}), retrying in {delay:.1f}s: {str(e)}")
+                await asyncio.sleep(delay)
+
+    async def call(self, fn: Callable[[], Awaitable[Any]], key: Optional[str] = None,
+                   estimated_tokens: int = 1024, priority: Optional[int] = None) -> Any:
+        """
+        Run one LLM call under the gateway's budget.
+
+        Args:
+            fn: Coroutine factory performing the call (e.g. ``lambda: llm.ainvoke(prompt)``)
+            key: Identity of the request; concurrent calls with the same key share one result,
+                admitted at the most urgent priority among their callers
+            estimated_tokens: Token budget reserved before the call
+            priority: Lower runs first; defaults to the task's ``request_priority``
+
+        Returns:
+            Whatever ``fn`` returns
+        """
+        priority = request_priority.get() if priority is None else priority
+        if key is None:
+            return await self._call_with_retries(fn, _GatewayCall(priority, estimated_tokens))
+
+        if key in self._inflight:
+            task, call = self._inflight[key]
+            LLM_GATEWAY_COALESCED.inc()
+            self._raise_priority(call, priority)
+        else:
+            call = _GatewayCall(priority, estimated_tokens)
+            task = asyncio.create_task(self._call_with_retries(fn, call))
+            self._inflight[key] = (task, call)
+            task.add_done_callback(lambda done: self._finish(key, done))
+        return await self._wait(task)
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if key in self._inflight and self._inflight[key][0] is task:
+            del self._inflight[key]
+        # Consume the exception if every caller gave up before it was raised
+        if not task.cancelled():
+            task.exception()
+
+    async def _wait(self, task: asyncio.Task) -> Any:
+        """Await a shared call; cancelling one caller only cancels the call if it was the last one waiting."""
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and self._waiters[task] == 1:
+                task.cancel()
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+    async def close(self) -> None:
+        for task, _ in list(self._inflight.values()):
+            task.cancel()
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+            await asyncio.gather(self._scheduler, return_exceptions=True)
@@ -0,0 +1,133 @@
+"""
+Versioned model storage and immutable model bundles.
+Deployments write each model into its own directory under
+``/app/models/versions`` and atomically repoint the ``current`` symlink.
+The API loads a directory into a frozen ModelBundle (model, scaler, weights,
+compiled kernel and version), warms it up and swaps it in with a single
+reference assignment, so a request never sees a new model with an old scaler.
+"""
+
+import json
+import logging
+import os
+import pickle
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.services.clustering import FEATURE_WEIGHTS, infer_clusters
+from app.services.inference_kernel import InferenceKernel, build_kernel
+
+logger = logging.getLogger(__name__)
+
+MODELS_ROOT = "/app/models"
+CURRENT_LINK = "current"
+SCALER_FILENAME = "scaler.pkl"
+DEPLOYMENT_FILENAME = "deployment.json"
+LEGACY_SCALER_PATH = "/mlflow/artifacts/scaler.pkl"
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    """Everything needed for one consistent prediction."""
+
+    model: Any
+    scaler: Any
+    weights: np.ndarray
+    version: str
+    kernel: Optional[InferenceKernel] = None
+    deployed_at: Optional[float] = None
+    scaler_path: Optional[str] = None
+
+    def predict(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Predict clusters and confidence for raw feature rows."""
+        return infer_clusters(self.model, self.scaler, X, self.kernel)
+
+    @property
+    def n_clusters(self) -> Optional[int]:
+        return getattr(self.model, 'n_clusters_', getattr(self.model, 'n_components_', None))
+
+
+def current_model_dir(root: str = MODELS_ROOT) -> str:
+    """Resolve the deployed model directory, falling back to the legacy flat layout."""
+    link = os.path.join(root, CURRENT_LINK)
+    if os.path.exists(link):
+        return os.path.realpath(link)
+    return root
+
+
+def read_deployment(model_dir: str) -> Dict[str, Any]:
+    """Deployment metadata written by deploy_model; synthesized from mtime for legacy layouts."""
+    deployment_path = os.path.join(model_dir, DEPLOYMENT_FILENAME)
+    if os.path.exists(deployment_path):
+        with open(deployment_path) as f:
+            return json.load(f)
+    mtime = os.path.getmtime(model_dir)
+    return {"version": f"legacy-{int(mtime)}", "deployed_at": mtime}
+
+
+def read_version(model_dir: str) -> str:
+    """Version recorded by the deployment, or an mtime-based id for legacy layouts."""
+    return str(read_deployment(model_dir)["version"])
+
+
+def scaler_path(model_dir: str) -> str:
+    """Scaler deployed next to the model; deployments from before versioned directories kept it under /mlflow/artifacts."""
+    path = os.path.join(model_dir, SCALER_FILENAME)
+    return path if os.path.exists(path) else LEGACY_SCALER_PATH
+
+
+def load_scaler(model_dir: str):
+    with open(scaler_path(model_dir), 'rb') as f:
+        return pickle.load(f)
+
+
+def build_bundle(model, scaler, version: str, weights: np.ndarray = FEATURE_WEIGHTS,
+                 deployed_at: Optional[float] = None, scaler_path: Optional[str] = None) -> ModelBundle:
+    """Compile the kernel for a model/scaler pair and warm the bundle up."""
+    bundle = ModelBundle(
+        model=model,
+        scaler=scaler,
+        weights=weights,
+        version=version,
+        kernel=build_kernel(model, scaler, weights),
+        deployed_at=deployed_at,
+        scaler_path=scaler_path,
+    )
+    warm_up(bundle)
+    return bundle
+
+
+def load_bundle(model_dir: Optional[str] = None) -> ModelBundle:
+    """
+    Load a deployed model directory into a ready-to-serve bundle.
+
+    Args:
+        model_dir: Directory to load; defaults to the ``current`` deployment
+
+    Returns:
+        A warmed-up ModelBundle
+    """
+    # Imported here so the bundle and watcher code does not pull in mlflow
+    import mlflow.sklearn
+
+    model_dir = model_dir or current_model_dir()
+    deployment = read_deployment(model_dir)
+    version = str(deployment["version"])
+    model = mlflow.sklearn.load_model(model_dir)
+    scaler = load_scaler(model_dir)
+    logger.info(f"Loaded model version {version} from {model_dir}")
+    return build_bundle(
+        model, scaler, version, deployed_at=deployment.get("deployed_at"), scaler_path=scaler_path(model_dir)
+    )
+
+
+def warm_up(bundle: ModelBundle) -> None:
+    """Run inference on representative rows so the first real request is not the first call."""
+    low = getattr(bundle.scaler, "data_min_", np.zeros(len(bundle.weights)))
+    high = getattr(bundle.scaler, "data_max_", np.ones(len(bundle.weights)))
+    X = np.vstack([low, (low + high) / 2, high])
+    labels, _ = bundle.predict(X)
+    if len(labels) != len(X):
+        raise ValueError(f"Warm-up returned {len(labels)} labels for {len(X)} rows")
@@ -0,0 +1,122 @@
+"""
+Event-driven model reloading.
+New deployments are picked up as soon as the ``current`` symlink under the
+model directory changes (inotify via watchfiles) or when the deploy task calls
+the notify endpoint. Polling remains as a jittered fallback. Triggers are
+coalesced: one reload runs at a time, and every trigger that arrives while it
+runs shares a single follow-up reload, so a burst of events costs at most two.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import Callable, List, Optional
+
+from app.services.model_store import CURRENT_LINK, ModelBundle
+from app.utils.metrics import MODEL_RELOAD_LATENCY, MODEL_RELOADS
+
+try:
+    from watchfiles import awatch
+except ImportError:  # installed with uvicorn[standard]; polling still works without it
+    awatch = None
+
+logger = logging.getLogger(__name__)
+
+
+class ModelReloader:
+    """Coordinates filesystem, notify and polling triggers for model reloads."""
+
+    def __init__(
+        self,
+        reload_fn: Callable[[], Optional[ModelBundle]],
+        watch_root: str,
+        poll_interval: float = 300.0,
+        poll_jitter: float = 0.2,
+    ):
+        self.reload_fn = reload_fn
+        self.watch_root = watch_root
+        self.poll_interval = poll_interval
+        self.poll_jitter = poll_jitter
+        self._lock = asyncio.Lock()
+        self._queued: Optional[asyncio.Task] = None
+        self._stop = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    async def trigger(self, source: str) -> Optional[ModelBundle]:
+        """
+        Reload the deployed model if it changed.
+
+        A trigger joins the reload that is queued behind the running one, if
+        any; the running reload may have read the deployment before the change
+        this trigger reports.
+
+        Args:
+            source: What caused the reload (watch, notify, poll); used as a metrics label
+
+        Returns:
+            The newly activated bundle, or None if nothing changed
+        """
+        if self._queued is None:
+            self._queued = asyncio.create_task(self._reload(source))
+        return await asyncio.shield(self._queued)
+
+    async def _reload(self, source: str) -> Optional[ModelBundle]:
+        async with self._lock:
+            # From here on, new triggers queue the next reload
+            self._queued = None
+            try:
+                bundle = await asyncio.to_thread(self.reload_fn)
+            except Exception as e:
+                MODEL_RELOADS.labels(trigger=source, result="error").inc()
+                logger.error(f"Model reload triggered by {source} failed: {str(e)}")
+                return None
+
+        if bundle is None:
+            MODEL_RELOADS.labels(trigger=source, result="unchanged").inc()
+            return None
+
+        MODEL_RELOADS.labels(trigger=source, result="reloaded").inc()
+        if bundle.deployed_at:
+            latency = max(time.time() - float(bundle.deployed_at), 0.0)
+            MODEL_RELOAD_LATENCY.labels(trigger=source).observe(latency)
+            logger.info(f"Model {bundle.version} serving {latency:.2f}s after deployment (trigger: {source})")
+        return bundle
+
+    def _relevant(self, changes) -> bool:
+        for _, path in changes:
+            name = os.path.basename(path)
+            if name in (CURRENT_LINK, "MLmodel") or name.startswith(f".{CURRENT_LINK}"):
+                return True
+        return False
+
+    async def _watch(self) -> None:
+        if awatch is None:
+            logger.warning("watchfiles is not installed, model reloads rely on polling")
+            return
+        os.makedirs(self.watch_root, exist_ok=True)
+        try:
+            async for changes in awatch(self.watch_root, stop_event=self._stop, recursive=False):
+                if self._relevant(changes):
+                    await self.trigger("watch")
+        except Exception as e:
+            logger.error(f"Model directory watch stopped: {str(e)}")
+
+    async def _poll(self) -> None:
+        while not self._stop.is_set():
+            delay = self.poll_interval * random.uniform(1 - self.poll_jitter, 1 + self.poll_jitter)
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                await self.trigger("poll")
+
+    def start(self) -> None:
+        self._tasks = [asyncio.create_task(self._watch()), asyncio.create_task(self._poll())]
+
+    async def stop(self) -> None:
+        self._stop.set()
+        tasks = self._tasks + ([self._queued] if self._queued is not None else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
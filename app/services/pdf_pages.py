@@ -0,0 +1,66 @@
+"""
+Page-parallel PDF text extraction.
+pypdf extracts one page at a time on a single core, which dominates upload
+latency for long reports. This module extracts page ranges in worker
+processes and yields page texts in order as soon as each range is done, so
+chunking can start while later pages are still being extracted. The module
+only imports pypdf so that spawned workers start quickly.
+"""
+
+import mmap
+from concurrent.futures import Executor
+from typing import Iterator, List, Optional
+
+from pypdf import PdfReader
+
+
+def _open(path: str):
+    # The mapping is shared through the page cache by every worker reading the same file
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            raise ValueError(f"Empty PDF file: {path}")
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def page_text(page) -> str:
+    """Page text exactly as PyPDFLoader returns it."""
+    return page.extract_text(extraction_mode="plain").strip()
+
+
+def extract_page_range(path: str, start: int, stop: int) -> List[str]:
+    """Extract the text of pages ``start`` to ``stop - 1``; runs in a worker process."""
+    with _open(path) as data:
+        reader = PdfReader(data)
+        return [page_text(reader.pages[i]) for i in range(start, stop)]
+
+
+def iter_pdf_pages(path: str, process_pool: Optional[Executor] = None, pages_per_task: int = 8) -> Iterator[str]:
+    """
+    Yield the text of every page in order.
+
+    Args:
+        path: Local path of the PDF
+        process_pool: Executor for page ranges; extracts in the calling thread when None
+        pages_per_task: Pages extracted by one worker task
+
+    Yields:
+        Page texts, the first ones while later ranges are still being extracted
+    """
+    with _open(path) as data:
+        reader = PdfReader(data)
+        n_pages = len(reader.pages)
+        if process_pool is None or n_pages < 2 * pages_per_task:
+            for page in reader.pages:
+                yield page_text(page)
+            return
+
+    futures = [
+        process_pool.submit(extract_page_range, path, start, min(start + pages_per_task, n_pages))
+        for start in range(0, n_pages, pages_per_task)
+    ]
+    try:
+        for future in futures:
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
@@ -0,0 +1,47 @@
+"""
+Client-side rate limiting for LLM calls.
+A token bucket shared by every caller in the process keeps request bursts
+under the provider's per-minute quota instead of discovering it through 429s.
+"""
+
+import asyncio
+import time
+
+
+class RateLimiter:
+    """Async token bucket refilled at ``rate_per_minute``."""
+
+    def __init__(self, rate_per_minute: float, burst: float = 1.0):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(burst, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float = 1.0) -> float:
+        """
+        Wait until ``amount`` tokens are available and take them.
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        async with self._lock:
+            self._refill()
+            while self._tokens < amount:
+                delay = (amount - self._tokens) / self.rate
+                await asyncio.sleep(delay)
+                waited += delay
+                self._refill()
+            self._tokens -= amount
+        return waited
+
+    def consume(self, amount: float) -> None:
+        """Take tokens without waiting (the balance may go negative and delay later callers)."""
+        self._refill()
+        self._tokens -= amount
@@ -0,0 +1,122 @@
+"""
+Caches for LLM node outputs in the feedback workflow.
+The exact cache keys a completion by a hash of the model and the full prompt,
+so identical prompts (e.g. the relevance analysis shared by every submission
+in a folder) hit the LLM once. The optional semantic cache matches
+near-duplicate submissions by embedding similarity. Both are in-memory with
+TTL expiry and LRU eviction.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def prompt_key(model_name: str, node: str, prompt: str) -> str:
+    """Stable key for one completion request."""
+    digest = hashlib.sha256()
+    for part in (model_name, node, prompt):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """Exact-match completion cache with TTL and LRU eviction."""
+
+    def __init__(self, max_items: int = 2048, ttl_seconds: float = 86400.0):
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SemanticCache:
+    """Nearest-neighbour completion cache over input embeddings, scoped per node."""
+
+    def __init__(self, threshold: float = 0.97, max_items: int = 1024, ttl_seconds: float = 86400.0):
+        self.threshold = threshold
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, "OrderedDict[int, Tuple[float, np.ndarray, str]]"] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = float(np.linalg.norm(vector))
+        if norm == 0.0:
+            return None
+        return vector / norm
+
+    def lookup(self, scope: str, embedding: Sequence[float]) -> Optional[str]:
+        """
+        Find a cached completion whose input is similar enough.
+
+        Args:
+            scope: Cache partition, e.g. the node name
+            embedding: Embedding of the node input
+
+        Returns:
+            The completion of the most similar entry above the threshold, or None
+        """
+        query = self._normalize(embedding)
+        if query is None:
+            return None
+        with self._lock:
+            entries = self._entries.get(scope)
+            if not entries:
+                return None
+            now = time.monotonic()
+            for entry_id in [entry_id for entry_id, (expires_at, _, _) in entries.items() if expires_at < now]:
+                del entries[entry_id]
+            if not entries:
+                return None
+            ids = list(entries.keys())
+            vectors = np.stack([entries[entry_id][1] for entry_id in ids])
+            if vectors.shape[1] != query.shape[0]:
+                return None
+            scores = vectors @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+            entries.move_to_end(ids[best])
+            return entries[ids[best]][2]
+
+    def add(self, scope: str, embedding: Sequence[float], value: str) -> None:
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+        with self._lock:
+            entries = self._entries.setdefault(scope, OrderedDict())
+            entries[self._next_id] = (time.monotonic() + self.ttl_seconds, vector, value)
+            self._next_id += 1
+            while len(entries) > self.max_items:
+                entries.popitem(last=False)
@@ -0,0 +1,124 @@
+"""
+Map-reduce summarization for long submissions.
+The stored assignment text is split with the same RecursiveCharacterTextSplitter
+that /upload uses, consecutive chunks are packed into windows, the windows are
+summarized concurrently and the partial summaries are reduced level by level
+until one summary remains. Partial summaries are persisted in the content
+cache so a repeat request only pays for the reduce step.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+from app.services.content_cache import ContentCache
+from app.services.ingestion import text_splitter
+from app.services.response_cache import prompt_key
+
+logger = logging.getLogger(__name__)
+
+PARTIAL_SUMMARY_NAMESPACE = "chunk_summaries"
+
+Complete = Callable[[str, str], Awaitable[str]]
+
+
+def partial_summary_prompt(text: str) -> str:
+    return f"Summarize the following part of an assignment. Keep key arguments, methods and results:\n\n{text}"
+
+
+def reduce_summary_prompt(summaries: List[str]) -> str:
+    parts = "\n\n".join(f"PART {i + 1}:\n{summary}" for i, summary in enumerate(summaries))
+    return f"Combine the following partial summaries of one assignment into a single coherent summary:\n\n{parts}"
+
+
+def split_content(content: str) -> List[str]:
+    """Chunk stored assignment text the same way /upload does."""
+    return text_splitter.split_text(content)
+
+
+def pack_chunks(chunks: List[str], max_chars: int) -> List[str]:
+    """Group consecutive chunks into windows of at most ``max_chars`` (a single larger chunk stays whole)."""
+    windows: List[str] = []
+    current: List[str] = []
+    size = 0
+    for chunk in chunks:
+        if current and size + len(chunk) > max_chars:
+            windows.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(chunk)
+        size += len(chunk) + 2
+    if current:
+        windows.append("\n\n".join(current))
+    return windows
+
+
+async def map_reduce_summary(
+    complete: Complete,
+    chunks: List[str],
+    model_name: str,
+    window_chars: int = 6000,
+    reduce_chars: int = 8000,
+    concurrency: int = 4,
+    store: Optional[ContentCache] = None,
+) -> str:
+    """
+    Summarize a long document in parallel windows and reduce the partial summaries.
+
+    Args:
+        complete: Coroutine ``complete(node, prompt) -> text`` that calls the LLM
+        chunks: Document chunks from ``split_content``
+        model_name: Part of the persisted partial summary key
+        window_chars: Maximum characters summarized by one map call
+        reduce_chars: Maximum characters of partial summaries combined by one reduce call
+        concurrency: Maximum LLM calls in flight for this document
+        store: Content cache used to persist partial summaries
+
+    Returns:
+        The combined summary
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def summarize_window(text: str) -> str:
+        prompt = partial_summary_prompt(text)
+        key = prompt_key(model_name, "summary_map", prompt)
+        if store is not None:
+            stored = await asyncio.to_thread(store.get_raw, PARTIAL_SUMMARY_NAMESPACE, key)
+            if stored is not None:
+                return stored
+        async with semaphore:
+            summary = await complete("summary_map", prompt)
+        if store is not None:
+            await asyncio.to_thread(store.put_raw, PARTIAL_SUMMARY_NAMESPACE, key, summary)
+        return summary
+
+    async def reduce_group(summaries: List[str]) -> str:
+        async with semaphore:
+            return await complete("summary_reduce", reduce_summary_prompt(summaries))
+
+    summaries = await asyncio.gather(*(summarize_window(window) for window in pack_chunks(chunks, window_chars)))
+    levels = 0
+    while len(summaries) > 1:
+        groups = _group_summaries(list(summaries), reduce_chars)
+        summaries = await asyncio.gather(*(reduce_group(group) for group in groups))
+        levels += 1
+    logger.info(f"Summarized {len(chunks)} chunks with {levels} reduce level(s)")
+    return summaries[0] if summaries else ""
+
+
+def _group_summaries(summaries: List[str], max_chars: int) -> List[List[str]]:
+    # Always combine at least two summaries per group so each level shrinks the list
+    groups: List[List[str]] = []
+    current: List[str] = []
+    size = 0
+    for summary in summaries:
+        if len(current) >= 2 and size + len(summary) > max_chars:
+            groups.append(current)
+            current, size = [], 0
+        current.append(summary)
+        size += len(summary)
+    if current:
+        if len(current) == 1 and groups:
+            groups[-1].append(current[0])
+        else:
+            groups.append(current)
+    return groups
@@ -0,0 +1,494 @@
+"""
+In-memory vector index for folder-scoped plagiarism search.
+This module keeps one pre-normalized float32 embedding matrix per assignment
+folder so a plagiarism lookup is a single matrix-vector product instead of a
+full table scan. Large folders are served by an HNSW graph when hnswlib is
+installed. When chunk embeddings are available the index can also score
+documents by chunk-to-chunk max similarity, which sees copied passages
+anywhere in a document rather than only what survived the document-level
+embedding. A periodic refresh reconciles the index with the documents table,
+evicting deleted rows and loading rows written by other processes.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.services.chunk_embeddings import CHUNK_EMBEDDINGS_COLUMN, decode_chunk_embeddings, normalize_rows
+from app.services.embedding_codec import decode_embedding
+
+try:
+    import hnswlib
+except ImportError:  # optional dependency, exact search is always available
+    hnswlib = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_COLUMNS = "id, folder, nameStudent, uploadedDate, embedding"
+REFRESH_COLUMNS = "id, folder, uploadedDate"
+# Ids per ``in`` filter when fetching changed rows, keeps the request URL short
+REFRESH_FETCH_SIZE = 100
+CHUNK_BLOCK_SIZE = 4096
+
+
+@dataclass(frozen=True)
+class Match:
+    """A single plagiarism candidate returned by the index."""
+
+    doc_id: str
+    name: str
+    score: float
+
+
+def parse_embedding(raw: Any) -> Optional[np.ndarray]:
+    """
+    Convert an embedding as stored in Supabase into a float32 vector.
+
+    Args:
+        raw: Binary codec string, legacy JSON string, list of numbers or numpy array
+
+    Returns:
+        The embedding as a 1-D float32 array, or None if it cannot be parsed
+    """
+    return decode_embedding(raw)
+
+
+def _timestamp(value: Optional[str]) -> float:
+    if not value:
+        return float("-inf")
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class FolderIndex:
+    """Vector index over the documents of a single folder."""
+
+    def __init__(self, hnsw_threshold: int = 20000, hnsw_ef: int = 64):
+        self.hnsw_threshold = hnsw_threshold
+        self.hnsw_ef = hnsw_ef
+        self._lock = threading.RLock()
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._uploaded = np.empty(0, dtype=np.float64)
+        self._ids: List[str] = []
+        self._names: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._hnsw = None
+        # Graph labels marked deleted; the graph is rebuilt once they outnumber live documents
+        self._hnsw_deleted: set = set()
+        # Chunk vectors of all documents, float16, contiguous per document; owner -1 marks replaced rows
+        self._chunks = np.empty((0, 0), dtype=np.float16)
+        self._chunk_owner = np.empty(0, dtype=np.int64)
+        self._chunk_count = 0
+        self._has_chunks: set = set()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def upsert(self, doc_id: str, name: str, uploaded_date: Optional[str], embedding: np.ndarray) -> None:
+        """Insert or replace a document vector."""
+        vector = _normalize(np.asarray(embedding, dtype=np.float32).reshape(-1))
+        with self._lock:
+            size = len(self._ids)
+            if size == 0 and self._matrix.shape[1] != vector.size:
+                self._matrix = np.empty((16, vector.size), dtype=np.float32)
+                self._uploaded = np.empty(16, dtype=np.float64)
+            if vector.size != self._matrix.shape[1]:
+                raise ValueError(
+                    f"Embedding dimension {vector.size} does not match index dimension {self._matrix.shape[1]}"
+                )
+
+            position = self._positions.get(doc_id)
+            if position is None:
+                position = size
+                if position == self._matrix.shape[0]:
+                    self._grow()
+                self._ids.append(doc_id)
+                self._names.append(name)
+                self._positions[doc_id] = position
+            else:
+                self._names[position] = name
+
+            self._matrix[position] = vector
+            self._uploaded[position] = _timestamp(uploaded_date)
+            if self._hnsw is not None:
+                # Re-adding a deleted label revives it with the new vector
+                self._hnsw.add_items(vector[np.newaxis, :], np.array([position]))
+                self._hnsw_deleted.discard(position)
+
+    def upsert_chunks(self, doc_id: str, chunk_embeddings: np.ndarray) -> None:
+        """Attach chunk vectors to a document already added with ``upsert``."""
+        vectors = normalize_rows(np.asarray(chunk_embeddings, dtype=np.float32)).astype(np.float16)
+        if vectors.ndim != 2 or not len(vectors):
+            return
+        with self._lock:
+            position = self._positions[doc_id]
+            if vectors.shape[1] != self._matrix.shape[1]:
+                raise ValueError(
+                    f"Chunk dimension {vectors.shape[1]} does not match index dimension {self._matrix.shape[1]}"
+                )
+            if position in self._has_chunks:
+                self._chunk_owner[: self._chunk_count][self._chunk_owner[: self._chunk_count] == position] = -1
+            needed = self._chunk_count + len(vectors)
+            if needed > self._chunks.shape[0]:
+                capacity = max(needed, self._chunks.shape[0] * 2, 256)
+                chunks = np.empty((capacity, vectors.shape[1]), dtype=np.float16)
+                if self._chunk_count:
+                    chunks[: self._chunk_count] = self._chunks[: self._chunk_count]
+                owner = np.full(capacity, -1, dtype=np.int64)
+                owner[: self._chunk_count] = self._chunk_owner[: self._chunk_count]
+                self._chunks, self._chunk_owner = chunks, owner
+            self._chunks[self._chunk_count: needed] = vectors
+            self._chunk_owner[self._chunk_count: needed] = position
+            self._chunk_count = needed
+            self._has_chunks.add(position)
+
+    def uploaded_at(self, doc_id: str) -> Optional[float]:
+        """Upload timestamp the index holds for a document, None if it is not indexed."""
+        with self._lock:
+            position = self._positions.get(doc_id)
+            return None if position is None else float(self._uploaded[position])
+
+    def remove(self, doc_id: str) -> bool:
+        """Evict a document; returns False if it was not indexed."""
+        with self._lock:
+            position = self._positions.pop(doc_id, None)
+            if position is None:
+                return False
+            owner = self._chunk_owner[: self._chunk_count]
+            if position in self._has_chunks:
+                owner[owner == position] = -1
+                self._has_chunks.discard(position)
+
+            # Move the last document into the freed slot so positions stay dense
+            last = len(self._ids) - 1
+            if position != last:
+                if self._hnsw is not None:
+                    self._hnsw.add_items(self._matrix[last][np.newaxis, :], np.array([position]))
+                self._matrix[position] = self._matrix[last]
+                self._uploaded[position] = self._uploaded[last]
+                self._ids[position] = self._ids[last]
+                self._names[position] = self._names[last]
+                self._positions[self._ids[position]] = position
+                if last in self._has_chunks:
+                    owner[owner == last] = position
+                    self._has_chunks.discard(last)
+                    self._has_chunks.add(position)
+            self._ids.pop()
+            self._names.pop()
+            if self._chunk_count and np.count_nonzero(owner < 0) * 2 > self._chunk_count:
+                self._compact_chunks()
+            if self._hnsw is not None:
+                # The last label now duplicates the moved document; tombstone it
+                self._hnsw.mark_deleted(last)
+                self._hnsw_deleted.add(last)
+                if len(self._hnsw_deleted) > len(self._ids):
+                    # Mostly tombstones, rebuilt on the next query that needs it
+                    self._hnsw = None
+                    self._hnsw_deleted.clear()
+            return True
+
+    def _compact_chunks(self) -> None:
+        live = self._chunk_owner[: self._chunk_count] >= 0
+        count = int(np.count_nonzero(live))
+        self._chunks[:count] = self._chunks[: self._chunk_count][live]
+        self._chunk_owner[:count] = self._chunk_owner[: self._chunk_count][live]
+        self._chunk_owner[count: self._chunk_count] = -1
+        self._chunk_count = count
+
+    def _grow(self) -> None:
+        capacity = max(16, self._matrix.shape[0] * 2)
+        matrix = np.empty((capacity, self._matrix.shape[1]), dtype=np.float32)
+        matrix[: len(self._ids)] = self._matrix[: len(self._ids)]
+        uploaded = np.empty(capacity, dtype=np.float64)
+        uploaded[: len(self._ids)] = self._uploaded[: len(self._ids)]
+        self._matrix, self._uploaded = matrix, uploaded
+        if self._hnsw is not None:
+            self._hnsw.resize_index(capacity)
+
+    def _ensure_hnsw(self) -> bool:
+        if hnswlib is None or len(self._ids) < self.hnsw_threshold:
+            return False
+        if self._hnsw is None:
+            size = len(self._ids)
+            graph = hnswlib.Index(space="ip", dim=self._matrix.shape[1])
+            graph.init_index(max_elements=self._matrix.shape[0], ef_construction=200, M=16)
+            graph.add_items(self._matrix[:size], np.arange(size))
+            graph.set_ef(self.hnsw_ef)
+            self._hnsw = graph
+            logger.info(f"Built HNSW index over {size} documents")
+        return True
+
+    def query(
+        self,
+        embedding: np.ndarray,
+        k: int = 2,
+        before: Optional[str] = None,
+        exclude_id: Optional[str] = None,
+    ) -> List[Match]:
+        """
+        Return the top-k most similar documents.
+
+        Args:
+            embedding: Query vector
+            k: Number of matches to return
+            before: Only consider documents uploaded strictly before this ISO timestamp
+            exclude_id: Document id to leave out of the results
+
+        Returns:
+            Matches ordered by descending cosine similarity
+        """
+        query = _normalize(np.asarray(embedding, dtype=np.float32).reshape(-1))
+        cutoff = _timestamp(before) if before else float("inf")
+        with self._lock:
+            size = len(self._ids)
+            if size == 0 or k <= 0:
+                return []
+            if self._ensure_hnsw():
+                matches = self._query_hnsw(query, k, cutoff, exclude_id)
+                if len(matches) == k:
+                    return matches
+            return self._query_exact(query, k, cutoff, exclude_id)
+
+    def _eligible(self, positions: np.ndarray, cutoff: float, exclude_id: Optional[str]) -> np.ndarray:
+        mask = self._uploaded[positions] < cutoff
+        excluded = self._positions.get(exclude_id) if exclude_id else None
+        if excluded is not None:
+            mask &= positions != excluded
+        return mask
+
+    def _query_exact(self, query: np.ndarray, k: int, cutoff: float, exclude_id: Optional[str]) -> List[Match]:
+        size = len(self._ids)
+        scores = self._matrix[:size] @ query
+        positions = np.flatnonzero(self._eligible(np.arange(size), cutoff, exclude_id))
+        if positions.size == 0:
+            return []
+        if positions.size > k:
+            top = np.argpartition(scores[positions], -k)[-k:]
+            positions = positions[top]
+        positions = positions[np.argsort(scores[positions])[::-1]]
+        return [Match(self._ids[p], self._names[p], float(scores[p])) for p in positions]
+
+    def query_chunks(
+        self,
+        chunk_embeddings: np.ndarray,
+        k: int = 2,
+        before: Optional[str] = None,
+        exclude_id: Optional[str] = None,
+    ) -> List[Match]:
+        """
+        Return the top-k documents by chunk-to-chunk max similarity.
+
+        A document's score is the mean, over the query chunks, of each query
+        chunk's best cosine similarity to any of that document's chunks.
+        Documents indexed without chunks are scored with their document vector
+        against the pooled query.
+
+        Args:
+            chunk_embeddings: Query chunk vectors, shape (m, dim)
+            k: Number of matches to return
+            before: Only consider documents uploaded strictly before this ISO timestamp
+            exclude_id: Document id to leave out of the results
+
+        Returns:
+            Matches ordered by descending score
+        """
+        queries = normalize_rows(np.asarray(chunk_embeddings, dtype=np.float32))
+        cutoff = _timestamp(before) if before else float("inf")
+        with self._lock:
+            size = len(self._ids)
+            if size == 0 or k <= 0 or not len(queries):
+                return []
+            pooled = queries.mean(axis=0)
+            scores = self._matrix[:size] @ (pooled / max(float(np.linalg.norm(pooled)), 1e-12))
+
+            best = np.full((len(queries), size), -np.inf, dtype=np.float32)
+            for start in range(0, self._chunk_count, CHUNK_BLOCK_SIZE):
+                stop = min(start + CHUNK_BLOCK_SIZE, self._chunk_count)
+                owner = self._chunk_owner[start:stop]
+                sims = queries @ self._chunks[start:stop].astype(np.float32).T
+                # Chunks of one document are contiguous: reduce each run to its max
+                run_starts = np.flatnonzero(np.r_[True, owner[1:] != owner[:-1]])
+                run_owner = owner[run_starts]
+                reduced = np.maximum.reduceat(sims, run_starts, axis=1)
+                live = run_owner >= 0
+                np.maximum.at(best, (slice(None), run_owner[live]), reduced[:, live])
+
+            has_chunks = np.zeros(size, dtype=bool)
+            has_chunks[list(self._has_chunks)] = True
+            scores = np.where(has_chunks, best.mean(axis=0), scores)
+
+            positions = np.flatnonzero(self._eligible(np.arange(size), cutoff, exclude_id))
+            if positions.size == 0:
+                return []
+            positions = positions[np.argsort(scores[positions])[::-1][:k]]
+            return [Match(self._ids[p], self._names[p], float(scores[p])) for p in positions]
+
+    def _query_hnsw(self, query: np.ndarray, k: int, cutoff: float, exclude_id: Optional[str]) -> List[Match]:
+        fetch = min(len(self._ids), max(k * 8, self.hnsw_ef))
+        labels, distances = self._hnsw.knn_query(query[np.newaxis, :], k=fetch)
+        positions = labels[0].astype(np.int64)
+        scores = 1.0 - distances[0]
+        keep = self._eligible(positions, cutoff, exclude_id)
+        return [
+            Match(self._ids[p], self._names[p], float(s))
+            for p, s in zip(positions[keep][:k], scores[keep][:k])
+        ]
+
+
+class VectorIndexRegistry:
+    """Holds one FolderIndex per folder and keeps them in sync with Supabase."""
+
+    def __init__(self, hnsw_threshold: int = 20000, page_size: int = 1000, chunk_mode: bool = False):
+        self.hnsw_threshold = hnsw_threshold
+        self.page_size = page_size
+        self.chunk_mode = chunk_mode
+        self.columns = f"{INDEX_COLUMNS}, {CHUNK_EMBEDDINGS_COLUMN}" if chunk_mode else INDEX_COLUMNS
+        self._lock = threading.Lock()
+        self._folders: Dict[str, FolderIndex] = {}
+        self._doc_folders: Dict[str, str] = {}
+        self._loaded: set = set()
+        self.ready = False
+
+    def _folder(self, folder: str) -> FolderIndex:
+        with self._lock:
+            index = self._folders.get(folder)
+            if index is None:
+                index = self._folders[folder] = FolderIndex(hnsw_threshold=self.hnsw_threshold)
+            return index
+
+    def upsert(self, folder: str, doc_id: str, name: str, uploaded_date: Optional[str], embedding: Any,
+               chunk_embeddings: Optional[np.ndarray] = None) -> bool:
+        """Add or update a document; returns False if the embedding is unusable."""
+        vector = parse_embedding(embedding)
+        if vector is None:
+            return False
+        with self._lock:
+            previous = self._doc_folders.get(doc_id)
+            self._doc_folders[doc_id] = folder
+        if previous is not None and previous != folder:
+            self._folder(previous).remove(doc_id)
+        index = self._folder(folder)
+        index.upsert(doc_id, name, uploaded_date, vector)
+        if self.chunk_mode and chunk_embeddings is not None:
+            index.upsert_chunks(doc_id, chunk_embeddings)
+        return True
+
+    def remove(self, doc_id: str) -> bool:
+        """Evict a document from whichever folder holds it; returns False if it was not indexed."""
+        with self._lock:
+            folder = self._doc_folders.pop(doc_id, None)
+        if folder is None:
+            return False
+        return self._folder(folder).remove(doc_id)
+
+    def query(self, folder: str, embedding: Any, k: int = 2, before: Optional[str] = None,
+              exclude_id: Optional[str] = None, chunk_embeddings: Optional[np.ndarray] = None) -> List[Match]:
+        """Top-k plagiarism candidates within a folder, by chunk similarity in chunk mode."""
+        if self.chunk_mode and chunk_embeddings is not None and len(chunk_embeddings):
+            return self._folder(folder).query_chunks(chunk_embeddings, k=k, before=before, exclude_id=exclude_id)
+        vector = parse_embedding(embedding)
+        if vector is None:
+            return []
+        return self._folder(folder).query(vector, k=k, before=before, exclude_id=exclude_id)
+
+    def _load_rows(self, rows: List[Dict[str, Any]]) -> int:
+        loaded = 0
+        for row in rows:
+            chunk_embeddings = decode_chunk_embeddings(row.get(CHUNK_EMBEDDINGS_COLUMN)) if self.chunk_mode else None
+            if self.upsert(row["folder"], row["id"], row.get("nameStudent") or "Unknown",
+                           row.get("uploadedDate"), row.get("embedding"), chunk_embeddings):
+                loaded += 1
+        return loaded
+
+    def _paginate(self, query_factory):
+        start = 0
+        while True:
+            rows = query_factory().range(start, start + self.page_size - 1).execute().data
+            if not rows:
+                return
+            yield rows
+            if len(rows) < self.page_size:
+                return
+            start += self.page_size
+
+    def ensure_folder(self, supabase, folder: str) -> None:
+        """Load a single folder from Supabase if the full rebuild has not covered it yet."""
+        if self.ready or folder in self._loaded:
+            return
+        for rows in self._paginate(
+            lambda: supabase.table("documents").select(self.columns).eq("folder", folder).order("id")
+        ):
+            self._load_rows(rows)
+        self._loaded.add(folder)
+
+    def rebuild(self, supabase) -> int:
+        """
+        Rebuild every folder index from the documents table.
+
+        Args:
+            supabase: Supabase client
+
+        Returns:
+            Number of documents loaded into the index
+        """
+        total = 0
+        # A folder's rows are spread over the id-ordered pages, so none counts as
+        # loaded until the scan ends; until then ensure_folder loads it on demand
+        for rows in self._paginate(
+            lambda: supabase.table("documents").select(self.columns).order("id")
+        ):
+            total += self._load_rows(rows)
+        self.ready = True
+        logger.info(f"Vector index rebuilt with {total} documents across {len(self._folders)} folders")
+        return total
+
+    def _is_stale(self, row: Dict[str, Any]) -> bool:
+        folder = self._doc_folders.get(row["id"])
+        if folder != row["folder"]:
+            return True
+        return self._folder(folder).uploaded_at(row["id"]) != _timestamp(row.get("uploadedDate"))
+
+    def refresh(self, supabase) -> Dict[str, int]:
+        """
+        Reconcile the index with the documents table.
+
+        Only ids, folders and upload dates are scanned. Documents that were
+        deleted or lost their embedding are evicted, and rows the index does
+        not hold yet, or holds under another folder or upload date, are
+        fetched in full. This picks up uploads handled by other workers; an
+        embedding rewritten in place without a new upload date is only seen
+        by the next rebuild.
+
+        Args:
+            supabase: Supabase client
+
+        Returns:
+            Counts of removed and loaded documents
+        """
+        stored: Dict[str, Dict[str, Any]] = {}
+        for rows in self._paginate(
+            lambda: supabase.table("documents").select(REFRESH_COLUMNS)
+            .not_.is_("embedding", "null").order("id")
+        ):
+            stored.update((row["id"], row) for row in rows)
+
+        with self._lock:
+            indexed = list(self._doc_folders)
+        removed = sum(self.remove(doc_id) for doc_id in indexed if doc_id not in stored)
+        stale = [doc_id for doc_id, row in stored.items() if self._is_stale(row)]
+        loaded = 0
+        for start in range(0, len(stale), REFRESH_FETCH_SIZE):
+            ids = stale[start:start + REFRESH_FETCH_SIZE]
+            rows = supabase.table("documents").select(self.columns).in_("id", ids).execute().data
+            loaded += self._load_rows(rows)
+        if removed or loaded:
+            logger.info(f"Vector index refresh removed {removed} and loaded {loaded} documents")
+        return {"removed": removed, "loaded": loaded}
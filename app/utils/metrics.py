@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Histogram, Gauge
+from prometheus_client import Counter, Histogram, Gauge, Info
 from fastapi import FastAPI
 import time
 
@@ -8,6 +8,72 @@ REQUEST_DURATION = Histogram('fastapi_request_duration_seconds', 'Request durati
 ACTIVE_CONNECTIONS = Gauge('fastapi_active_connections', 'Active connections')
 DOCUMENT_PROCESSING_DURATION = Histogram('document_processing_duration_seconds', 'Document processing duration')
 ML_MODEL_PREDICTIONS = Counter('ml_model_predictions_total', 'Total ML model predictions')
+MODEL_VERSION_INFO = Info('ml_model', 'Clustering model version currently being served')
+MODEL_RELOADS = Counter('ml_model_reloads_total', 'Model reload attempts', ['trigger', 'result'])
+MODEL_RELOAD_LATENCY = Histogram(
+    'ml_model_reload_latency_seconds',
+    'Time from deployment to the new model being served',
+    ['trigger'],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+)
+
+# Worker pool metrics
+WORKER_POOL_QUEUE_DEPTH = Gauge('worker_pool_queue_depth', 'Tasks queued or running in a worker pool', ['pool'])
+WORKER_POOL_REJECTIONS = Counter('worker_pool_rejections_total', 'Tasks rejected because a worker pool was saturated', ['pool', 'stage'])
+STAGE_QUEUE_WAIT = Histogram('stage_queue_wait_seconds', 'Time a task waited for a worker', ['pool', 'stage'])
+STAGE_RUN_DURATION = Histogram('stage_run_duration_seconds', 'Time a task spent running on a worker', ['pool', 'stage'])
+
+# Content cache metrics
+CONTENT_CACHE_HITS = Counter('content_cache_hits_total', 'Content cache hits', ['namespace', 'tier'])
+CONTENT_CACHE_MISSES = Counter('content_cache_misses_total', 'Content cache misses', ['namespace'])
+CONTENT_CACHE_BYTES_SAVED = Counter('content_cache_bytes_saved_total', 'PDF bytes whose parsing, embedding and NER were skipped')
+
+# Feedback agent metrics
+AGENT_NODE_LATENCY = Histogram(
+    'agent_node_latency_seconds',
+    'Time spent in a feedback workflow node',
+    ['node'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+)
+AGENT_WORKFLOW_LATENCY = Histogram(
+    'agent_workflow_latency_seconds',
+    'End-to-end feedback workflow duration',
+    buckets=(0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+)
+AGENT_STREAM_FIRST_EVENT = Histogram(
+    'agent_stream_first_event_seconds',
+    'Time until the first event of a streamed feedback run',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30)
+)
+LLM_CACHE_HITS = Counter('llm_cache_hits_total', 'LLM completions served from cache', ['node', 'level'])
+LLM_CACHE_MISSES = Counter('llm_cache_misses_total', 'LLM completions that had to call the model', ['node'])
+LLM_CACHE_SAVED_CHARS = Counter('llm_cache_saved_prompt_chars_total', 'Prompt characters not sent to the LLM because of cache hits', ['node'])
+LLM_TOKENS = Counter('llm_tokens_total', 'LLM tokens used by the feedback workflow', ['node', 'kind'])
+
+# LLM gateway metrics
+LLM_GATEWAY_QUEUE_DEPTH = Gauge('llm_gateway_queue_depth', 'LLM calls waiting for rate budget', ['priority'])
+LLM_GATEWAY_WAIT = Histogram(
+    'llm_gateway_wait_seconds',
+    'Time an LLM call waited for rate budget',
+    ['priority'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+)
+LLM_GATEWAY_RETRIES = Counter('llm_gateway_retries_total', 'LLM calls retried after a transient error', ['reason'])
+LLM_GATEWAY_COALESCED = Counter('llm_gateway_coalesced_total', 'LLM calls served by an identical in-flight call')
+LLM_GATEWAY_TOKENS_PER_SECOND = Gauge('llm_gateway_tokens_per_second', 'LLM tokens per second over the last minute')
+
+# Embedding metrics
+EMBEDDING_BATCH_SIZE = Histogram(
+    'embedding_batch_size',
+    'Texts per local embedding inference batch',
+    ['backend'],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+EMBEDDING_INFERENCE_DURATION = Histogram('embedding_inference_duration_seconds', 'Local embedding inference time per batch', ['backend'])
+
+# Startup metrics
+STARTUP_PHASE_DURATION = Gauge('startup_phase_duration_seconds', 'Time taken to initialize a component', ['component'])
+COMPONENT_READY = Gauge('component_ready', 'Whether a component has finished initializing (1) or not (0)', ['component'])
 
 def setup_metrics(app: FastAPI):
     @app.middleware("http")
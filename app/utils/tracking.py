@@ -0,0 +1,58 @@
+"""
+MLflow run tracking for async request handlers.
+The fluent ``mlflow.start_run`` API keeps a single active-run stack, which
+breaks as soon as two requests interleave on the event loop. This module
+buffers params and metrics per request and writes them in one batch call.
+"""
+
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from mlflow.entities import Metric, Param, RunStatus
+from mlflow.tracking import MlflowClient
+
+logger = logging.getLogger(__name__)
+
+EXPERIMENT_NAME = "document-processing"
+
+
+class TrackingRun:
+    """Buffered MLflow run that is safe to use from concurrent handlers."""
+
+    def __init__(self, run_name: str, experiment_name: str = EXPERIMENT_NAME):
+        self.run_name = run_name
+        self.experiment_name = experiment_name
+        self.params: Dict[str, str] = {}
+        self.metrics: Dict[str, float] = {}
+        self.failed = False
+
+    def log_param(self, key: str, value: Any) -> None:
+        self.params[key] = str(value)[:500]
+
+    def log_metric(self, key: str, value: float) -> None:
+        self.metrics[key] = float(value)
+
+    def fail(self, error: Any) -> None:
+        self.failed = True
+        self.log_param("error", error)
+
+    def flush(self, client: Optional[MlflowClient] = None) -> None:
+        """Create the run and write all buffered values; errors are logged, not raised."""
+        try:
+            client = client or MlflowClient()
+            experiment = client.get_experiment_by_name(self.experiment_name)
+            if experiment is None:
+                logger.warning(f"MLflow experiment {self.experiment_name} not found, skipping run {self.run_name}")
+                return
+            run = client.create_run(experiment.experiment_id, run_name=self.run_name)
+            timestamp = int(time.time() * 1000)
+            client.log_batch(
+                run.info.run_id,
+                metrics=[Metric(key, value, timestamp, 0) for key, value in self.metrics.items()],
+                params=[Param(key, value) for key, value in self.params.items()],
+            )
+            status = RunStatus.FAILED if self.failed else RunStatus.FINISHED
+            client.set_terminated(run.info.run_id, status=RunStatus.to_string(status))
+        except Exception as e:
+            logger.warning(f"Failed to log MLflow run {self.run_name}: {str(e)}")
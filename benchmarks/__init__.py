@@ -0,0 +1,5 @@
+"""
+Benchmarks for the hot paths of the API and the training pipeline.
+Each module runs standalone with ``python -m benchmarks.<name>`` and prints a
+JSON report.
+"""
@@ -0,0 +1,95 @@
+"""
+Feedback workflow wall-clock time against a stub LLM.
+Each node's model call sleeps for a fixed latency, so the numbers isolate
+scheduling: the compiled graph run with ``ainvoke`` should finish close to the
+critical path, max(summary, relevance) + feedback + personalization, rather
+than the sum of the four calls that the blocking ``invoke`` path paid.
+Concurrent runs check that the event loop stays free while calls are in
+flight. Caches and the gateway are left out so every call reaches the model.
+
+    python -m benchmarks.agent_workflow --runs 5 --concurrent 20
+
+Importing the agent module needs the API's settings (.env); any
+GROQ_API_KEY value works because Groq is never called.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict
+
+from app.routers.agent import (
+    AssignmentRequest,
+    build_workflow,
+    feedback_prompt,
+    initial_state,
+    personalization_prompt,
+    relevance_prompt,
+    summary_prompt,
+)
+from tests.fakes import StubChatModel
+
+PAYLOAD = AssignmentRequest(
+    title="Sorting algorithms",
+    description="Compare merge sort and quicksort on random and sorted input.",
+    content="Merge sort splits the list in halves. " * 50,
+    persona="Be concise and encouraging.",
+)
+
+
+def stub_model(summary: float, relevance: float, feedback: float, personalization: float) -> StubChatModel:
+    return StubChatModel(latencies={
+        "Summarize": summary,
+        "Analyze the relevance": relevance,
+        "You are an academic evaluator": feedback,
+        "Personalize": personalization,
+    })
+
+
+def sequential_invoke(model: StubChatModel) -> None:
+    """The old execution: four blocking ``invoke`` calls, one after another."""
+    summary = model.invoke(summary_prompt(PAYLOAD.content)).content
+    relevance = model.invoke(relevance_prompt(PAYLOAD.title, PAYLOAD.description)).content
+    feedback = model.invoke(feedback_prompt(summary, relevance)).content
+    model.invoke(personalization_prompt(PAYLOAD.persona, feedback))
+
+
+async def _graph_runs(workflow, runs: int, concurrent: int) -> Dict[str, float]:
+    started = time.perf_counter()
+    for _ in range(runs):
+        await workflow.ainvoke(initial_state(PAYLOAD))
+    single = (time.perf_counter() - started) / runs
+
+    started = time.perf_counter()
+    await asyncio.gather(*(workflow.ainvoke(initial_state(PAYLOAD)) for _ in range(concurrent)))
+    return {"graph_seconds": single, "concurrent_batch_seconds": time.perf_counter() - started}
+
+
+def run(runs: int = 5, concurrent: int = 20, summary: float = 0.4, relevance: float = 0.3,
+        feedback: float = 0.3, personalization: float = 0.2) -> Dict[str, Any]:
+    model = stub_model(summary, relevance, feedback, personalization)
+    started = time.perf_counter()
+    sequential_invoke(model)
+    sequential = time.perf_counter() - started
+
+    report: Dict[str, Any] = {
+        "critical_path_seconds": max(summary, relevance) + feedback + personalization,
+        "serial_sum_seconds": summary + relevance + feedback + personalization,
+        "sequential_invoke_seconds": sequential,
+        "concurrent_runs": concurrent,
+    }
+    report.update(asyncio.run(_graph_runs(build_workflow(model), runs, concurrent)))
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the feedback workflow against a stub LLM")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--concurrent", type=int, default=20)
+    args = parser.parse_args()
+    print(json.dumps(run(args.runs, args.concurrent), indent=2))
+
+
+if __name__ == "__main__":
+    main()
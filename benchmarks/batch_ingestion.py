@@ -0,0 +1,166 @@
+"""
+Batch ingestion benchmark: /upload/batch pipeline against sequential /upload.
+Both paths run the real parsing, chunking, pooling, plagiarism and row
+building code on synthetic PDFs. The embedding API, GLiNER and Supabase are
+stubs that sleep for a configurable latency per call and per item, so the
+report shows what batching and overlapping stages save, not model speed.
+
+    python -m benchmarks.batch_ingestion --documents 40 --pages 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from app.services.batch_ingestion import BatchIngestionPipeline
+from app.services.chunk_embeddings import embed_texts, pool_embeddings
+from app.services.content_cache import ContentCache
+from app.services.executor import ExecutionLayer
+from app.services.ingestion import (
+    download_pdf,
+    extract_entities,
+    fetch_document,
+    hours_before_deadline,
+    parse_pdf,
+    update_document,
+)
+from app.services.vector_index import VectorIndexRegistry
+from benchmarks.synthetic import write_text_pdf
+from tests.fakes import FakeSupabase
+
+
+class LatencyEmbeddings:
+    """Embedding client stub: fixed latency per call plus per text."""
+
+    def __init__(self, per_call: float, per_text: float, dim: int = 1024):
+        self.per_call, self.per_text, self.dim = per_call, per_text, dim
+        self.calls = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        time.sleep(self.per_call + self.per_text * len(texts))
+        rng = np.random.default_rng(len(texts))
+        return rng.normal(size=(len(texts), self.dim)).tolist()
+
+
+class LatencyNer:
+    """GLiNER stub: fixed latency per call plus per text."""
+
+    def __init__(self, per_call: float, per_text: float):
+        self.per_call, self.per_text = per_call, per_text
+
+    def predict_entities(self, text: str, labels: List[str]):
+        return self.batch_predict_entities([text], labels)[0]
+
+    def batch_predict_entities(self, texts: List[str], labels: List[str]):
+        time.sleep(self.per_call + self.per_text * len(texts))
+        return [[{"label": "Name", "text": f"student {len(text)}"}] for text in texts]
+
+
+class LatencySupabase(FakeSupabase):
+    """FakeSupabase with a round-trip latency on every executed query."""
+
+    def __init__(self, tables, latency: float):
+        super().__init__(tables)
+        self.latency = latency
+
+    def table(self, name: str):
+        query = super().table(name)
+        execute = query.execute
+
+        def slow_execute():
+            time.sleep(self.latency)
+            return execute()
+
+        query.execute = slow_execute
+        return query
+
+
+async def sequential_uploads(execution, pairs, supabase, embeddings, ner, index) -> None:
+    """The /upload flow, one document after another."""
+    for pair in pairs:
+        record = await execution.run_io("supabase_read", fetch_document, supabase, pair["uuid"])
+        source = await execution.run_io("pdf_fetch", download_pdf, pair["file_url"])
+        parsed = await execution.run_cpu("pdf_parse", parse_pdf, source.path)
+        chunk_vectors, entities = await asyncio.gather(
+            embed_texts(execution, embeddings, parsed.chunks),
+            execution.run_cpu("ner", extract_entities, ner, parsed.chunks),
+        )
+        vector = pool_embeddings(chunk_vectors)
+        await execution.run_io("index_load", index.ensure_folder, supabase, record["folder"])
+        index.query(record["folder"], vector, before=record["uploadedDate"], exclude_id=pair["uuid"])
+        hours_before_deadline(record["deadline"], record["uploadedDate"])
+        await execution.run_io("supabase_write", update_document, supabase, pair["uuid"], {"page": parsed.page_count})
+        index.upsert(record["folder"], pair["uuid"], entities["Name"], record["uploadedDate"], vector)
+
+
+def run(documents: int = 40, pages: int = 5, embed_call: float = 0.08, embed_text: float = 0.002,
+        ner_call: float = 0.02, ner_text: float = 0.03, db_latency: float = 0.03) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as workdir:
+        pairs, rows = [], []
+        for i in range(documents):
+            path = os.path.join(workdir, f"doc-{i}.pdf")
+            write_text_pdf(path, pages, seed=i)
+            pairs.append({"uuid": f"doc-{i}", "file_url": path})
+            rows.append({
+                "id": f"doc-{i}", "folder": f"folder-{i % 4}", "uploadedDate": f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}",
+                "deadline": "2024-02-01T00:00:00",
+            })
+
+        report: Dict[str, Any] = {"documents": documents, "pages_per_document": pages}
+        for name in ("sequential", "batch"):
+            execution = ExecutionLayer(cpu_workers=2, cpu_queue=64, io_workers=16, io_queue=256)
+            cache = ContentCache(os.path.join(workdir, f"{name}.sqlite"))
+            supabase = LatencySupabase({"documents": [dict(row) for row in rows]}, db_latency)
+            embeddings = LatencyEmbeddings(embed_call, embed_text)
+            ner = LatencyNer(ner_call, ner_text)
+            index = VectorIndexRegistry()
+            started = time.perf_counter()
+            if name == "sequential":
+                asyncio.run(sequential_uploads(execution, pairs, supabase, embeddings, ner, index))
+            else:
+                pipeline = BatchIngestionPipeline(
+                    execution=execution, content_cache=cache, embedding_model="stub", embeddings=embeddings,
+                    ner_model=ner, supabase=supabase, vector_index=index, cluster_fn=lambda *args: None,
+                )
+
+                async def consume():
+                    return [event async for event in pipeline.run(pairs)]
+
+                events = asyncio.run(consume())
+                report["batch_completed"] = sum(event["status"] == "completed" for event in events)
+            elapsed = time.perf_counter() - started
+            report[name] = {
+                "seconds": elapsed,
+                "docs_per_second": documents / elapsed,
+                "embedding_calls": embeddings.calls,
+                "supabase_queries": len(supabase.calls),
+            }
+            execution.shutdown()
+            cache.close()
+        report["speedup"] = report["batch"]["docs_per_second"] / report["sequential"]["docs_per_second"]
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark batch ingestion against sequential uploads")
+    parser.add_argument("--documents", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--embed-call-latency", type=float, default=0.08)
+    parser.add_argument("--ner-text-latency", type=float, default=0.03)
+    parser.add_argument("--db-latency", type=float, default=0.03)
+    args = parser.parse_args()
+    print(json.dumps(run(
+        args.documents, args.pages, embed_call=args.embed_call_latency, ner_text=args.ner_text_latency,
+        db_latency=args.db_latency,
+    ), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Per-request clustering latency in /upload, before and after the fix.
+Before: a one-row DataFrame, a StandardScaler fitted on that row and a
+clusterer fitted on it with fit_predict. The original code called fit_predict
+on the GLiNER object and never got that far; a one-cluster KMeans stands in
+for the refit it intended. After: the persisted MinMaxScaler, the fixed
+feature weights and predict on a trained model, through sklearn and through
+the compiled inference kernel.
+
+    python -m benchmarks.clustering --requests 200
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import KMeans
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+from app.services.clustering import FEATURE_WEIGHTS, infer_clusters, predict_clusters, upload_features
+from app.services.inference_kernel import build_kernel
+
+
+def refit_cluster(sentence_count: int, page_count: int, time_diff: float, plagiarism_score: float) -> float:
+    """The removed cluster_document: fit a scaler and a clusterer on one row."""
+    df = pd.DataFrame({
+        'sentences': [sentence_count],
+        'page': [page_count],
+        'timing': [time_diff],
+        'plagiarism': [plagiarism_score]
+    })
+    scaled_data = StandardScaler().fit_transform(df)
+    return KMeans(n_clusters=1, n_init=1).fit_predict(scaled_data)[0]
+
+
+def synthetic_features(n: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.integers(20, 400, n),
+        rng.integers(1, 30, n),
+        rng.integers(-48, 240, n),
+        rng.uniform(0, 100, n).round(2),
+    ]).astype(np.float64)
+
+
+def _latency(fn, rows: np.ndarray) -> Dict[str, float]:
+    timings = []
+    for row in rows:
+        started = time.perf_counter()
+        fn(*row)
+        timings.append(time.perf_counter() - started)
+    return {
+        "p50_ms": float(np.percentile(timings, 50) * 1000),
+        "p95_ms": float(np.percentile(timings, 95) * 1000),
+    }
+
+
+def run(requests: int = 200, train_rows: int = 2000, n_clusters: int = 4, seed: int = 0) -> Dict[str, Any]:
+    X_train = synthetic_features(train_rows, seed)
+    scaler = MinMaxScaler().fit(X_train)
+    model = KMeans(n_clusters=n_clusters, n_init=10, random_state=seed).fit(scaler.transform(X_train) * FEATURE_WEIGHTS)
+    kernel = build_kernel(model, scaler, FEATURE_WEIGHTS)
+
+    rows = synthetic_features(requests, seed + 1)
+    rows[:, 3] /= 100  # cluster_document takes plagiarism as a 0-1 similarity
+
+    def persisted(sentence_count, page_count, time_diff, plagiarism_score):
+        X = upload_features(sentence_count, page_count, time_diff, plagiarism_score)
+        return predict_clusters(model, scaler, X)[0][0]
+
+    def compiled(sentence_count, page_count, time_diff, plagiarism_score):
+        X = upload_features(sentence_count, page_count, time_diff, plagiarism_score)
+        return infer_clusters(model, scaler, X, kernel)[0][0]
+
+    return {
+        "requests": requests,
+        "before_refit": _latency(refit_cluster, rows),
+        "after_predict": _latency(persisted, rows),
+        "after_kernel": _latency(compiled, rows) if kernel is not None else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark per-request clustering in /upload")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--clusters", type=int, default=4)
+    args = parser.parse_args()
+    print(json.dumps(run(args.requests, n_clusters=args.clusters), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Local embedding throughput and latency under concurrent requests.
+Runs the OnnxE5Embeddings pipeline (tokenize, length-bucketed sub-batches,
+dynamic batching across callers) three ways: one text per inference call,
+dynamic batching with no length bucketing, and the default configuration.
+It reports throughput, latency percentiles and the share of padded positions
+that were real tokens. Without --model and --tokenizer a stand-in encoder
+(token embedding plus one dense layer, tests.fakes.StubEncoderSession) is
+used, so the numbers show batching effects, not e5's absolute speed. With
+the ONNX export and its tokenizer.json the real model is measured. --remote
+adds Pinecone's hosted model, and the numerical agreement of the local
+vectors with it (needs PINECONE_API_KEY and network access).
+
+    python -m benchmarks.embeddings --passages 512 --concurrency 8
+    python -m benchmarks.embeddings --model e5-int8/model_quantized.onnx --tokenizer e5-int8/tokenizer.json --remote
+"""
+
+import argparse
+import json
+import random
+from typing import Any, Dict, List, Optional
+
+from app.services.embeddings import PASSAGE_PREFIX, OnnxE5Embeddings, benchmark_backend, compare_backends
+from benchmarks.synthetic import sentences
+from tests.fakes import StubEncoderSession, StubTokenizer
+
+CONFIGURATIONS = {
+    "unbatched": {"max_batch_size": 1},
+    "batched_unbucketed": {"max_padding_ratio": float("inf")},
+    "batched_bucketed": {},
+}
+
+
+def synthetic_passages(count: int, seed: int = 0) -> List[str]:
+    """Chunks of 1 to 20 sentences, so token counts vary as in real documents."""
+    rng = random.Random(seed)
+    pool = sentences(count * 20, seed)
+    return [" ".join(rng.sample(pool, rng.randint(1, 20))) for _ in range(count)]
+
+
+def _backend(config: Dict[str, Any], model: Optional[str], tokenizer: Optional[str]) -> OnnxE5Embeddings:
+    if model:
+        return OnnxE5Embeddings(model, tokenizer, **config)
+    return OnnxE5Embeddings(session=StubEncoderSession(dim=256), tokenizer=StubTokenizer(), **config)
+
+
+def _padding_efficiency(backend: OnnxE5Embeddings, texts: List[str]) -> Optional[float]:
+    shapes = getattr(backend.session, "batch_shapes", None)
+    if not shapes:
+        return None
+    real = sum(len(encoding.ids) for encoding in backend.tokenizer.encode_batch([PASSAGE_PREFIX + text for text in texts]))
+    # Every text is embedded once, plus the warm-up call
+    return real / sum(rows * length for rows, length in shapes[1:])
+
+
+def run(passages: int = 512, concurrency: int = 8, texts_per_request: int = 4,
+        model: Optional[str] = None, tokenizer: Optional[str] = None, remote: bool = False,
+        texts: Optional[List[str]] = None) -> Dict[str, Any]:
+    texts = texts or synthetic_passages(passages)
+    report: Dict[str, Any] = {
+        "encoder": model or "stand-in",
+        "texts": len(texts),
+        "concurrency": concurrency,
+        "texts_per_request": texts_per_request,
+    }
+    local = None
+    for name, config in CONFIGURATIONS.items():
+        backend = _backend(config, model, tokenizer)
+        try:
+            backend.embed_documents(texts[:1])
+            result = benchmark_backend(backend, texts, concurrency, texts_per_request)
+            result["padding_efficiency"] = _padding_efficiency(backend, texts)
+            report[name] = result
+        finally:
+            if name == "batched_bucketed":
+                local = backend
+            else:
+                backend.close()
+
+    try:
+        if remote:
+            from app.core.config import settings
+            from app.services.embeddings import create_embedding_backend
+
+            pinecone = create_embedding_backend(settings.model_copy(update={"EMBEDDING_BACKEND": "pinecone"}))
+            report["remote"] = benchmark_backend(pinecone, texts, concurrency, texts_per_request)
+            report["agreement"] = compare_backends(pinecone, local, texts)
+    finally:
+        local.close()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the local embedding backend")
+    parser.add_argument("--passages", type=int, default=512)
+    parser.add_argument("--texts", help="file with one passage per line instead of synthetic passages")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--texts-per-request", type=int, default=4)
+    parser.add_argument("--model", help="ONNX export of multilingual-e5-large")
+    parser.add_argument("--tokenizer", help="tokenizer.json of the export")
+    parser.add_argument("--remote", action="store_true", help="also measure Pinecone and the agreement with it")
+    args = parser.parse_args()
+    if bool(args.model) != bool(args.tokenizer):
+        parser.error("--model and --tokenizer go together")
+
+    texts = None
+    if args.texts:
+        with open(args.texts, encoding="utf-8") as f:
+            texts = [line.strip() for line in f if line.strip()]
+    print(json.dumps(run(args.passages, args.concurrency, args.texts_per_request,
+                         args.model, args.tokenizer, args.remote, texts), indent=2))
+
+
+if __name__ == "__main__":
+    main()
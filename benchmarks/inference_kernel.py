@@ -0,0 +1,68 @@
+"""
+Inference latency: sklearn predict/transform against the compiled numpy kernel.
+Both paths take raw feature rows and return labels and confidence, as
+ModelBundle.predict does, for a single /predict row and for batches.
+
+    python -m benchmarks.inference_kernel --calls 2000
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Dict
+
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.mixture import GaussianMixture
+from sklearn.preprocessing import MinMaxScaler
+
+from app.services.clustering import FEATURE_WEIGHTS, infer_clusters
+from app.services.inference_kernel import build_kernel
+from benchmarks.clustering import synthetic_features
+
+
+def _per_call_us(fn, calls: int) -> Dict[str, float]:
+    timings = np.empty(calls)
+    for i in range(calls):
+        started = time.perf_counter()
+        fn()
+        timings[i] = time.perf_counter() - started
+    return {"p50_us": float(np.percentile(timings, 50) * 1e6), "p95_us": float(np.percentile(timings, 95) * 1e6)}
+
+
+def run(calls: int = 2000, batch_sizes=(1, 100, 10000), seed: int = 0) -> Dict[str, Any]:
+    X_train = synthetic_features(2000, seed)
+    scaler = MinMaxScaler().fit(X_train)
+    X_weighted = scaler.transform(X_train) * FEATURE_WEIGHTS
+    models = {
+        "kmeans": KMeans(n_clusters=4, n_init=10, random_state=seed).fit(X_weighted),
+        "gmm": GaussianMixture(n_components=4, random_state=seed).fit(X_weighted),
+    }
+    X = synthetic_features(max(batch_sizes), seed + 1)
+
+    report: Dict[str, Any] = {"calls": calls}
+    for name, model in models.items():
+        kernel = build_kernel(model, scaler, FEATURE_WEIGHTS)
+        report[name] = {}
+        for size in batch_sizes:
+            rows = X[:size]
+            repeats = max(10, calls // size)
+            sklearn_latency = _per_call_us(lambda: infer_clusters(model, scaler, rows), repeats)
+            kernel_latency = _per_call_us(lambda: infer_clusters(model, scaler, rows, kernel), repeats)
+            report[name][f"rows_{size}"] = {
+                "sklearn": sklearn_latency,
+                "kernel": kernel_latency,
+                "speedup_p50": sklearn_latency["p50_us"] / kernel_latency["p50_us"],
+            }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the numpy inference kernel against sklearn")
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.calls), indent=2))
+
+
+if __name__ == "__main__":
+    main()
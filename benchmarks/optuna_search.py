@@ -0,0 +1,56 @@
+"""
+Optuna search wall-clock time, serial against a spawn worker pool.
+train_model logs optuna_speedup_estimate: the summed CPU time of the trials
+over the search's wall time, with no serial run to compare against. This
+benchmark runs the same search both ways on synthetic features and reports
+the measured speedup next to that estimate. Parallel speedup is bounded by
+the cores available, which the report includes.
+
+    python -m benchmarks.optuna_search --rows 5000 --trials 20 --workers 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from typing import Any, Dict
+
+import optuna
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from benchmarks.clustering import synthetic_features
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "airflow", "plugins"))
+from optuna_search import run_studies  # noqa: E402
+from silhouette_scoring import score_silhouette  # noqa: E402
+
+
+def run(rows: int = 5000, trials: int = 20, workers: int = 4) -> Dict[str, Any]:
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    frame = pd.DataFrame(synthetic_features(rows), columns=['sentences', 'page', 'timing', 'plagiarism'])
+    report: Dict[str, Any] = {"cpu_count": os.cpu_count(), "rows": rows, "trials_per_study": trials}
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "features.arrow")
+        feather.write_feather(pa.Table.from_pandas(frame, preserve_index=False), path, compression='uncompressed')
+        for n_workers in (1, workers):
+            _, stats = run_studies(path, frame, trials, n_workers, workdir, score_silhouette)
+            report[f"workers_{n_workers}"] = stats
+    serial = report["workers_1"]["optuna_wall_seconds"]
+    report["measured_speedup"] = serial / report[f"workers_{workers}"]["optuna_wall_seconds"]
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark serial and parallel Optuna search")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.trials, args.workers), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Page throughput of PDF parsing on synthetic multi-hundred-page reports.
+Compares serial extraction in one thread (what PyPDFLoader did) with
+page-range extraction in a spawn process pool, for the whole parse_pdf stage
+(extraction, sentence counting and chunking) and for the time until the first
+page reaches the chunker. Parallel speedup is bounded by the cores available,
+which the report includes.
+
+    python -m benchmarks.pdf_pages --pages 100 300 600 --workers 4
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+from app.services.ingestion import parse_pdf
+from app.services.pdf_pages import extract_page_range, iter_pdf_pages
+from benchmarks.synthetic import write_text_pdf
+
+
+def _first_page_seconds(path: str, pool) -> float:
+    started = time.perf_counter()
+    pages = iter_pdf_pages(path, pool)
+    next(pages)
+    elapsed = time.perf_counter() - started
+    pages.close()
+    return elapsed
+
+
+def _parse(path: str, pool) -> Dict[str, float]:
+    started = time.perf_counter()
+    document = parse_pdf(path, pool)
+    elapsed = time.perf_counter() - started
+    return {"seconds": elapsed, "pages_per_second": document.page_count / elapsed}
+
+
+def run(page_counts: List[int] = (100, 300, 600), workers: int = 4) -> Dict[str, Any]:
+    report: Dict[str, Any] = {"cpu_count": os.cpu_count(), "workers": workers, "documents": []}
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            # Start the workers before timing so spawn start-up is not counted
+            warm = os.path.join(workdir, "warm.pdf")
+            write_text_pdf(warm, 1)
+            list(pool.map(extract_page_range, [warm] * workers, [0] * workers, [1] * workers))
+
+            for pages in page_counts:
+                path = os.path.join(workdir, f"report-{pages}.pdf")
+                size = write_text_pdf(path, pages, seed=pages)
+                report["documents"].append({
+                    "pages": pages,
+                    "bytes": size,
+                    "serial": _parse(path, None),
+                    "parallel": _parse(path, pool),
+                    "serial_first_page_seconds": _first_page_seconds(path, None),
+                    "parallel_first_page_seconds": _first_page_seconds(path, pool),
+                })
+        finally:
+            pool.shutdown(cancel_futures=True)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark page-parallel PDF parsing")
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 300, 600])
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    print(json.dumps(run(args.pages, args.workers), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+/predict/batch throughput on a columnar body.
+Times the work the endpoint does per call: decoding the JSON columns, building
+the feature matrix, one scale + weight + predict through sklearn or the
+compiled kernel, and serialising the response lists. For reference it also
+times single-row prediction, the way dashboards re-scored a class before.
+
+    python -m benchmarks.predict_batch --rows 100000
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Dict
+
+import numpy as np
+from sklearn.cluster import KMeans
+from sklearn.mixture import GaussianMixture
+from sklearn.preprocessing import MinMaxScaler
+
+from app.services.clustering import FEATURE_COLUMNS, FEATURE_WEIGHTS, infer_clusters
+from app.services.inference_kernel import build_kernel
+from benchmarks.clustering import synthetic_features
+
+
+def _batch_call(body: str, model, scaler, kernel) -> Dict[str, Any]:
+    payload = json.loads(body)
+    X = np.column_stack([np.asarray(payload[column], dtype=np.float64) for column in FEATURE_COLUMNS])
+    labels, confidence = infer_clusters(model, scaler, X, kernel)
+    return {"clusters": labels.astype(int).tolist(), "confidence": confidence.tolist()}
+
+
+def _timed(fn, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(rows: int = 100000, single_rows: int = 1000, repeats: int = 3, seed: int = 0) -> Dict[str, Any]:
+    X_train = synthetic_features(2000, seed)
+    scaler = MinMaxScaler().fit(X_train)
+    X_weighted = scaler.transform(X_train) * FEATURE_WEIGHTS
+    models = {
+        "kmeans": KMeans(n_clusters=4, n_init=10, random_state=seed).fit(X_weighted),
+        "gmm": GaussianMixture(n_components=4, random_state=seed).fit(X_weighted),
+    }
+
+    X = synthetic_features(rows, seed + 1)
+    body = json.dumps({column: X[:, i].tolist() for i, column in enumerate(FEATURE_COLUMNS)})
+    report: Dict[str, Any] = {"rows": rows, "body_bytes": len(body)}
+    for name, model in models.items():
+        kernel = build_kernel(model, scaler, FEATURE_WEIGHTS)
+        single = _timed(lambda: [infer_clusters(model, scaler, row[np.newaxis, :]) for row in X[:single_rows]], 1)
+        report[name] = {
+            "batch_sklearn_seconds": _timed(lambda: _batch_call(body, model, scaler, None), repeats),
+            "batch_kernel_seconds": _timed(lambda: _batch_call(body, model, scaler, kernel), repeats)
+            if kernel is not None else None,
+            "single_row_ms": single / single_rows * 1000,
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark /predict/batch on a columnar body")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--single-rows", type=int, default=1000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.single_rows), indent=2))
+
+
+if __name__ == "__main__":
+    main()
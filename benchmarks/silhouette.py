@@ -0,0 +1,77 @@
+"""
+Silhouette scoring cost and accuracy as the training set grows.
+sklearn's silhouette_score is exact and quadratic. The scoring plugin adds a
+blocked float32 exact path, a stratified sample with a confidence interval,
+and the centroid (simplified) silhouette. Each is timed here on synthetic
+features weighted like the pipeline's, with KMeans labels. The sklearn score
+is the reference for the others, and it is skipped above --sklearn-max-rows.
+The centroid value is reported to show how far that score is from the
+silhouette, which is why it is only used to rank trials.
+
+    python -m benchmarks.silhouette --rows 10000 50000 --sample-size 10000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+from sklearn.cluster import KMeans
+from sklearn.metrics import silhouette_score
+from sklearn.preprocessing import MinMaxScaler
+
+from app.services.clustering import FEATURE_WEIGHTS
+from benchmarks.clustering import synthetic_features
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "airflow", "plugins"))
+from silhouette_scoring import score_silhouette  # noqa: E402
+
+
+def _estimate(X, labels, method: str, sample_size: int) -> Dict[str, Any]:
+    estimate = score_silhouette(X, labels, method=method, sample_size=sample_size)
+    return {
+        "score": estimate.score,
+        "lower": estimate.lower,
+        "upper": estimate.upper,
+        "rows_scored": estimate.n_scored,
+        "seconds": estimate.seconds,
+    }
+
+
+def run(row_counts: List[int] = (10000, 50000), sample_size: int = 10000, n_clusters: int = 3,
+        sklearn_max_rows: int = 20000) -> Dict[str, Any]:
+    report: Dict[str, Any] = {"sample_size": sample_size, "clusters": n_clusters, "datasets": []}
+    for rows in row_counts:
+        X = MinMaxScaler().fit_transform(synthetic_features(rows, seed=rows)) * FEATURE_WEIGHTS
+        labels = KMeans(n_clusters=n_clusters, n_init=1, random_state=0).fit_predict(X)
+        result: Dict[str, Any] = {"rows": rows}
+        if rows <= sklearn_max_rows:
+            started = time.perf_counter()
+            result["sklearn"] = {"score": float(silhouette_score(X, labels)), "seconds": time.perf_counter() - started}
+        for method in ("exact", "sampled", "centroid"):
+            result[method] = _estimate(X, labels, method, sample_size)
+        reference = result.get("sklearn", result["exact"])["score"]
+        for method in ("exact", "sampled", "centroid"):
+            result[method]["error"] = result[method]["score"] - reference
+        # The tolerance absorbs float32 rounding when the sample is the whole set
+        result["sampled"]["interval_covers_reference"] = (
+            result["sampled"]["lower"] - 1e-6 <= reference <= result["sampled"]["upper"] + 1e-6
+        )
+        report["datasets"].append(result)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark silhouette estimators")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--sample-size", type=int, default=10000)
+    parser.add_argument("--clusters", type=int, default=3)
+    parser.add_argument("--sklearn-max-rows", type=int, default=20000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.rows, args.sample_size, args.clusters, args.sklearn_max_rows), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Synthetic inputs shared by the benchmarks.
+``write_text_pdf`` writes a valid multi-page PDF with real text content
+streams, so extraction cost scales like a scanned-free student report without
+needing a PDF authoring library.
+"""
+
+import random
+from typing import List
+
+WORDS = (
+    "analysis data model result method student report system design process value "
+    "table figure research experiment network learning function sample average error"
+).split()
+
+
+def sentences(count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 16))).capitalize() + "."
+        for _ in range(count)
+    ]
+
+
+def write_text_pdf(path: str, pages: int, lines_per_page: int = 40, seed: int = 0) -> int:
+    """
+    Write a text PDF with ``pages`` pages of sentences.
+
+    Args:
+        path: Output file
+        pages: Number of pages
+        lines_per_page: Text lines per page
+        seed: Seed for the generated text
+
+    Returns:
+        Size of the file in bytes
+    """
+    lines = sentences(pages * lines_per_page, seed)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        text = lines[page * lines_per_page:(page + 1) * lines_per_page]
+        body = "BT /F1 10 Tf 12 TL 50 780 Td " + " ".join(
+            "(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") '" for line in text
+        ) + " ET"
+        stream = body.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % kid for kid in kids), pages
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, obj)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+    return len(out)
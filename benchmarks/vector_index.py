@@ -0,0 +1,97 @@
+"""
+Plagiarism search benchmark: in-memory folder index against the old table scan.
+The old /upload path selected every earlier document of the folder, parsed
+each JSON embedding into a list of floats and ran sklearn cosine_similarity
+against it. This script replays that work on synthetic rows (without the
+network time of the select) and compares it with FolderIndex queries, exact
+and, when hnswlib is installed, HNSW.
+
+    python -m benchmarks.vector_index --documents 10000
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+from sklearn.metrics.pairwise import cosine_similarity
+
+from app.services.vector_index import FolderIndex, hnswlib
+
+
+def legacy_query(rows: List[Dict[str, Any]], vector: List[float], k: int = 2) -> List[str]:
+    """Top-k the way upload_file did before the index existed."""
+    previous = [[float(x) for x in json.loads(row["embedding"])] for row in rows]
+    similarities = cosine_similarity(np.array([vector]), np.array(previous))[0]
+    top = sorted(zip((row["id"] for row in rows), similarities), key=lambda pair: pair[1], reverse=True)[:k]
+    return [doc_id for doc_id, _ in top]
+
+
+def _latency(fn, repeats: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return {
+        "p50_ms": float(np.percentile(timings, 50) * 1000),
+        "p95_ms": float(np.percentile(timings, 95) * 1000),
+    }
+
+
+def run(documents: int = 10000, dim: int = 1024, queries: int = 50, legacy_queries: int = 3,
+        seed: int = 0) -> Dict[str, Any]:
+    rng = np.random.default_rng(seed)
+    matrix = rng.normal(size=(documents, dim)).astype(np.float32)
+    rows = [{"id": f"doc-{i}", "embedding": json.dumps(vector.tolist())} for i, vector in enumerate(matrix)]
+    probes = matrix[rng.integers(0, documents, size=queries)] + rng.normal(scale=0.1, size=(queries, dim))
+
+    started = time.perf_counter()
+    index = FolderIndex(hnsw_threshold=documents + 1)
+    for i, vector in enumerate(matrix):
+        index.upsert(f"doc-{i}", f"student-{i}", None, vector)
+    build_seconds = time.perf_counter() - started
+
+    expected = [legacy_query(rows, probe.tolist()) for probe in probes[:legacy_queries]]
+    found = [[match.doc_id for match in index.query(probe, k=2)] for probe in probes[:legacy_queries]]
+    probe_iter = iter(np.tile(probes, (2, 1)))
+
+    report: Dict[str, Any] = {
+        "documents": documents,
+        "dim": dim,
+        "legacy_scan": _latency(lambda: legacy_query(rows, next(probe_iter).tolist()), legacy_queries),
+        "index_build_seconds": build_seconds,
+        "index_exact": _latency(lambda: index.query(next(probe_iter), k=2), queries),
+        "index_matches_legacy": found == expected,
+    }
+
+    if hnswlib is not None:
+        index.hnsw_threshold = 0
+        started = time.perf_counter()
+        index.query(probes[0], k=2)
+        report["hnsw_build_seconds"] = time.perf_counter() - started
+        exact = FolderIndex(hnsw_threshold=documents + 1)
+        for i, vector in enumerate(matrix):
+            exact.upsert(f"doc-{i}", f"student-{i}", None, vector)
+        recall = np.mean([
+            index.query(probe, k=1)[0].doc_id == exact.query(probe, k=1)[0].doc_id for probe in probes
+        ])
+        probe_iter = iter(probes)
+        report["index_hnsw"] = _latency(lambda: index.query(next(probe_iter), k=2), queries)
+        report["hnsw_recall_at_1"] = float(recall)
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the folder vector index against the legacy scan")
+    parser.add_argument("--documents", type=int, default=10000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--legacy-queries", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.documents, args.dim, args.queries, args.legacy_queries), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+"""
+The DAG imports its helpers from airflow/plugins, which Airflow puts on
+sys.path; do the same so the plugin modules can be tested without Airflow.
+"""
+
+import os
+import sys
+
+PLUGINS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "airflow", "plugins")
+sys.path.insert(0, os.path.abspath(PLUGINS_DIR))
@@ -0,0 +1,128 @@
+import json
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from incremental_extract import fetch_documents, merge_snapshot, read_snapshot, update_snapshot
+from tests.fakes import FakeSupabase, parse_logic_filter
+
+COLUMNS = ["id", "uploadedDate", "plagiarism"]
+START = datetime(2026, 3, 1)
+
+
+def _doc(doc_id, uploaded, plagiarism=None):
+    return {"id": doc_id, "uploadedDate": uploaded, "plagiarism": plagiarism}
+
+
+def _at(hours):
+    return (pd.Timestamp(START, tz="UTC") + pd.Timedelta(hours=hours)).isoformat()
+
+
+def _record_filters(db):
+    filters = []
+    db.hooks.append(lambda query: filters.extend(query.logic_filters))
+    return filters
+
+
+def _extract(db, snapshot_dir, days, **kwargs):
+    kwargs.setdefault("page_size", 2)
+    return update_snapshot(db, str(snapshot_dir), COLUMNS, now=START + timedelta(days=days), **kwargs)
+
+
+def test_pages_do_not_skip_rows_that_share_a_watermark():
+    tied = "2026-03-01T10:00:00.250000+00:00"
+    docs = [_doc(f"d{i}", tied) for i in range(5)] + [_doc("e0", _at(11)), _doc("e1", None)]
+    db = FakeSupabase({"documents": docs})
+    recorded_filters = _record_filters(db)
+
+    pages = list(fetch_documents(db, COLUMNS, "uploadedDate", None, 2))
+
+    assert [[row["id"] for row in page] for page in pages] == [["d0", "d1"], ["d2", "d3"], ["d4", "e0"]]
+    # Timestamps carry reserved characters, so the cursor values are quoted
+    assert recorded_filters[0] == (
+        f'uploadedDate.gt."{tied}",and(uploadedDate.eq."{tied}",id.gt."d1")'
+    )
+
+
+def test_cursor_quoting_keeps_reserved_characters_in_values():
+    docs = [_doc("a,1", _at(1)), _doc("a,2", _at(1)), _doc("b(3)", _at(1))]
+    db = FakeSupabase({"documents": docs})
+    recorded_filters = _record_filters(db)
+
+    pages = list(fetch_documents(db, COLUMNS, "uploadedDate", None, 1))
+
+    assert [page[0]["id"] for page in pages] == ["a,1", "a,2", "b(3)"]
+    assert recorded_filters[0].endswith('id.gt."a,1")')
+    with pytest.raises(ValueError, match="Unquoted"):
+        parse_logic_filter(f"uploadedDate.gt.{_at(1)}")
+
+
+def test_a_delta_is_merged_over_existing_partitions(tmp_path):
+    base = pd.DataFrame({"id": [f"d{i}" for i in range(6)], "score": range(6)})
+    assert merge_snapshot(str(tmp_path), base, full_refresh=True, partitions=4) == len(list(tmp_path.glob("part-*")))
+
+    delta = pd.DataFrame({"id": ["d2", "d9"], "score": [20, 9]})
+    written = merge_snapshot(str(tmp_path), delta, full_refresh=False, partitions=4)
+
+    snapshot = read_snapshot(str(tmp_path), ["id", "score"]).set_index("id")["score"].to_dict()
+    assert snapshot == {"d0": 0, "d1": 1, "d2": 20, "d3": 3, "d4": 4, "d5": 5, "d9": 9}
+    assert 1 <= written <= 2
+
+    # A full refresh keeps only what it read
+    merge_snapshot(str(tmp_path), delta, full_refresh=True, partitions=4)
+    assert sorted(read_snapshot(str(tmp_path), ["id", "score"])["id"]) == ["d2", "d9"]
+
+
+def test_incremental_runs_reread_the_lookback_window(tmp_path):
+    db = FakeSupabase({"documents": [_doc("a", _at(0), {"x": 0.4}), _doc("b", _at(5))]})
+    df, stats = _extract(db, tmp_path, 0)
+    assert stats["full_refresh"] and stats["rows_transferred"] == 2
+    assert json.loads(df.set_index("id").loc["a", "plagiarism"]) == {"x": 0.4}
+    assert df.set_index("id").loc["a", "max_similarity"] == pytest.approx(0.4)
+
+    # A late row inside the lookback window, one outside it, and one new row
+    db.tables["documents"] += [_doc("late", _at(-12)), _doc("too-late", _at(-30)), _doc("c", _at(30))]
+    df, stats = _extract(db, tmp_path, 1)
+
+    assert not stats["full_refresh"]
+    assert stats["since"] == _at(5 - 24)
+    assert stats["rows_transferred"] == 4  # late, a, b, c
+    assert sorted(df["id"]) == ["a", "b", "c", "late"]
+
+    _, stats = _extract(db, tmp_path, 2)
+    assert stats["since"] == _at(30 - 24)
+
+
+def test_deleted_rows_stay_until_the_weekly_full_refresh(tmp_path):
+    db = FakeSupabase({"documents": [_doc("a", _at(0)), _doc("b", _at(1))]})
+    _extract(db, tmp_path, 0)
+    db.tables["documents"] = [_doc("b", _at(1))]
+
+    df, stats = _extract(db, tmp_path, 7)
+    assert not stats["full_refresh"]
+    assert sorted(df["id"]) == ["a", "b"]
+
+    df, stats = _extract(db, tmp_path, 7.5)
+    assert stats["full_refresh"] and stats["since"] is None
+    assert sorted(df["id"]) == ["b"]
+
+    # The interval restarts from the last full refresh
+    _, stats = _extract(db, tmp_path, 14)
+    assert not stats["full_refresh"]
+
+
+def test_changing_the_watermark_column_forces_a_full_refresh(tmp_path):
+    docs = [dict(_doc("a", _at(0)), updatedAt=_at(2)), dict(_doc("b", _at(1)), updatedAt=_at(3))]
+    db = FakeSupabase({"documents": docs})
+    _extract(db, tmp_path, 0)
+
+    columns = COLUMNS + ["updatedAt"]
+    df, stats = update_snapshot(db, str(tmp_path), columns, watermark_column="updatedAt",
+                                page_size=2, now=START + timedelta(days=1))
+
+    assert stats["full_refresh"] and stats["rows_transferred"] == 2
+    assert sorted(df["updatedAt"]) == [_at(2), _at(3)]
+    state = json.loads((tmp_path / "_state.json").read_text())
+    assert state["watermark_column"] == "updatedAt"
+    assert pd.Timestamp(state["watermark"]) == pd.Timestamp(_at(3))
@@ -0,0 +1,43 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pytest
+from sklearn.datasets import make_blobs
+
+optuna_search = pytest.importorskip("optuna_search")
+
+
+def _features(tmp_path):
+    X, _ = make_blobs(n_samples=300, centers=3, n_features=4, random_state=0)
+    frame = pd.DataFrame(X, columns=['sentences', 'page', 'timing', 'plagiarism'])
+    path = str(tmp_path / "features.arrow")
+    feather.write_feather(pa.Table.from_pandas(frame, preserve_index=False), path, compression='uncompressed')
+    return path, frame
+
+
+def test_split_trials_covers_every_trial():
+    assert optuna_search.split_trials(10, 4) == [3, 3, 2, 2]
+    assert optuna_search.split_trials(2, 8) == [1, 1]
+    assert optuna_search.split_trials(5, 0) == [5]
+
+
+@pytest.mark.parametrize("n_workers", [1, 2])
+def test_run_studies_runs_every_trial(tmp_path, n_workers):
+    path, frame = _features(tmp_path)
+    studies, stats = optuna_search.run_studies(path, frame, 4, n_workers, str(tmp_path))
+
+    assert set(studies) == set(optuna_search.OPTUNA_OBJECTIVES)
+    for study in studies.values():
+        assert len(study.trials) == 4
+        assert all(trial.state.is_finished() for trial in study.trials)
+        assert study.best_value > 0.5
+    assert stats['optuna_workers'] == n_workers
+    assert stats['optuna_trials'] == 12
+    assert stats['optuna_speedup_estimate'] > 0
+
+
+def test_a_retry_starts_a_fresh_search(tmp_path):
+    path, frame = _features(tmp_path)
+    optuna_search.run_studies(path, frame, 2, 1, str(tmp_path))
+    studies, _ = optuna_search.run_studies(path, frame, 2, 1, str(tmp_path))
+    assert all(len(study.trials) == 2 for study in studies.values())
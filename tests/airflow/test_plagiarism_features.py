@@ -0,0 +1,55 @@
+import json
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from plagiarism_features import max_similarity
+
+
+@pytest.mark.parametrize("payload, expected", [
+    (None, 0.0),
+    (np.nan, 0.0),
+    ("", 0.0),
+    ("{}", 0.0),
+    ("[]", 0.0),
+    ("null", 0.0),
+    ('{"Ann": 0.42}', 0.42),
+    ('{"Doe, Jane": 0.8, "Bob": 0.3}', 0.8),
+    ('{"a: b": 0.55, "c": 0.1}', 0.55),
+    ('{"say \\"hi\\"": 0.6}', 0.6),
+    ("{'Ann': 0.9, 'Bob': 0.2}", 0.9),
+    ('[{"A": 0.2}, {"B": 0.7}]', 0.7),
+    ('{"A": -0.5}', 0.0),
+    ('{"A": 1e-2, "B": 5E-3}', 0.01),
+    ('{"A": 1, "B": 0.25}', 1.0),
+    ('{"A": 0.4, "B"', 0.4),
+    ("not a payload", 0.0),
+])
+def test_edge_case_payloads(payload, expected):
+    assert max_similarity(pd.Series([payload], dtype=object)).iloc[0] == pytest.approx(expected)
+
+
+def test_keeps_the_index_and_handles_empty_input():
+    payloads = pd.Series(['{"A": 0.3}', None, '{"B": 0.9}'], index=[10, 20, 30])
+    result = max_similarity(payloads)
+    assert list(result.index) == [10, 20, 30]
+    assert result.tolist() == pytest.approx([0.3, 0.0, 0.9])
+    assert max_similarity(pd.Series([], dtype=object)).empty
+
+
+def test_matches_json_parsing_on_random_payloads():
+    rng = random.Random(0)
+    alphabet = "abc XYZ,:;-'éü"
+    payloads, expected = [], []
+    for _ in range(2000):
+        scores = {
+            "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 12))) + str(i): round(rng.uniform(-0.1, 1), 4)
+            for i in range(rng.randint(0, 5))
+        }
+        payloads.append(json.dumps(scores, ensure_ascii=rng.random() < 0.5))
+        expected.append(max([0.0, *scores.values()]))
+
+    result = max_similarity(pd.Series(payloads))
+    np.testing.assert_allclose(result.to_numpy(), expected)
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+from sklearn.datasets import make_blobs
+from sklearn.metrics import silhouette_samples, silhouette_score
+from sklearn.preprocessing import MinMaxScaler
+
+from silhouette_scoring import (
+    centroid_silhouette_samples,
+    sampled_silhouette,
+    score_silhouette,
+    silhouette_samples_chunked,
+    stratified_sample,
+)
+
+
+def _blobs(n=400, centers=4, seed=0):
+    """Overlapping blobs, min-max scaled like the pipeline's features."""
+    X, labels = make_blobs(n_samples=n, centers=centers, n_features=4, cluster_std=2.0, random_state=seed)
+    return MinMaxScaler().fit_transform(X), labels
+
+
+def _reference_centroid_silhouette(X, labels):
+    clusters = np.unique(labels)
+    centroids = np.array([X[labels == c].mean(axis=0) for c in clusters])
+    values = []
+    for x, label in zip(X, labels):
+        distances = np.linalg.norm(centroids - x, axis=1)
+        own = int(np.flatnonzero(clusters == label)[0])
+        a, b = distances[own], np.delete(distances, own).min()
+        values.append((b - a) / max(a, b) if max(a, b) > 0 else 0.0)
+    return np.array(values)
+
+
+@pytest.mark.parametrize("working_memory_mb", [256, 0.01])
+def test_chunked_matches_sklearn(working_memory_mb):
+    X, labels = _blobs()
+    values = silhouette_samples_chunked(X, labels, working_memory_mb)
+    np.testing.assert_allclose(values, silhouette_samples(X, labels), atol=1e-5)
+
+
+def test_chunked_handles_singletons_and_arbitrary_labels():
+    X, labels = _blobs(n=60, centers=3)
+    labels = np.where(labels == 2, 17, labels)
+    labels[0] = -5  # a singleton cluster scores 0, as in sklearn
+    values = silhouette_samples_chunked(X, labels)
+    # Distances to the singleton are not averaged, so float32 rounding shows more
+    np.testing.assert_allclose(values, silhouette_samples(X, labels), atol=1e-4)
+    assert values[0] == 0.0
+
+
+def test_centroid_matches_reference_simplified_silhouette():
+    X, labels = _blobs()
+    np.testing.assert_allclose(
+        centroid_silhouette_samples(X, labels), _reference_centroid_silhouette(X, labels), atol=1e-12
+    )
+
+
+def test_stratified_sample_keeps_every_cluster():
+    labels = np.array([0] * 990 + [1] * 8 + [2] * 2)
+    index = stratified_sample(labels, np.bincount(labels), 100, random_state=0)
+    assert len(np.unique(index)) == len(index)
+    assert np.bincount(labels[index]).tolist() == [99, 2, 2]
+
+
+def test_sampled_interval_covers_the_exact_score():
+    X, labels = _blobs(n=3000, centers=3, seed=1)
+    exact = silhouette_score(X, labels)
+    score, lower, upper, n_scored = sampled_silhouette(X, labels, sample_size=500)
+    assert lower <= exact <= upper
+    assert abs(score - exact) < 0.02
+    assert 500 <= n_scored < 510
+
+
+def test_sampled_scores_everything_when_the_sample_is_the_data():
+    X, labels = _blobs(n=200)
+    score, lower, upper, n_scored = sampled_silhouette(X, labels, sample_size=1000)
+    assert score == lower == upper == pytest.approx(silhouette_score(X, labels), abs=1e-5)
+    assert n_scored == 200
+
+
+def test_score_silhouette_methods():
+    X, labels = _blobs()
+    exact = score_silhouette(X, labels, method='exact')
+    assert exact.score == pytest.approx(silhouette_score(X, labels), abs=1e-5)
+    assert (exact.method, exact.n_scored) == ('exact', 400)
+
+    fallback = score_silhouette(X, labels, method='exact', sample_size=100, exact_max_rows=300)
+    assert fallback.method == 'sampled'
+    assert fallback.lower <= fallback.score <= fallback.upper
+
+    assert score_silhouette(X, labels, method='centroid').method == 'centroid'
+    with pytest.raises(ValueError, match="Unknown silhouette method"):
+        score_silhouette(X, labels, method='approximate')
+    with pytest.raises(ValueError, match="at least 2 clusters"):
+        score_silhouette(X, np.zeros(len(X)))
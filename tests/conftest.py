@@ -0,0 +1,19 @@
+"""
+Shared test fixtures.
+Settings require the service credentials at import time, so placeholders are
+set before any ``app`` module is imported.
+"""
+
+import os
+
+import pytest
+
+from tests.fakes import FakeSupabase
+
+for name in ("SUPABASE_URL", "SUPABASE_KEY", "PINECONE_API_KEY", "GROQ_API_KEY"):
+    os.environ.setdefault(name, "test")
+
+
+@pytest.fixture
+def fake_supabase():
+    return FakeSupabase()
@@ -0,0 +1,286 @@
+"""
+In-memory test doubles for external services.
+``FakeSupabase`` stands in for the PostgREST query builder and covers the
+calls the services make. ``StubChatModel`` is a LangChain chat model with a
+configurable latency per prompt, used instead of Groq. ``StubTokenizer`` and
+``StubEncoderSession`` stand in for the e5 tokenizer and ONNX export.
+"""
+
+import asyncio
+import time
+import zlib
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import numpy as np
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+COMPARISONS = {
+    "eq": lambda a, b: a == b,
+    "gt": lambda a, b: a > b,
+    "gte": lambda a, b: a >= b,
+    "lt": lambda a, b: a < b,
+    "lte": lambda a, b: a <= b,
+}
+
+
+def _split_top_level(expression: str) -> List[str]:
+    terms, current, depth, quoted = [], "", 0, False
+    for char in expression:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char in "()":
+            depth += 1 if char == "(" else -1
+        if char == "," and depth == 0 and not quoted:
+            terms.append(current)
+            current = ""
+        else:
+            current += char
+    terms.append(current)
+    return terms
+
+
+def parse_logic_filter(expression: str):
+    """
+    Predicates of a PostgREST logic filter such as ``a.gt."x",and(a.eq."x",id.gt."y")``.
+
+    Values containing reserved characters must be double-quoted, as PostgREST
+    requires; an unquoted one raises ValueError. Values compare as strings.
+    """
+    predicates = []
+    for term in _split_top_level(expression):
+        if term.startswith(("and(", "or(")) and term.endswith(")"):
+            combine = all if term.startswith("and(") else any
+            parts = parse_logic_filter(term[term.index("(") + 1:-1])
+            predicates.append(lambda row, parts=parts, combine=combine: combine(p(row) for p in parts))
+            continue
+        column, op, value = term.split(".", 2)
+        if len(value) >= 2 and value[0] == value[-1] == '"':
+            value = value[1:-1]
+        elif any(char in value for char in ',.:()"'):
+            raise ValueError(f"Unquoted reserved character in filter value: {term}")
+        compare = COMPARISONS[op]
+        predicates.append(
+            lambda row, column=column, compare=compare, value=value:
+            row.get(column) is not None and compare(str(row[column]), value)
+        )
+    return predicates
+
+
+class FakeQuery:
+    """One chained query against a FakeSupabase table."""
+
+    def __init__(self, db: "FakeSupabase", table: str):
+        self.db = db
+        self.table_name = table
+        self.filters = []
+        self.columns = None
+        self.action = "select"
+        self.payload: Any = None
+        self.window = None
+        self.order_by: List[str] = []
+        self.logic_filters: List[str] = []
+        self._negate = False
+
+    @property
+    def not_(self) -> "FakeQuery":
+        self._negate = True
+        return self
+
+    def _filter(self, predicate) -> "FakeQuery":
+        negate, self._negate = self._negate, False
+        self.filters.append((lambda row: not predicate(row)) if negate else predicate)
+        return self
+
+    def select(self, *columns: str) -> "FakeQuery":
+        self.columns = [c.strip() for column in columns for c in column.split(",")]
+        return self
+
+    def update(self, values: Dict[str, Any]) -> "FakeQuery":
+        self.action, self.payload = "update", values
+        return self
+
+    def upsert(self, rows: List[Dict[str, Any]], **kwargs: Any) -> "FakeQuery":
+        self.action, self.payload = "upsert", rows
+        return self
+
+    def eq(self, column: str, value: Any) -> "FakeQuery":
+        return self._filter(lambda row: row.get(column) == value)
+
+    def gt(self, column: str, value: Any) -> "FakeQuery":
+        return self._filter(lambda row: row.get(column) is not None and row[column] > value)
+
+    def gte(self, column: str, value: Any) -> "FakeQuery":
+        return self._filter(lambda row: row.get(column) is not None and row[column] >= value)
+
+    def or_(self, filters: str) -> "FakeQuery":
+        self.logic_filters.append(filters)
+        predicates = parse_logic_filter(filters)
+        return self._filter(lambda row: any(predicate(row) for predicate in predicates))
+
+    def in_(self, column: str, values: List[Any]) -> "FakeQuery":
+        return self._filter(lambda row: row.get(column) in set(values))
+
+    def is_(self, column: str, value: str) -> "FakeQuery":
+        return self._filter(lambda row: row.get(column) is None)
+
+    def order(self, column: str) -> "FakeQuery":
+        self.order_by.append(column)
+        return self
+
+    def range(self, start: int, stop: int) -> "FakeQuery":
+        self.window = (start, stop + 1)
+        return self
+
+    def limit(self, count: int) -> "FakeQuery":
+        self.window = (0, count)
+        return self
+
+    def execute(self) -> SimpleNamespace:
+        self.db.calls.append((self.table_name, self.action))
+        if self.db.fail_on == self.action:
+            raise RuntimeError(f"{self.action} failed")
+        rows = self.db.tables.setdefault(self.table_name, [])
+        if self.action == "upsert":
+            ids = [row["id"] for row in self.payload]
+            if len(ids) != len(set(ids)):
+                raise RuntimeError("ON CONFLICT DO UPDATE command cannot affect row a second time")
+            for new in self.payload:
+                existing = next((row for row in rows if row["id"] == new["id"]), None)
+                if existing is None:
+                    rows.append(dict(new))
+                else:
+                    existing.update(new)
+            return SimpleNamespace(data=[dict(row) for row in self.payload])
+
+        matched = [row for row in rows if all(f(row) for f in self.filters)]
+        if self.action == "update":
+            for row in matched:
+                row.update(self.payload)
+            return SimpleNamespace(data=[dict(row) for row in matched])
+        if self.order_by:
+            matched = sorted(matched, key=lambda row: tuple(row[column] for column in self.order_by))
+        if self.window:
+            matched = matched[self.window[0]:self.window[1]]
+        if self.columns and self.columns != ["*"]:
+            matched = [{c: row.get(c) for c in self.columns} for row in matched]
+        self.db.after_execute(self)
+        return SimpleNamespace(data=[dict(row) for row in matched])
+
+
+class FakeSupabase:
+    """In-memory tables reachable through ``table(name)`` like the Supabase client."""
+
+    def __init__(self, tables: Dict[str, List[Dict[str, Any]]] = None):
+        self.tables = tables or {}
+        self.calls = []
+        self.fail_on = None
+        self.hooks = []
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def after_execute(self, query: FakeQuery) -> None:
+        for hook in list(self.hooks):
+            hook(query)
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Chat model that sleeps instead of calling an API.
+
+    ``latencies`` maps a prompt prefix to the seconds the call takes; the
+    reply echoes the first line of the prompt. When streamed, the reply is
+    emitted word by word, ``token_delay`` seconds apart, after the latency.
+    """
+
+    latencies: Dict[str, float] = {}
+    default_latency: float = 0.0
+    token_delay: float = 0.0
+    prompts: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _latency(self, prompt: str) -> float:
+        return next(
+            (seconds for prefix, seconds in self.latencies.items() if prompt.startswith(prefix)),
+            self.default_latency,
+        )
+
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        prompt = str(messages[-1].content)
+        self.prompts.append(prompt)
+        return f"reply to {prompt.splitlines()[0]}"
+
+    def _result(self, reply: str, prompt: str) -> ChatResult:
+        usage = {"input_tokens": len(prompt.split()), "output_tokens": len(reply.split()),
+                 "total_tokens": len(prompt.split()) + len(reply.split())}
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=reply, usage_metadata=usage))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        reply = self._reply(messages)
+        time.sleep(self._latency(str(messages[-1].content)))
+        return self._result(reply, str(messages[-1].content))
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        reply = self._reply(messages)
+        await asyncio.sleep(self._latency(str(messages[-1].content)))
+        return self._result(reply, str(messages[-1].content))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        reply = self._reply(messages)
+        await asyncio.sleep(self._latency(str(messages[-1].content)))
+        words = reply.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(self.token_delay)
+            token = word if i == len(words) - 1 else word + " "
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager is not None:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+class StubTokenizer:
+    """Whitespace tokenizer with stable word ids, shaped like ``tokenizers.Tokenizer``."""
+
+    def __init__(self, vocab_size: int = 30000, max_length: int = 512):
+        self.vocab_size = vocab_size
+        self.max_length = max_length
+
+    def encode_batch(self, texts: List[str]) -> List[SimpleNamespace]:
+        return [
+            SimpleNamespace(ids=[zlib.crc32(word.encode()) % self.vocab_size for word in text.split()][:self.max_length])
+            for text in texts
+        ]
+
+
+class StubEncoderSession:
+    """
+    Stand-in for the ONNX export: a token embedding followed by one dense layer.
+
+    Its cost grows with the padded (batch, length) input like the real model's;
+    the shape of every call is recorded in ``batch_shapes``.
+    """
+
+    def __init__(self, dim: int = 64, vocab_size: int = 30000, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.embedding = rng.standard_normal((vocab_size, dim)).astype(np.float32)
+        self.weight = (rng.standard_normal((dim, dim)) / np.sqrt(dim)).astype(np.float32)
+        self.batch_shapes = []
+
+    def get_inputs(self) -> List[SimpleNamespace]:
+        return [SimpleNamespace(name="input_ids"), SimpleNamespace(name="attention_mask")]
+
+    def run(self, output_names: Any, feeds: Dict[str, np.ndarray]) -> List[np.ndarray]:
+        input_ids = feeds["input_ids"]
+        self.batch_shapes.append(input_ids.shape)
+        return [np.tanh(self.embedding[input_ids] @ self.weight)]
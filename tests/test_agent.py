@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+from app.routers.agent import AssignmentRequest, build_workflow, initial_state
+from app.services.response_cache import ResponseCache
+from tests.fakes import StubChatModel
+
+PAYLOAD = AssignmentRequest(
+    title="Sorting algorithms",
+    description="Compare merge sort and quicksort.",
+    content="Merge sort splits the list in halves.",
+    persona="Be concise.",
+)
+
+
+def _stub(**kwargs):
+    return StubChatModel(latencies={
+        "Summarize": 0.3,
+        "Analyze the relevance": 0.3,
+        "You are an academic evaluator": 0.1,
+        "Personalize": 0.1,
+    }, **kwargs)
+
+
+async def test_branches_overlap_and_loop_stays_free():
+    workflow = build_workflow(_stub())
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticking = asyncio.ensure_future(ticker())
+    started = time.perf_counter()
+    result = await workflow.ainvoke(initial_state(PAYLOAD))
+    elapsed = time.perf_counter() - started
+    ticking.cancel()
+
+    # Critical path is 0.3 + 0.1 + 0.1; the serial sum would be 0.8
+    assert elapsed < 0.7
+    assert ticks > 20
+    assert result["combined_output"].startswith("🎓 Final Personalized Feedback:")
+    assert result["feedback_analysis"].startswith("reply to You are an academic evaluator")
+
+
+async def test_relevance_is_computed_once_per_folder():
+    model = StubChatModel(prompts=[])
+    workflow = build_workflow(model, ResponseCache())
+
+    for content in ("Merge sort splits the list in halves.", "Quicksort partitions around a pivot."):
+        payload = PAYLOAD.model_copy(update={"content": content})
+        result = await workflow.ainvoke(initial_state(payload))
+        assert result["relevance_analysis"] == "reply to Analyze the relevance between the following title and description of an assignment:"
+
+    assert sum(prompt.startswith("Analyze the relevance") for prompt in model.prompts) == 1
+    assert sum(prompt.startswith("Summarize") for prompt in model.prompts) == 2
@@ -0,0 +1,96 @@
+import json
+import time
+
+import httpx
+
+from app.routers import agent
+from app.routers.agent import build_workflow, initial_state, stream_workflow
+from app.services.llm_gateway import LLMGateway
+from tests.fakes import StubChatModel
+from tests.test_agent import PAYLOAD
+
+
+def _streaming_stub():
+    return StubChatModel(latencies={
+        "Summarize": 0.4,
+        "Analyze the relevance": 0.1,
+        "You are an academic evaluator": 0.2,
+        "Personalize": 0.2,
+    }, token_delay=0.005)
+
+
+def _parse_sse(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+async def test_nodes_are_emitted_as_they_finish_and_tokens_stream():
+    workflow = build_workflow(_streaming_stub())
+    started = time.perf_counter()
+    arrivals, events = [], []
+    async for event in stream_workflow(workflow, initial_state(PAYLOAD)):
+        arrivals.append(time.perf_counter() - started)
+        events.append(event)
+
+    nodes = [event["node"] for event in events if event["event"] == "node"]
+    assert nodes == ["relevance_agent", "summarizer_agent", "feedback_agent", "aggregator"]
+    # The first node arrives after its own latency, not after the whole pipeline (~0.8 s)
+    assert arrivals[0] < 0.3
+
+    tokens = [event["content"] for event in events if event["event"] == "token"]
+    assert len(tokens) > 1
+    done = events[-1]
+    assert done["event"] == "done"
+    assert "".join(tokens) == done["data"]["personalized_feedback"]
+    # Tokens come only from the personalization step, between feedback and aggregator
+    kinds = [event.get("node", event["event"]) for event in events]
+    assert kinds.index("feedback_agent") < kinds.index("token") < kinds.index("aggregator")
+
+
+async def test_feedback_stream_endpoint_sends_sse(monkeypatch):
+    monkeypatch.setattr(agent, "workflow", build_workflow(_streaming_stub()))
+    transport = httpx.ASGITransport(app=agent.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        async with client.stream("POST", "/feedback/stream", json=PAYLOAD.model_dump()) as response:
+            assert response.headers["content-type"].startswith("text/event-stream")
+            body = "".join([chunk async for chunk in response.aiter_text()])
+
+    events = _parse_sse(body)
+    assert events[0] == ("node", {"node": "relevance_agent", "data": {
+        "relevance_analysis": "reply to Analyze the relevance between the following title and description of an assignment:"
+    }})
+    assert events[-1][0] == "done"
+    assert set(events[-1][1]["data"]) == set(agent.AssignmentResponse.model_fields)
+
+
+async def test_feedback_stream_reports_errors_as_events(monkeypatch):
+    class FailingModel(StubChatModel):
+        async def _agenerate(self, *args, **kwargs):
+            raise RuntimeError("upstream down")
+
+        async def _astream(self, *args, **kwargs):
+            raise RuntimeError("upstream down")
+            yield
+
+    monkeypatch.setattr(agent, "workflow", build_workflow(FailingModel()))
+    transport = httpx.ASGITransport(app=agent.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.post("/feedback/stream", json=PAYLOAD.model_dump())
+
+    assert _parse_sse(response.text)[-1] == ("error", {"detail": "upstream down"})
+
+
+async def test_tokens_stream_through_the_gateway():
+    gateway = LLMGateway(requests_per_minute=6000, tokens_per_minute=1e9)
+    try:
+        workflow = build_workflow(_streaming_stub(), gateway=gateway)
+        events = [event async for event in stream_workflow(workflow, initial_state(PAYLOAD))]
+    finally:
+        await gateway.close()
+
+    tokens = [event["content"] for event in events if event["event"] == "token"]
+    assert len(tokens) > 1
+    assert "".join(tokens) == events[-1]["data"]["personalized_feedback"]
@@ -0,0 +1,163 @@
+import hashlib
+
+import numpy as np
+import pytest
+
+from app.services import batch_ingestion
+from app.services.batch_ingestion import BatchIngestionPipeline, duplicate_uuids
+from app.services.content_cache import ContentCache
+from app.services.executor import ExecutionLayer
+from app.services.ingestion import PdfSource, build_document
+from app.services.vector_index import VectorIndexRegistry
+from tests.fakes import FakeSupabase
+
+TEXTS = {
+    "a.pdf": "The quick brown fox jumps over the lazy dog. It was a sunny day.",
+    "b.pdf": "The quick brown fox jumps over the lazy dog. It was a sunny day.",
+    "c.pdf": "Completely different content about thermodynamics and entropy.",
+}
+
+
+class StubEmbeddings:
+    def embed_documents(self, texts):
+        vectors = []
+        for text in texts:
+            seed = int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)
+            vectors.append(np.random.default_rng(seed).normal(size=16).tolist())
+        return vectors
+
+
+class StubNer:
+    def batch_predict_entities(self, texts, labels):
+        return [[{"label": "Name", "text": f"student {len(text)}"}] for text in texts]
+
+
+@pytest.fixture
+def pipeline_factory(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        batch_ingestion, "download_pdf", lambda url: PdfSource(path=url, digest=url, size=1)
+    )
+    monkeypatch.setattr(
+        batch_ingestion, "parse_pdf", lambda path, *args: build_document([TEXTS[path]])
+    )
+    execution = ExecutionLayer(cpu_workers=1, cpu_queue=8, io_workers=2, io_queue=8)
+    cache = ContentCache(str(tmp_path / "cache.sqlite"))
+
+    def make(supabase):
+        return BatchIngestionPipeline(
+            execution=execution,
+            content_cache=cache,
+            embedding_model="stub",
+            embeddings=StubEmbeddings(),
+            ner_model=StubNer(),
+            supabase=supabase,
+            vector_index=VectorIndexRegistry(),
+            cluster_fn=lambda *args: 1.0,
+            embedding_dtype="float32",
+        )
+
+    yield make
+    execution.shutdown()
+    cache.close()
+
+
+def _records():
+    return {"documents": [
+        {"id": "a", "folder": "F", "uploadedDate": "2024-01-01T00:00:00", "deadline": "2024-01-10T00:00:00"},
+        {"id": "b", "folder": "F", "uploadedDate": "2024-01-02T00:00:00", "deadline": "2024-01-10T00:00:00"},
+        {"id": "c", "folder": "F", "uploadedDate": "2024-01-03T00:00:00", "deadline": "2024-01-10T00:00:00"},
+    ]}
+
+
+async def _collect(pipeline, pairs):
+    return [event async for event in pipeline.run(pairs)]
+
+
+def _pairs(*ids):
+    return [{"uuid": doc_id, "file_url": f"{doc_id}.pdf"} for doc_id in ids]
+
+
+async def test_later_items_see_earlier_items_and_index_updates_after_write(pipeline_factory):
+    supabase = FakeSupabase(_records())
+    pipeline = pipeline_factory(supabase)
+
+    events = await _collect(pipeline, _pairs("c", "b", "a"))
+
+    completed = {event["uuid"]: event for event in events if event["status"] == "completed"}
+    assert set(completed) == {"a", "b", "c"}
+    assert completed["a"]["plagiarism_results"] == {}
+    assert completed["b"]["plagiarism_results"][f"student {len(TEXTS['a.pdf'])}"] == pytest.approx(1.0, abs=1e-3)
+    assert sum(len(index) for index in pipeline.vector_index._folders.values()) == 3
+
+
+async def test_write_leaves_columns_it_did_not_compute_alone(pipeline_factory, monkeypatch):
+    supabase = FakeSupabase(_records())
+    pipeline = pipeline_factory(supabase)
+    fetch_documents = batch_ingestion.fetch_documents
+
+    def fetch_then_edit(*args):
+        records = fetch_documents(*args)
+        # Another writer renames the folder after the pipeline read the row
+        supabase.tables["documents"][0]["folder"] = "G"
+        return records
+
+    monkeypatch.setattr(batch_ingestion, "fetch_documents", fetch_then_edit)
+    events = await _collect(pipeline, _pairs("a"))
+
+    assert [event["status"] for event in events if event.get("uuid")][-1] == "completed"
+    row = supabase.tables["documents"][0]
+    assert row["folder"] == "G"
+    assert row["clustering"] == 1.0 and row["nameStudent"] == f"student {len(TEXTS['a.pdf'])}"
+
+
+async def test_failed_write_leaves_shared_index_untouched(pipeline_factory):
+    supabase = FakeSupabase(_records())
+    supabase.fail_on = "upsert"
+    pipeline = pipeline_factory(supabase)
+
+    events = await _collect(pipeline, _pairs("a", "b"))
+
+    assert {event["status"] for event in events if event.get("uuid")} >= {"failed"}
+    assert not any(event["status"] == "completed" for event in events)
+    assert sum(len(index) for index in pipeline.vector_index._folders.values()) == 0
+
+
+async def test_duplicate_uuids_are_rejected_before_any_work(pipeline_factory):
+    supabase = FakeSupabase(_records())
+    pipeline = pipeline_factory(supabase)
+
+    with pytest.raises(ValueError, match="a"):
+        await _collect(pipeline, _pairs("a", "b", "a"))
+    assert supabase.calls == []
+
+
+def test_duplicate_uuids_reports_each_repeated_id_once():
+    assert duplicate_uuids(_pairs("a", "b", "a", "c", "b", "a")) == ["a", "b"]
+    assert duplicate_uuids(_pairs("a", "b")) == []
+
+
+async def test_chunk_embeddings_column_is_only_written_when_enabled(pipeline_factory):
+    for enabled in (False, True):
+        supabase = FakeSupabase(_records())
+        pipeline = pipeline_factory(supabase)
+        pipeline.store_chunk_embeddings = enabled
+
+        await _collect(pipeline, _pairs("a"))
+
+        row = next(row for row in supabase.tables["documents"] if row["id"] == "a")
+        assert ("chunkEmbeddings" in row) is enabled
+
+
+async def test_chunk_scores_do_not_depend_on_the_content_cache(pipeline_factory):
+    runs, hits = [], []
+    for _ in range(2):  # the first run fills the cache, the second is served from it
+        pipeline = pipeline_factory(FakeSupabase(_records()))
+        pipeline.vector_index = VectorIndexRegistry(chunk_mode=True)
+        events = await _collect(pipeline, _pairs("a", "b", "c"))
+        runs.append({event["uuid"]: event for event in events if event["status"] == "completed"})
+        hits.append([event["cache_hit"] for event in events if event["status"] == "parsed"])
+
+    assert hits == [[False] * 3, [True] * 3]
+    for uuid in "abc":
+        assert runs[0][uuid]["plagiarism_results"] == runs[1][uuid]["plagiarism_results"]
+    assert runs[0]["c"]["plagiarism_results"]
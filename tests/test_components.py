@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core.components import ComponentRegistry
+from app.core.exceptions import ComponentNotReadyError
+
+
+async def _settle(registry):
+    while registry._tasks:
+        await asyncio.gather(*list(registry._tasks), return_exceptions=True)
+
+
+async def test_requests_get_503_until_the_component_is_ready():
+    release = threading.Event()
+    registry = ComponentRegistry()
+    registry.register("model", lambda: release.wait(5) and "model")
+    dependency = registry.require("model")
+
+    registry.start()
+    with pytest.raises(ComponentNotReadyError) as rejected:
+        await dependency()
+    assert rejected.value.status_code == 503
+    assert registry.status() == {"model": "loading"}
+
+    release.set()
+    await _settle(registry)
+    assert await dependency() is None
+    assert registry.get("model") == "model"
+    assert registry.status() == {"model": "ready"}
+
+
+async def test_a_failed_load_is_retried_by_the_next_request():
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("weights missing")
+        return "ner"
+
+    registry = ComponentRegistry()
+    registry.register("ner", flaky, eager=False)
+    dependency = registry.require("ner")
+
+    with pytest.raises(ComponentNotReadyError):
+        await dependency()
+    await _settle(registry)
+    assert registry.status() == {"ner": "error"}
+
+    with pytest.raises(ComponentNotReadyError):
+        await dependency()
+    await _settle(registry)
+    assert registry.status() == {"ner": "ready"}
+    assert len(attempts) == 2
+
+
+async def test_concurrent_requests_start_a_single_load():
+    calls = []
+
+    def slow():
+        calls.append(threading.get_ident())
+        time.sleep(0.2)
+        return "embeddings"
+
+    registry = ComponentRegistry()
+    registry.register("embeddings", slow, eager=False)
+    dependency = registry.require("embeddings")
+
+    results = await asyncio.gather(*(dependency() for _ in range(50)), return_exceptions=True)
+    assert all(isinstance(result, ComponentNotReadyError) for result in results)
+    # One task, not one per rejected request
+    assert len(registry._tasks) == 1
+    for _ in range(50):
+        with pytest.raises(ComponentNotReadyError):
+            await dependency()
+    assert len(registry._tasks) == 1
+
+    await _settle(registry)
+    assert len(calls) == 1
+    assert not registry._tasks
+    assert await dependency() is None
+
+
+async def test_stop_cancels_pending_loads():
+    registry = ComponentRegistry()
+    registry.register("slow", lambda: time.sleep(0.1) or "slow")
+    registry.start()
+    tasks = list(registry._tasks)
+    await registry.stop()
+    assert all(task.cancelled() for task in tasks)
+    assert not registry._tasks
@@ -0,0 +1,121 @@
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.services import content_cache
+from app.services.content_cache import CachedArtifacts, ContentCache
+
+
+@pytest.fixture
+def ordered_clock(monkeypatch):
+    # Distinct, increasing access times so LRU order does not depend on clock resolution
+    ticks = itertools.count(1)
+    monkeypatch.setattr(content_cache.time, "time", lambda: float(next(ticks)))
+
+
+@pytest.fixture
+def open_cache(tmp_path):
+    caches = []
+
+    def make(**kwargs):
+        cache = ContentCache(str(tmp_path / "cache.sqlite"), **kwargs)
+        caches.append(cache)
+        return cache
+
+    yield make
+    for cache in caches:
+        cache.close()
+
+
+def _metric(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def _disk_size(cache):
+    return cache._connection().execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+
+def _artifacts(n):
+    return CachedArtifacts(page_texts=[f"page {n}"], chunks=[f"chunk {n}"], embedding=[0.1 * n], entities={"Name": str(n)})
+
+
+def test_memory_tier_keeps_the_most_recently_used(open_cache):
+    cache = open_cache(memory_items=2)
+    cache.put_raw("ns", "a", 1)
+    cache.put_raw("ns", "b", 2)
+    assert cache.get_raw("ns", "a") == 1
+    cache.put_raw("ns", "c", 3)
+
+    assert list(cache._memory) == ["ns:a", "ns:c"]
+    disk_hits = _metric("content_cache_hits_total", namespace="ns", tier="disk")
+    assert cache.get_raw("ns", "b") == 2
+    assert _metric("content_cache_hits_total", namespace="ns", tier="disk") == disk_hits + 1
+    assert list(cache._memory) == ["ns:c", "ns:b"]
+
+
+def test_disk_tier_evicts_least_recently_accessed_down_to_the_budget(open_cache, ordered_clock):
+    cache = open_cache(memory_items=0)
+    cache.put_raw("ns", "a", "x" * 1000)
+    entry = _disk_size(cache)
+    cache.disk_max_bytes = int(entry * 2.5)
+    cache.put_raw("ns", "b", "y" * 1000)
+    assert cache.get_raw("ns", "a") is not None  # a is now more recent than b
+    cache.put_raw("ns", "c", "z" * 1000)
+
+    assert cache.get_raw("ns", "b") is None
+    assert cache.get_raw("ns", "a") is not None and cache.get_raw("ns", "c") is not None
+    assert cache._disk_bytes == _disk_size(cache) <= cache.disk_max_bytes
+
+
+def test_running_total_follows_replacements(open_cache):
+    cache = open_cache()
+    cache.put_raw("ns", "a", "x" * 1000)
+    cache.put_raw("ns", "a", "short")
+    cache.put_raw("ns", "b", [1, 2, 3])
+    assert cache._disk_bytes == _disk_size(cache)
+
+
+def test_entries_survive_reopening(open_cache):
+    cache = open_cache()
+    cache.put("digest", _artifacts(1))
+    cache.close()
+
+    reopened = open_cache()
+    assert reopened._disk_bytes == _disk_size(reopened) > 0
+    assert reopened.get("digest") == _artifacts(1)
+
+
+def test_hit_miss_and_bytes_saved_metrics(open_cache):
+    cache = open_cache()
+    before = {
+        "memory": _metric("content_cache_hits_total", namespace="documents", tier="memory"),
+        "miss": _metric("content_cache_misses_total", namespace="documents"),
+        "saved": _metric("content_cache_bytes_saved_total"),
+    }
+
+    assert cache.get("missing", source_size=500) is None
+    cache.put("digest", _artifacts(2))
+    assert cache.get("digest", source_size=1234) == _artifacts(2)
+
+    assert _metric("content_cache_misses_total", namespace="documents") == before["miss"] + 1
+    assert _metric("content_cache_hits_total", namespace="documents", tier="memory") == before["memory"] + 1
+    assert _metric("content_cache_bytes_saved_total") == before["saved"] + 1234
+
+
+def test_threads_read_and_write_concurrently(open_cache):
+    cache = open_cache(memory_items=4, disk_max_bytes=20000)
+
+    def work(worker):
+        for i in range(40):
+            key = f"{worker}-{i % 10}"
+            cache.put_raw("ns", key, {"worker": worker, "i": i, "pad": "p" * 200})
+            value = cache.get_raw("ns", key)
+            assert value is None or value["worker"] == worker
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(work, range(8)))
+
+    assert len(cache._connections) > 1
+    assert _disk_size(cache) <= cache.disk_max_bytes + 2000
@@ -0,0 +1,72 @@
+import json
+
+import numpy as np
+import pytest
+
+from app.migrations.backfill_embedding_codec import backfill
+from app.services.chunk_embeddings import decode_chunk_embeddings, encode_chunk_embeddings
+from app.services.embedding_codec import (
+    decode_embedding,
+    decode_matrix,
+    encode_embedding,
+    is_encoded,
+    storage_value,
+)
+from tests.fakes import FakeSupabase
+
+VECTOR = np.random.default_rng(0).normal(size=1024).astype(np.float32)
+
+
+@pytest.mark.parametrize("dtype, atol", [("float32", 0), ("float16", 1e-2), ("int8", 3e-2)])
+def test_round_trip(dtype, atol):
+    encoded = encode_embedding(VECTOR, dtype)
+    np.testing.assert_allclose(decode_embedding(encoded), VECTOR, atol=atol)
+
+
+def test_codec_value_is_plain_ascii_text():
+    encoded = encode_embedding(VECTOR, "float16")
+    # A text column stores it verbatim, and JSON carries it as one string without escaping
+    assert encoded.isascii() and encoded.isprintable()
+    assert json.loads(json.dumps(encoded)) == encoded
+    assert is_encoded(encoded)
+
+
+@pytest.mark.parametrize("legacy", [
+    VECTOR.tolist(),
+    json.dumps(VECTOR.tolist()),
+    # What vector::text produces in the 002 migration
+    "[" + ",".join(f"{x:.6g}" for x in VECTOR) + "]",
+])
+def test_legacy_values_stay_readable_after_the_text_migration(legacy):
+    np.testing.assert_allclose(decode_embedding(legacy), VECTOR, rtol=1e-5)
+
+
+def test_json_storage_writes_a_plain_list():
+    value = storage_value(VECTOR, "json")
+    assert isinstance(value, list) and len(value) == 1024
+    assert is_encoded(storage_value(VECTOR, "float16"))
+
+
+def test_chunk_matrices_use_the_codec_only():
+    matrix = np.random.default_rng(1).normal(size=(5, 16))
+    np.testing.assert_allclose(decode_chunk_embeddings(encode_chunk_embeddings(matrix)), matrix, atol=3e-2)
+    # The dict layout from before the codec is no longer read
+    assert decode_chunk_embeddings({"count": 1, "dim": 2, "dtype": "int8", "data": "AQI="}) is None
+
+
+def test_backfill_converts_legacy_rows_once():
+    supabase = FakeSupabase({"documents": [
+        {"id": "a", "embedding": VECTOR.tolist()},
+        {"id": "b", "embedding": "[" + ",".join(f"{x:.6g}" for x in VECTOR) + "]"},
+        {"id": "c", "embedding": encode_embedding(VECTOR, "float16")},
+        {"id": "d", "embedding": None},
+    ]})
+
+    stats = backfill(supabase, dtype="float16", page_size=2, workers=2)
+
+    assert (stats["scanned"], stats["converted"], stats["skipped"]) == (4, 2, 2)
+    rows = {row["id"]: row["embedding"] for row in supabase.tables["documents"]}
+    for doc_id in "abc":
+        assert is_encoded(rows[doc_id])
+        np.testing.assert_allclose(decode_matrix(rows[doc_id])[0], VECTOR, atol=1e-2)
+    assert backfill(supabase, dtype="float16")["converted"] == 0
@@ -0,0 +1,154 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from langchain_core.embeddings import Embeddings
+from pydantic import ValidationError
+
+from app.core.config import Settings
+from app.services.embeddings import DynamicBatcher, OnnxE5Embeddings, compare_backends
+from tests.fakes import StubEncoderSession, StubTokenizer
+
+
+def _echo(calls):
+    def fn(texts):
+        calls.append(list(texts))
+        return np.array([[float(text)] for text in texts])
+    return fn
+
+
+def _model(**kwargs):
+    return OnnxE5Embeddings(session=StubEncoderSession(), tokenizer=StubTokenizer(), **kwargs)
+
+
+class FixedEmbeddings(Embeddings):
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def embed_documents(self, texts):
+        return [self.vectors[text].tolist() for text in texts]
+
+    def embed_query(self, text):
+        return self.vectors[text].tolist()
+
+
+def test_concurrent_submits_are_merged_up_to_the_batch_size():
+    calls = []
+    batcher = DynamicBatcher(_echo(calls), max_batch_size=6, max_wait_ms=200)
+    barrier = threading.Barrier(4)
+
+    def submit(i):
+        barrier.wait()
+        return i, batcher.submit([str(i * 10 + j) for j in range(3)])
+
+    try:
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = list(pool.map(submit, range(4)))
+        for i, future in futures:
+            # Each caller gets back exactly its own rows, in order
+            assert future.result(timeout=5)[:, 0].tolist() == [i * 10 + j for j in range(3)]
+    finally:
+        batcher.close()
+    assert [len(call) for call in calls] == [6, 6]
+
+
+def test_a_lone_request_is_dispatched_after_the_wait():
+    calls = []
+    batcher = DynamicBatcher(_echo(calls), max_batch_size=32, max_wait_ms=10)
+    try:
+        assert batcher.submit(["1", "2"]).result(timeout=5)[:, 0].tolist() == [1.0, 2.0]
+        # A request larger than the batch size is not split
+        assert len(batcher.submit([str(i) for i in range(40)]).result(timeout=5)) == 40
+    finally:
+        batcher.close()
+    assert [len(call) for call in calls] == [2, 40]
+
+
+def test_an_error_reaches_every_merged_request():
+    attempts = []
+
+    def fail(texts):
+        attempts.append(len(texts))
+        if len(attempts) == 1:
+            raise ValueError("inference failed")
+        return np.zeros((len(texts), 1))
+
+    batcher = DynamicBatcher(fail, max_batch_size=32, max_wait_ms=200)
+    try:
+        futures = [batcher.submit(["a"]), batcher.submit(["b", "c"]), batcher.submit(["d"])]
+        for future in futures:
+            with pytest.raises(ValueError, match="inference failed"):
+                future.result(timeout=5)
+        # The worker survives the failure
+        assert batcher.submit(["e"]).result(timeout=5).shape == (1, 1)
+    finally:
+        batcher.close()
+    assert attempts == [4, 1]
+    with pytest.raises(RuntimeError, match="closed"):
+        batcher.submit(["f"])
+
+
+def test_sub_batches_respect_size_padding_and_token_budget():
+    model = _model(max_batch_size=4, max_batch_tokens=100, max_padding_ratio=1.25)
+    try:
+        assert model._sub_batches([10, 10, 10, 10, 10, 12, 30, 30, 50]) == [[0, 1, 2, 3], [4, 5], [6, 7], [8]]
+        assert model._sub_batches([40, 40, 40]) == [[0, 1], [2]]
+        assert model._sub_batches([]) == []
+    finally:
+        model.close()
+
+
+def test_inputs_carry_the_e5_prefixes():
+    model = _model()
+    seen = []
+    encode = model.batcher.fn
+    model.batcher.fn = lambda texts: seen.extend(texts) or encode(texts)
+    try:
+        model.embed_documents(["merge sort"])
+        model.embed_query("quicksort")
+    finally:
+        model.close()
+    assert seen == ["passage: merge sort", "query: quicksort"]
+
+
+def test_batched_vectors_match_one_at_a_time():
+    texts = ["short", "a somewhat longer passage about sorting", "mid length text here", "x " * 60]
+    model = _model(max_batch_size=2)
+    try:
+        batched = np.array(model.embed_documents(texts))
+        single = np.array([model.embed_documents([text])[0] for text in texts])
+    finally:
+        model.close()
+    # Padding is masked out of the pooling and rows come back in input order
+    np.testing.assert_allclose(batched, single, atol=1e-5)
+    np.testing.assert_allclose(np.linalg.norm(batched, axis=1), 1.0, atol=1e-5)
+    assert model.embed_documents([]) == []
+
+
+def test_compare_backends_reports_a_known_perturbation():
+    rng = np.random.default_rng(0)
+    texts = [f"text {i}" for i in range(20)]
+    reference = {text: rng.standard_normal(16) for text in texts}
+
+    # Scaling does not change a direction; negating one vector gives cosine -1
+    flipped = {text: vector * 3 for text, vector in reference.items()}
+    flipped[texts[0]] = -reference[texts[0]]
+    report = compare_backends(FixedEmbeddings(reference), FixedEmbeddings(flipped), texts)
+    assert report["texts"] == 20
+    assert report["cosine_min"] == pytest.approx(-1.0)
+    assert report["cosine_mean"] == pytest.approx(0.9)
+
+    noisy = {text: vector + rng.normal(0, 1e-3, 16) for text, vector in reference.items()}
+    report = compare_backends(FixedEmbeddings(reference), FixedEmbeddings(noisy), texts)
+    assert report["cosine_min"] > 0.999
+    assert report["nearest_neighbour_agreement"] == 1.0
+    assert report["candidate_seconds"] >= 0 and report["reference_seconds"] >= 0
+
+
+def test_pinecone_key_is_only_required_by_the_pinecone_backend(monkeypatch):
+    monkeypatch.delenv("PINECONE_API_KEY", raising=False)
+    assert Settings(_env_file=None, EMBEDDING_BACKEND="onnx").PINECONE_API_KEY is None
+    with pytest.raises(ValidationError, match="PINECONE_API_KEY"):
+        Settings(_env_file=None, EMBEDDING_BACKEND="pinecone")
+    assert Settings(_env_file=None, PINECONE_API_KEY="key").EMBEDDING_BACKEND == "pinecone"
@@ -0,0 +1,62 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core.exceptions import ServiceOverloadedError
+from app.services.executor import WorkerPool
+
+
+async def test_run_returns_result_and_frees_slot():
+    pool = WorkerPool("test", max_workers=1, max_queue=0)
+    try:
+        assert await pool.run("stage", lambda x: x * 2, 21) == 42
+        assert pool.pending == 0
+    finally:
+        pool.shutdown()
+
+
+async def test_rejects_when_saturated():
+    pool = WorkerPool("test", max_workers=1, max_queue=0)
+    release = threading.Event()
+    try:
+        busy = asyncio.ensure_future(pool.run("stage", release.wait))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ServiceOverloadedError):
+            await pool.run("stage", lambda: None)
+        release.set()
+        await busy
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+async def test_cancelled_caller_keeps_slot_until_thread_finishes():
+    pool = WorkerPool("test", max_workers=1, max_queue=0)
+    started, release = threading.Event(), threading.Event()
+
+    def blocking():
+        started.set()
+        release.wait()
+
+    try:
+        caller = asyncio.ensure_future(pool.run("stage", blocking))
+        await asyncio.to_thread(started.wait)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+
+        # The thread is still busy, so the pool must still count it
+        assert pool.pending == 1
+        with pytest.raises(ServiceOverloadedError):
+            await pool.run("stage", lambda: None)
+
+        release.set()
+        for _ in range(100):
+            if pool.pending == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert await pool.run("stage", lambda: "ok") == "ok"
+    finally:
+        release.set()
+        pool.shutdown()
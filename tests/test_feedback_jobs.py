@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+
+from app.services.feedback_jobs import FeedbackJobStore, FolderFeedbackJob, TokenUsage
+
+
+@pytest.fixture
+def store(tmp_path):
+    job_store = FeedbackJobStore(str(tmp_path / "jobs.sqlite"))
+    yield job_store
+    job_store.close()
+
+
+def _documents(count):
+    return [{"id": f"d{i}", "isiTugas": f"submission {i}"} for i in range(count)]
+
+
+class Runner:
+    """``run_document`` that records calls, fails listed documents and can block on one."""
+
+    def __init__(self, fail=(), block=None):
+        self.fail = set(fail)
+        self.block = block
+        self.calls = []
+        self.relevance_seen = []
+        self.blocked = asyncio.Event()
+
+    async def __call__(self, document, relevance):
+        self.calls.append(document["id"])
+        self.relevance_seen.append(relevance)
+        if document["id"] == self.block:
+            self.blocked.set()
+            await asyncio.Event().wait()
+        if document["id"] in self.fail:
+            raise RuntimeError("provider unavailable")
+        return {"summary": f"feedback for {document['id']}"}, TokenUsage(calls=1, input_tokens=10, output_tokens=5)
+
+
+def _relevance(calls):
+    async def analyze():
+        calls.append(1)
+        return "relevant", TokenUsage(calls=1, input_tokens=3, output_tokens=2)
+    return analyze
+
+
+async def test_relevance_is_computed_once_up_front(store):
+    runner, relevance_calls = Runner(fail={"d0"}), []
+    job = FolderFeedbackJob("folder", runner, store, analyze_relevance=_relevance(relevance_calls))
+    stats = await job.run(_documents(4))
+
+    # A failing first document no longer decides the folder's relevance
+    assert relevance_calls == [1]
+    assert runner.relevance_seen == ["relevant"] * 4
+    assert (stats["completed"], stats["failed"]) == (3, 1)
+    assert stats["llm_calls"] == 4 and stats["input_tokens"] == 33
+
+
+async def test_failed_documents_are_not_retried_within_a_run(store):
+    runner = Runner(fail={"d1"})
+    await FolderFeedbackJob("folder", runner, store).run(_documents(3))
+
+    # Transient errors are retried by the LLM gateway, not again by the job
+    assert sorted(runner.calls) == ["d0", "d1", "d2"]
+    assert store.results("folder")["d1"] == {"status": "failed", "result": None, "error": "provider unavailable"}
+
+
+async def test_relevance_failure_leaves_it_to_each_document(store):
+    async def unavailable():
+        raise RuntimeError("provider unavailable")
+
+    runner = Runner()
+    stats = await FolderFeedbackJob("folder", runner, store, analyze_relevance=unavailable).run(_documents(2))
+    assert runner.relevance_seen == [None, None]
+    assert stats["completed"] == 2
+
+
+async def test_a_restarted_job_reruns_only_pending_and_failed_documents(store):
+    documents = _documents(6)
+    first = Runner(fail={"d1"}, block="d3")
+    job = FolderFeedbackJob("folder", first, store, concurrency=1)
+    task = asyncio.create_task(job.run(documents))
+    await asyncio.wait_for(first.blocked.wait(), timeout=5)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert job.stats["status"] == "cancelled"
+    assert first.calls == ["d0", "d1", "d2", "d3"]
+    assert {doc_id: item["status"] for doc_id, item in store.results("folder").items()} == {
+        "d0": "done", "d1": "failed", "d2": "done",
+    }
+
+    # Edited content counts as pending too
+    documents[2] = dict(documents[2], isiTugas="revised submission")
+    second = Runner()
+    stats = await FolderFeedbackJob("folder", second, store, concurrency=1).run(documents)
+
+    assert second.calls == ["d1", "d2", "d3", "d4", "d5"]
+    assert (stats["total"], stats["pending"], stats["skipped"], stats["completed"]) == (6, 5, 1, 5)
+    assert store.summary("folder")["done"] == 6
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from sklearn.cluster import BisectingKMeans, KMeans, MiniBatchKMeans
+from sklearn.mixture import GaussianMixture
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+from app.services.clustering import FEATURE_WEIGHTS, infer_clusters
+from app.services.inference_kernel import build_kernel, compile_kernel
+
+
+def _training_data(seed=0):
+    rng = np.random.default_rng(seed)
+    centers = np.array([[50, 2, -24, 5], [200, 10, 48, 20], [350, 25, 200, 80]], dtype=np.float64)
+    X = np.vstack([center + rng.normal(scale=[20, 2, 12, 5], size=(150, 4)) for center in centers])
+    scaler = MinMaxScaler().fit(X)
+    return X, scaler, scaler.transform(X) * FEATURE_WEIGHTS
+
+
+def _probe(scaler, n=2000, seed=1):
+    rng = np.random.default_rng(seed)
+    span = scaler.data_max_ - scaler.data_min_
+    return rng.uniform(scaler.data_min_ - 0.1 * span, scaler.data_max_ + 0.1 * span, size=(n, 4))
+
+
+@pytest.mark.parametrize("make_model", [
+    lambda: KMeans(n_clusters=3, n_init=5, random_state=0),
+    lambda: MiniBatchKMeans(n_clusters=3, n_init=3, random_state=0),
+])
+def test_centroid_kernel_matches_sklearn(make_model):
+    _, scaler, X_weighted = _training_data()
+    model = make_model().fit(X_weighted)
+    kernel = compile_kernel(model, scaler, FEATURE_WEIGHTS)
+    X = _probe(scaler)
+
+    labels, confidence = kernel.predict(X)
+    expected_labels, expected_confidence = infer_clusters(model, scaler, X)
+
+    np.testing.assert_array_equal(labels, expected_labels)
+    np.testing.assert_allclose(confidence, expected_confidence, rtol=1e-9)
+    np.testing.assert_allclose(kernel.transform(X), scaler.transform(X) * FEATURE_WEIGHTS, rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize("covariance_type", ["full", "tied", "diag", "spherical"])
+def test_gmm_kernel_matches_sklearn(covariance_type):
+    _, scaler, X_weighted = _training_data()
+    model = GaussianMixture(n_components=3, covariance_type=covariance_type, random_state=0).fit(X_weighted)
+    kernel = compile_kernel(model, scaler, FEATURE_WEIGHTS)
+    X = _probe(scaler)
+
+    labels, confidence = kernel.predict(X)
+
+    np.testing.assert_array_equal(labels, model.predict(scaler.transform(X) * FEATURE_WEIGHTS))
+    assert np.all(confidence == 1.0)
+
+
+def test_unsupported_models_fall_back_to_sklearn():
+    X, scaler, X_weighted = _training_data()
+    bisecting = BisectingKMeans(n_clusters=3, random_state=0).fit(X_weighted)
+    kmeans = KMeans(n_clusters=3, n_init=5, random_state=0).fit(X_weighted)
+
+    assert build_kernel(bisecting, scaler, FEATURE_WEIGHTS) is None
+    assert compile_kernel(kmeans, StandardScaler().fit(X), FEATURE_WEIGHTS) is None
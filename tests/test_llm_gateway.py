@@ -0,0 +1,142 @@
+import asyncio
+
+import groq
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+
+from app.core.exceptions import LLMUnavailableError
+from app.services.llm_gateway import PRIORITY_BATCH, PRIORITY_INTERACTIVE, LLMGateway, retry_reason
+
+REQUEST = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+
+
+def _status_error(cls, status_code, headers=None):
+    response = httpx.Response(status_code, request=REQUEST, headers=headers or {})
+    return cls("error", response=response, body=None)
+
+
+def _gateway(**kwargs):
+    return LLMGateway(requests_per_minute=6000, tokens_per_minute=1e9, retry_base_seconds=0.0, **kwargs)
+
+
+@pytest.mark.parametrize("error, expected", [
+    (groq.APIConnectionError(request=REQUEST), ("connection", None)),
+    (groq.APITimeoutError(request=REQUEST), ("connection", None)),
+    (httpx.ConnectError("refused", request=REQUEST), ("connection", None)),
+    (asyncio.TimeoutError(), ("connection", None)),
+    (_status_error(groq.RateLimitError, 429, {"retry-after": "7"}), ("rate_limit", 7.0)),
+    (_status_error(groq.InternalServerError, 503), ("server_error", None)),
+    (_status_error(groq.BadRequestError, 400), (None, None)),
+    (_status_error(groq.AuthenticationError, 401), (None, None)),
+    (ValueError("bad prompt"), (None, None)),
+])
+def test_retry_reason_classifies_groq_errors(error, expected):
+    assert retry_reason(error) == expected
+
+
+async def test_connection_errors_are_retried_then_surface_as_unavailable():
+    gateway = _gateway(max_attempts=3)
+    attempts = 0
+
+    async def flaky():
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise groq.APIConnectionError(request=REQUEST)
+        return "ok"
+
+    async def down():
+        raise groq.APITimeoutError(request=REQUEST)
+
+    try:
+        assert await gateway.call(flaky) == "ok"
+        assert attempts == 3
+        with pytest.raises(LLMUnavailableError):
+            await gateway.call(down)
+    finally:
+        await gateway.close()
+
+
+async def test_cancelled_leader_does_not_cancel_followers():
+    gateway = _gateway()
+    calls = 0
+    release = asyncio.Event()
+
+    async def slow():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "shared"
+
+    try:
+        leader = asyncio.ensure_future(gateway.call(slow, key="k"))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(gateway.call(slow, key="k"))
+        await asyncio.sleep(0.01)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        release.set()
+
+        assert await follower == "shared"
+        assert calls == 1
+    finally:
+        await gateway.close()
+
+
+async def test_call_is_cancelled_when_every_caller_gives_up():
+    gateway = _gateway()
+    started, cancelled = asyncio.Event(), asyncio.Event()
+
+    async def hang():
+        started.set()
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    try:
+        callers = [asyncio.ensure_future(gateway.call(hang, key="k")) for _ in range(2)]
+        await started.wait()
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.wait_for(cancelled.wait(), 1)
+        assert gateway._inflight == {}
+    finally:
+        await gateway.close()
+
+
+async def test_an_urgent_caller_moves_a_shared_call_forward():
+    # One request per 0.1s, so calls queue up behind the scheduler
+    gateway = LLMGateway(requests_per_minute=600, tokens_per_minute=1e9, request_burst=1)
+    order = []
+    depth = {
+        label: REGISTRY.get_sample_value("llm_gateway_queue_depth", {"priority": label}) or 0.0
+        for label in ("batch", "interactive")
+    }
+
+    def named(name):
+        async def run():
+            order.append(name)
+            return name
+        return run
+
+    try:
+        batch = [asyncio.ensure_future(gateway.call(named("x"), priority=PRIORITY_BATCH))]
+        await asyncio.sleep(0.01)
+        # y waits in the scheduler for the next request token; z and w queue behind it
+        batch += [asyncio.ensure_future(gateway.call(named(name), key=name, priority=PRIORITY_BATCH)) for name in "yzw"]
+        await asyncio.sleep(0.01)
+        urgent = asyncio.ensure_future(gateway.call(named("w again"), key="w", priority=PRIORITY_INTERACTIVE))
+
+        assert await urgent == "w"
+        assert await asyncio.gather(*batch) == ["x", "y", "z", "w"]
+        assert order == ["x", "y", "w", "z"]
+        for label, value in depth.items():
+            assert (REGISTRY.get_sample_value("llm_gateway_queue_depth", {"priority": label}) or 0.0) == value
+    finally:
+        await gateway.close()
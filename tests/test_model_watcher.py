@@ -0,0 +1,155 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.services import model_watcher
+from app.services.model_watcher import ModelReloader
+
+
+def _metric(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+class Deployments:
+    """``reload_fn`` that returns a new bundle once per deployment and can hold a reload open."""
+
+    def __init__(self, pending=1, age=2.0):
+        self.pending = pending
+        self.age = age
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+        self.started = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(timeout=5)
+        if not self.pending:
+            return None
+        self.pending -= 1
+        return SimpleNamespace(version=f"v{self.calls}", deployed_at=time.time() - self.age)
+
+
+@pytest.fixture
+async def reloaders(tmp_path):
+    started = []
+
+    def make(reload_fn, **kwargs):
+        kwargs.setdefault("poll_interval", 3600.0)
+        reloader = ModelReloader(reload_fn, str(tmp_path), **kwargs)
+        started.append(reloader)
+        return reloader
+
+    yield make
+    for reloader in started:
+        await reloader.stop()
+
+
+def _fake_awatch(batches):
+    """Stand-in for ``watchfiles.awatch`` that yields the given change batches, then waits for stop."""
+    async def awatch(path, stop_event, recursive):
+        for changes in batches:
+            yield changes
+        await stop_event.wait()
+    return awatch
+
+
+async def test_notify_reloads_once_and_records_latency_and_result(reloaders):
+    deployments = Deployments(age=2.0)
+    reloader = reloaders(deployments)
+    reloaded = _metric("ml_model_reloads_total", trigger="notify", result="reloaded")
+    unchanged = _metric("ml_model_reloads_total", trigger="notify", result="unchanged")
+    observed = _metric("ml_model_reload_latency_seconds_count", trigger="notify")
+    latency_sum = _metric("ml_model_reload_latency_seconds_sum", trigger="notify")
+
+    bundle = await reloader.trigger("notify")
+    assert bundle.version == "v1" and deployments.calls == 1
+    assert await reloader.trigger("notify") is None
+
+    assert _metric("ml_model_reloads_total", trigger="notify", result="reloaded") == reloaded + 1
+    assert _metric("ml_model_reloads_total", trigger="notify", result="unchanged") == unchanged + 1
+    assert _metric("ml_model_reload_latency_seconds_count", trigger="notify") == observed + 1
+    assert _metric("ml_model_reload_latency_seconds_sum", trigger="notify") - latency_sum == pytest.approx(2.0, abs=0.5)
+
+
+async def test_a_failed_reload_is_counted_and_swallowed(reloaders):
+    def broken():
+        raise OSError("deployment half written")
+
+    errors = _metric("ml_model_reloads_total", trigger="notify", result="error")
+    assert await reloaders(broken).trigger("notify") is None
+    assert _metric("ml_model_reloads_total", trigger="notify", result="error") == errors + 1
+
+
+async def test_a_burst_of_triggers_causes_one_reload(reloaders):
+    deployments = Deployments()
+    reloader = reloaders(deployments)
+
+    results = await asyncio.gather(*(reloader.trigger(source) for source in ["watch", "notify", "watch", "poll"]))
+
+    assert deployments.calls == 1
+    # Every caller sees the bundle of the shared reload
+    assert {bundle.version for bundle in results} == {"v1"}
+
+
+async def test_triggers_during_a_reload_share_one_follow_up(reloaders):
+    deployments = Deployments(pending=2)
+    deployments.release.clear()
+    reloader = reloaders(deployments)
+
+    running = asyncio.create_task(reloader.trigger("watch"))
+    await asyncio.to_thread(deployments.started.wait, 5)
+    # The running reload may have read the deployment before these events
+    followers = [asyncio.create_task(reloader.trigger("notify")) for _ in range(5)]
+    await asyncio.sleep(0.01)
+    deployments.release.set()
+
+    first = await running
+    rest = await asyncio.gather(*followers)
+    assert deployments.calls == 2
+    assert first.version == "v1"
+    assert {bundle.version for bundle in rest} == {"v2"}
+
+
+async def test_a_relevant_watch_event_triggers_exactly_one_reload(reloaders, monkeypatch, tmp_path):
+    monkeypatch.setattr(model_watcher, "awatch", _fake_awatch([
+        {(1, str(tmp_path / "notes.txt"))},
+        {(1, str(tmp_path / "current")), (2, str(tmp_path / ".current.tmp"))},
+    ]))
+    deployments = Deployments()
+    reloader = reloaders(deployments)
+    watched = _metric("ml_model_reloads_total", trigger="watch", result="reloaded")
+
+    reloader.start()
+    for _ in range(100):
+        if deployments.calls:
+            break
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.05)
+    await reloader.stop()
+
+    assert deployments.calls == 1
+    assert _metric("ml_model_reloads_total", trigger="watch", result="reloaded") == watched + 1
+
+
+async def test_polling_takes_over_without_watchfiles(reloaders, monkeypatch, caplog):
+    monkeypatch.setattr(model_watcher, "awatch", None)
+    deployments = Deployments()
+    reloader = reloaders(deployments, poll_interval=0.02, poll_jitter=0.0)
+    polled = _metric("ml_model_reloads_total", trigger="poll", result="reloaded")
+
+    reloader.start()
+    for _ in range(100):
+        if deployments.calls >= 2:
+            break
+        await asyncio.sleep(0.01)
+    await reloader.stop()
+
+    assert deployments.calls >= 2
+    assert _metric("ml_model_reloads_total", trigger="poll", result="reloaded") == polled + 1
+    assert "rely on polling" in caplog.text
@@ -0,0 +1,133 @@
+from types import SimpleNamespace
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.routers.agent import AssignmentRequest, build_workflow, initial_state
+from app.services import response_cache
+from app.services.response_cache import ResponseCache, SemanticCache, prompt_key
+from tests.fakes import StubChatModel
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = SimpleNamespace(value=1000.0)
+    monkeypatch.setattr(response_cache, "time", SimpleNamespace(monotonic=lambda: now.value))
+    return now
+
+
+def _metric(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_prompt_key_separates_model_node_and_prompt():
+    assert prompt_key("m", "node", "prompt") == prompt_key("m", "node", "prompt")
+    assert len({prompt_key("m", "ab", "c"), prompt_key("m", "a", "bc"), prompt_key("n", "ab", "c")}) == 3
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ResponseCache(ttl_seconds=60)
+    cache.put("k", "v")
+    clock.value += 59
+    assert cache.get("k") == "v"
+    clock.value += 2
+    assert cache.get("k") is None
+    assert len(cache) == 0
+
+    # Writing again restarts the TTL
+    cache.put("k", "v2")
+    clock.value += 59
+    assert cache.get("k") == "v2"
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(max_items=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("a") == "1"
+    cache.put("c", "3")
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("1", "3")
+    assert len(cache) == 2
+
+
+def test_semantic_matches_need_the_threshold():
+    cache = SemanticCache(threshold=0.95)
+    cache.add("node", [1.0, 0.0], "horizontal")
+
+    # Scale does not matter, only the angle
+    assert cache.lookup("node", [5.0, 0.2]) == "horizontal"    # cosine 0.999
+    assert cache.lookup("node", [1.0, 0.4]) is None            # cosine 0.93
+    assert cache.lookup("node", [0.0, 0.0]) is None
+    assert cache.lookup("node", [1.0, 0.0, 0.0]) is None       # other embedding model
+
+    cache.add("node", [1.0, 0.3], "tilted")
+    assert cache.lookup("node", [1.0, 0.28]) == "tilted"       # the most similar entry wins
+
+
+def test_semantic_entries_are_scoped_per_node():
+    cache = SemanticCache(threshold=0.9)
+    cache.add("summarizer_agent", [1.0, 0.0], "summary")
+
+    assert cache.lookup("feedback_agent", [1.0, 0.0]) is None
+    cache.add("feedback_agent", [1.0, 0.0], "feedback")
+    assert cache.lookup("summarizer_agent", [1.0, 0.0]) == "summary"
+    assert cache.lookup("feedback_agent", [1.0, 0.0]) == "feedback"
+
+
+def test_semantic_entries_expire_and_are_evicted_per_node(clock):
+    cache = SemanticCache(threshold=0.9, max_items=2, ttl_seconds=60)
+    cache.add("node", [1.0, 0.0], "x")
+    cache.add("node", [0.0, 1.0], "y")
+    cache.add("other", [1.0, 0.0], "kept")
+    assert cache.lookup("node", [1.0, 0.0]) == "x"
+    cache.add("node", [-1.0, 0.0], "z")
+
+    # y was the least recently used entry of its node; the other node is untouched
+    assert cache.lookup("node", [0.0, 1.0]) is None
+    assert cache.lookup("node", [1.0, 0.0]) == "x"
+    assert cache.lookup("other", [1.0, 0.0]) == "kept"
+
+    clock.value += 61
+    assert cache.lookup("node", [1.0, 0.0]) is None
+    assert cache.lookup("other", [1.0, 0.0]) is None
+
+
+async def test_workflow_counts_exact_and_semantic_hits():
+    model = StubChatModel(prompts=[])
+    workflow = build_workflow(model, ResponseCache(), SemanticCache(threshold=0.9))
+    nodes = ("summarizer_agent", "relevance_agent", "feedback_agent", "aggregator")
+    before = {
+        node: (
+            _metric("llm_cache_hits_total", node=node, level="exact"),
+            _metric("llm_cache_hits_total", node=node, level="semantic"),
+            _metric("llm_cache_misses_total", node=node),
+        )
+        for node in nodes
+    }
+
+    def request(content, embedding):
+        return initial_state(AssignmentRequest(
+            title="Sorting", description="Compare sorts.", content=content,
+            persona="Be concise.", content_embedding=embedding,
+        ))
+
+    await workflow.ainvoke(request("Merge sort splits the list.", [1.0, 0.0]))
+    await workflow.ainvoke(request("Merge sort splits the list.", [1.0, 0.0]))
+    # A near-duplicate submission reuses the summary of the first one
+    await workflow.ainvoke(request("Merge sort splits a list.", [1.0, 0.05]))
+
+    def delta(node):
+        exact, semantic, misses = before[node]
+        return (
+            _metric("llm_cache_hits_total", node=node, level="exact") - exact,
+            _metric("llm_cache_hits_total", node=node, level="semantic") - semantic,
+            _metric("llm_cache_misses_total", node=node) - misses,
+        )
+
+    assert delta("summarizer_agent") == (1, 1, 1)
+    assert delta("relevance_agent") == (2, 0, 1)
+    assert delta("feedback_agent") == (2, 0, 1)
+    assert delta("aggregator") == (2, 0, 1)
+    assert len(model.prompts) == 4
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from app.services.content_cache import ContentCache
+from app.services.summarization import _group_summaries, map_reduce_summary, pack_chunks
+
+
+class RecordingComplete:
+    """``complete(node, prompt)`` that answers with a fixed-size summary and records concurrency."""
+
+    def __init__(self, summary_chars=40, delay=0.01):
+        self.summary_chars = summary_chars
+        self.delay = delay
+        self.calls = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def __call__(self, node, prompt):
+        self.calls.append((node, prompt))
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return f"{node} {len(self.calls)} ".ljust(self.summary_chars, "s")
+
+    def count(self, node):
+        return sum(called == node for called, _ in self.calls)
+
+
+@pytest.fixture
+def store(tmp_path):
+    cache = ContentCache(str(tmp_path / "cache.sqlite"))
+    yield cache
+    cache.close()
+
+
+def _chunks(count, size=100):
+    return [f"chunk {i} ".ljust(size, "x") for i in range(count)]
+
+
+def test_pack_chunks_fills_windows_in_order():
+    chunks = _chunks(5)
+    windows = pack_chunks(chunks, 250)
+    assert windows == ["\n\n".join(chunks[0:2]), "\n\n".join(chunks[2:4]), chunks[4]]
+    assert all(len(window) <= 250 for window in windows)
+    assert pack_chunks([], 250) == []
+
+
+def test_an_oversized_chunk_stays_whole_in_its_own_window():
+    small, large = "a" * 50, "b" * 500
+    assert pack_chunks([small, large, small], 200) == [small, large, small]
+    assert pack_chunks([large], 200) == [large]
+
+
+def test_group_summaries_shrinks_every_level():
+    assert _group_summaries(["a" * 40] * 4, 100) == [["a" * 40] * 2, ["a" * 40] * 2]
+    # A trailing single summary joins the previous group instead of standing alone
+    assert _group_summaries(["a" * 60] * 3, 100) == [["a" * 60] * 3]
+    # Oversized summaries are still combined in pairs
+    assert [len(group) for group in _group_summaries(["a" * 500] * 4, 100)] == [2, 2]
+    assert _group_summaries(["only"], 100) == [["only"]]
+
+
+async def test_reduce_runs_level_by_level_to_one_summary():
+    complete = RecordingComplete(summary_chars=40)
+    summary = await map_reduce_summary(complete, _chunks(8), "model", window_chars=100, reduce_chars=100)
+
+    # Two 40-char summaries fit in 100 chars: 8 partial summaries -> 4 -> 2 -> 1
+    assert complete.count("summary_map") == 8
+    assert complete.count("summary_reduce") == 4 + 2 + 1
+    assert summary.startswith("summary_reduce 15 ")
+    assert complete.calls[-1][1].count("PART ") == 2
+
+
+async def test_a_single_window_needs_no_reduce():
+    complete = RecordingComplete()
+    summary = await map_reduce_summary(complete, _chunks(2), "model", window_chars=1000)
+    assert [node for node, _ in complete.calls] == ["summary_map"]
+    assert summary.startswith("summary_map 1 ")
+    assert await map_reduce_summary(complete, [], "model") == ""
+
+
+async def test_calls_in_flight_stay_within_the_concurrency():
+    complete = RecordingComplete(delay=0.02)
+    await map_reduce_summary(complete, _chunks(12), "model", window_chars=100, reduce_chars=100, concurrency=3)
+    assert complete.peak == 3
+
+
+async def test_persisted_partial_summaries_leave_only_the_reduce_step(store):
+    chunks = _chunks(6)
+    first = RecordingComplete()
+    await map_reduce_summary(first, chunks, "model", window_chars=100, reduce_chars=100, store=store)
+    assert first.count("summary_map") == 6
+
+    second = RecordingComplete()
+    await map_reduce_summary(second, chunks, "model", window_chars=100, reduce_chars=100, store=store)
+    assert second.count("summary_map") == 0
+    assert second.count("summary_reduce") == first.count("summary_reduce")
+    # The reduce step sees the stored partial summaries of the first run
+    assert second.calls[0][1] == next(prompt for node, prompt in first.calls if node == "summary_reduce")
+
+    # Partial summaries are keyed by model
+    other = RecordingComplete()
+    await map_reduce_summary(other, chunks, "other-model", window_chars=100, reduce_chars=100, store=store)
+    assert other.count("summary_map") == 6
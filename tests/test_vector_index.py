@@ -0,0 +1,169 @@
+import numpy as np
+import pytest
+
+from app.services.embedding_codec import encode_embedding
+from app.services.vector_index import FolderIndex, VectorIndexRegistry
+from tests.fakes import FakeSupabase
+
+
+def _documents(count, folders=("A", "B"), dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "id": f"doc-{i:04d}",
+            "folder": folders[i % len(folders)],
+            "nameStudent": f"student-{i}",
+            "uploadedDate": f"2024-01-{1 + i % 28:02d}T00:00:00",
+            "embedding": encode_embedding(rng.normal(size=dim), "float32"),
+        }
+        for i in range(count)
+    ]
+
+
+def test_query_matches_brute_force_cosine():
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(50, 16)).astype(np.float32)
+    index = FolderIndex()
+    for i, vector in enumerate(vectors):
+        index.upsert(f"d{i}", f"n{i}", "2024-01-01T00:00:00", vector)
+
+    query = rng.normal(size=16).astype(np.float32)
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(normalized @ (query / np.linalg.norm(query)))[::-1][:3]
+
+    matches = index.query(query, k=3)
+    assert [match.doc_id for match in matches] == [f"d{i}" for i in expected]
+
+
+def test_query_respects_cutoff_and_exclusion():
+    index = FolderIndex()
+    index.upsert("old", "old", "2024-01-01T00:00:00", np.array([1.0, 0.0]))
+    index.upsert("new", "new", "2024-02-01T00:00:00", np.array([1.0, 0.0]))
+    index.upsert("self", "self", "2024-01-02T00:00:00", np.array([1.0, 0.0]))
+
+    matches = index.query(np.array([1.0, 0.0]), k=5, before="2024-01-15T00:00:00", exclude_id="self")
+    assert [match.doc_id for match in matches] == ["old"]
+
+
+def test_remove_keeps_remaining_documents_queryable():
+    index = FolderIndex()
+    for i in range(5):
+        vector = np.zeros(5)
+        vector[i] = 1.0
+        index.upsert(f"d{i}", f"n{i}", None, vector)
+        index.upsert_chunks(f"d{i}", vector[np.newaxis, :])
+
+    assert index.remove("d1")
+    assert not index.remove("d1")
+    assert len(index) == 4
+    for i in (0, 2, 3, 4):
+        vector = np.zeros(5)
+        vector[i] = 1.0
+        assert index.query(vector, k=1)[0].doc_id == f"d{i}"
+        assert index.query_chunks(vector[np.newaxis, :], k=1)[0].doc_id == f"d{i}"
+    assert all(match.doc_id != "d1" for match in index.query(np.eye(5)[1], k=4))
+
+
+def test_rebuild_does_not_mark_folders_loaded_until_the_scan_ends():
+    rows = _documents(10)
+    supabase = FakeSupabase({"documents": rows})
+    registry = VectorIndexRegistry(page_size=3)
+    seen_during_rebuild = []
+
+    def check(query):
+        if query.table_name == "documents" and not registry.ready:
+            seen_during_rebuild.append(set(registry._loaded))
+
+    supabase.hooks.append(check)
+    registry.rebuild(supabase)
+
+    assert registry.ready
+    assert seen_during_rebuild and all(not loaded for loaded in seen_during_rebuild)
+    assert sum(len(index) for index in registry._folders.values()) == 10
+
+
+def test_ensure_folder_during_rebuild_loads_the_whole_folder():
+    rows = _documents(10)
+    supabase = FakeSupabase({"documents": rows})
+    registry = VectorIndexRegistry(page_size=3)
+
+    # The first rebuild page covers only part of folder A
+    for page in registry._paginate(lambda: supabase.table("documents").select(registry.columns).order("id")):
+        registry._load_rows(page)
+        break
+    registry.ensure_folder(supabase, "A")
+
+    assert len(registry._folders["A"]) == sum(1 for row in rows if row["folder"] == "A")
+
+
+def test_refresh_evicts_deleted_and_loads_external_rows():
+    rows = _documents(6)
+    supabase = FakeSupabase({"documents": rows})
+    registry = VectorIndexRegistry(page_size=4)
+    registry.rebuild(supabase)
+
+    deleted = rows.pop(0)
+    moved = rows[0]
+    moved["folder"] = "C"
+    added = _documents(1, folders=("B",), seed=7)[0]
+    added["id"] = "doc-9999"
+    rows.append(added)
+    pending = dict(_documents(1, seed=8)[0], id="doc-pending", embedding=None)
+    rows.append(pending)
+
+    result = registry.refresh(supabase)
+
+    assert result == {"removed": 1, "loaded": 2}
+    assert all(match.doc_id != deleted["id"] for match in registry.query("A", deleted["embedding"], k=10))
+    assert [match.doc_id for match in registry.query("C", moved["embedding"], k=10)] == [moved["id"]]
+    assert all(match.doc_id != moved["id"] for match in registry.query("B", moved["embedding"], k=10))
+    assert added["id"] in {match.doc_id for match in registry.query("B", added["embedding"], k=10)}
+    assert registry.refresh(supabase) == {"removed": 0, "loaded": 0}
+
+
+def test_hnsw_mode_returns_exact_neighbours_on_small_folder():
+    pytest.importorskip("hnswlib")
+    rng = np.random.default_rng(3)
+    vectors = rng.normal(size=(200, 16)).astype(np.float32)
+    index = FolderIndex(hnsw_threshold=100, hnsw_ef=200)
+    for i, vector in enumerate(vectors):
+        index.upsert(f"d{i}", f"n{i}", None, vector)
+
+    for i in (0, 50, 199):
+        assert index.query(vectors[i], k=1)[0].doc_id == f"d{i}"
+    assert index._hnsw is not None
+
+    graph = index._hnsw
+    index.remove("d50")
+    # The moved document keeps answering from the same graph, the freed label is a tombstone
+    assert index._hnsw is graph
+    assert index.query(vectors[50], k=1)[0].doc_id != "d50"
+    assert index.query(vectors[199], k=1)[0].doc_id == "d199"
+
+
+def test_hnsw_evictions_tombstone_until_the_graph_is_mostly_deleted():
+    pytest.importorskip("hnswlib")
+    rng = np.random.default_rng(4)
+    vectors = rng.normal(size=(120, 16)).astype(np.float32)
+    index = FolderIndex(hnsw_threshold=20, hnsw_ef=200)
+    for i, vector in enumerate(vectors):
+        index.upsert(f"d{i}", f"n{i}", None, vector)
+    index.query(vectors[0], k=1)
+    graph = index._hnsw
+
+    for i in range(0, 40, 2):
+        index.remove(f"d{i}")
+    # A re-added document revives a tombstoned label
+    index.upsert("d0", "n0", None, vectors[0])
+    assert index._hnsw is graph and len(index._hnsw_deleted) == 19
+
+    live = [i for i in range(120) if i == 0 or i >= 40 or i % 2]
+    for i in live:
+        assert [match.doc_id for match in index.query(vectors[i], k=1)] == [f"d{i}"]
+    exact = index._query_exact(vectors[5] / np.linalg.norm(vectors[5]), 5, float("inf"), None)
+    assert [match.doc_id for match in index.query(vectors[5], k=5)] == [match.doc_id for match in exact]
+
+    for i in range(40, 120):
+        index.remove(f"d{i}")
+    assert index._hnsw is None and not index._hnsw_deleted
+    assert index.query(vectors[1], k=1)[0].doc_id == "d1"